@@ -30,6 +30,17 @@ UI_CONFIG = {
     'status_font': ('Consolas', 10),
     'tutorial_font': ('Consolas', 16, 'bold'),
     
+    # Output log
+    'log_pump_interval': 16,        # ms between batched log updates (about one frame)
+    'log_batch_lines': 2000,        # Most lines inserted per update, keeps the UI responsive
+    'max_scrollback_lines': 5000,   # Oldest lines are dropped beyond this
+    
+    # Preview panel
+    'preview_width': 360,           # Preview frame width in pixels
+    'preview_fps': 10,              # Preview frames cached per second of timeline
+    'preview_scrub_window': 0.15,   # Requests closer than this (s) count as scrubbing
+    'list_waveform_columns': 40,    # Width of the waveforms drawn by 'list'
+    
     # Tutorial button
     'tutorial_button_color': '#4CAF50',
     'tutorial_button_hover_color': '#45a049',
@@ -46,6 +57,27 @@ VIDEO_CONFIG = {
     'temp_audio_file': 'temp-audio.m4a',
     'remove_temp_files': True,
     
+    # Segmented export settings
+    'export_mode': 'single',        # 'single' (one encoder) or 'segmented' (parallel worker processes)
+    'segment_split': 'interval',    # 'interval' (fixed GOP-aligned length) or 'clips' (clip boundaries)
+    'segment_duration': 10.0,       # seconds per segment in 'interval' mode
+    'keyframe_interval': 2.0,       # seconds between keyframes (GOP length)
+    'stream_copy_cuts': True,       # Stream-copy cut-only timelines, re-encoding only cut points
+    'incremental_export': True,     # Segmented mode: cache encoded segments, re-encode only changed ones
+    
+    # Rendition presets for 'export(path, 1080p, 720p, ...)'
+    'renditions': {
+        '1080p': {'height': 1080, 'bitrate': '8000k', 'codec': 'libx264'},
+        '720p': {'height': 720, 'bitrate': '5000k', 'codec': 'libx264'},
+        '480p': {'height': 480, 'bitrate': '2500k', 'codec': 'libx264'},
+        '360p': {'height': 360, 'bitrate': '1000k', 'codec': 'libx264'},
+    },
+    
+    # Proxy editing settings
+    'proxy_mode': False,            # Edit and preview against low-resolution proxies
+    'proxy_height': 360,            # Proxy frame height in pixels
+    'proxy_crf': 30,                # Proxy quality (higher = smaller files)
+    
     # Image to video settings
     'default_image_duration': 3.0,  # seconds
     
@@ -58,6 +90,7 @@ VIDEO_CONFIG = {
     'default_text_stroke_width': 2,
     'default_text_bg_color': 'white',
     'default_text_stroke_color': 'black',
+    'default_text_font': None,      # TrueType font name/path (None tries arial, then DejaVuSans)
     'overlay_maintain_aspect_ratio': True,  # Maintain aspect ratio when resizing overlays
     'overlay_fill_mode': 'fit',  # 'fit' (maintain aspect ratio) or 'stretch' (fill entire screen)
     'overlay_max_size_percent': 100,  # Maximum size as percentage of base video
@@ -89,16 +122,49 @@ PERFORMANCE_CONFIG = {
     'max_clip_duration': 3600,      # 1 hour in seconds
     'max_concurrent_clips': 10,
     'cleanup_interval': 300,        # 5 minutes in seconds
+    'reader_idle_timeout': 30,      # Close decoders unused for this many seconds
     
     # Processing settings
     'use_multithreading': True,
     'max_threads': 4,
+    'max_export_jobs': 2,           # Export jobs encoding at the same time (others queue)
+    'export_job_history': 20,       # Finished export jobs kept for 'export status'
     'chunk_size': 1024 * 1024,      # 1MB chunks
     
     # Cache settings
     'enable_cache': True,
     'cache_directory': 'cache',
-    'max_cache_size': 1024 * 1024 * 1024  # 1GB
+    'max_cache_size': 1024 * 1024 * 1024,  # 1GB
+    'preview_cache_size': 64 * 1024 * 1024, # Decoded preview frames kept in memory
+    'preview_readers': 4,                    # Preview decoders kept open
+    
+    # Media indexes built at upload
+    'index_workers': 1,             # Background indexing jobs at once
+    'filmstrip_interval': 2.0,      # Seconds between filmstrip thumbnails
+    'filmstrip_height': 48,         # Filmstrip thumbnail height in pixels
+    'waveform_resolution': 50,      # Waveform min/max buckets per second
+    
+    # Scene detection for 'split clip_name auto'
+    'scene_sample_fps': 5,          # Frames per second compared for cuts
+    'scene_threshold': 0.35,        # Histogram distance (0-1) that counts as a cut
+    'scene_min_length': 1.0,        # Shortest scene in seconds
+    
+    # Audio mixing for overdubs
+    'mix_memmap_seconds': 600,      # Longer tracks are mixed in memory-mapped files
+    'mix_ceiling_db': -1.0,         # Limiter ceiling in dBFS
+    'mix_release': 0.05,            # Seconds the limiter holds its gain reduction
+    
+    # Multi-rendition export
+    'rendition_queue_frames': 8,    # Frames buffered per rendition encoder
+    
+    # Export frame pipeline (decode -> composite -> encode)
+    'pipeline_queue_frames': 8,     # Frames buffered between pipeline stages
+    
+    # Silence removal ('clip_name: remove(silence)')
+    'silence_threshold_db': -40.0,  # RMS level in dBFS below which audio is silent
+    'silence_min_length': 0.5,      # Shortest silence removed, in seconds
+    'silence_window': 0.02,         # RMS window in seconds
+    'silence_padding': 0.1          # Silence kept next to each sound, in seconds
 }
 
 # Command Configuration
@@ -121,7 +187,7 @@ COMMAND_CONFIG = {
     'enable_autocomplete': True,
     'autocomplete_commands': [
         'upload', 'remove', 'trim', 'split', 'overlay', 'text',
-        'overlay_settings', 'audio', 'gif', 'merge_all', 'export', 'project', 'help',
+        'overlay_settings', 'export_settings', 'audio', 'gif', 'merge_all', 'export', 'reframe', 'project', 'cache', 'proxy', 'preview', 'help',
         'clear', 'list', 'quit'
     ]
 }
@@ -136,7 +202,11 @@ ERROR_CONFIG = {
     # Recovery settings
     'auto_save_interval': 300,      # 5 minutes
     'backup_project_files': True,
-    'max_backup_files': 5
+    'max_backup_files': 5,
+    'recovery_directory': 'recovery',   # Session journals and snapshots
+    'journal_sync_interval': 1.0,       # Seconds between batched journal fsyncs
+    'resumable_exports': True,          # Segmented exports keep progress so 'export resume' can finish them
+    'max_interrupted_exports': 3        # Interrupted exports kept for resuming
 }
 
 # Tutorial Configuration
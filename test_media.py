@@ -0,0 +1,154 @@
+"""
+VEdit CLI - Media Test
+
+Checks lazily opened file clips against a clip whose audio runs past its last
+video frame, as AAC audio often does: the clip lasts as long as its video,
+and frames up to its end decode from a freshly opened reader, also after
+the reader has been released. Also checks that the single-pass and rendition
+encoders write the same frames for a timeline ending on a partial frame.
+
+Usage: python test_media.py
+"""
+
+import gc
+import os
+import sys
+import shutil
+import threading
+import tempfile
+import subprocess
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from moviepy.config import get_setting
+from moviepy.editor import ColorClip
+from vedit_media import probe_media, probe_streams, LazyVideoClip, READER_POOL
+from vedit_pipeline import write_pipelined
+from vedit_renditions import parse_rendition, export_renditions
+from vedit_timeline import EditList
+
+# 4 seconds of 25 fps video with 4.6 seconds of audio
+VIDEO_SECONDS, AUDIO_SECONDS, FPS = 4.0, 4.6, 25
+
+
+def make_padded_clip(directory):
+    """An mp4 whose container outlasts its video; returns its path"""
+    path = os.path.join(directory, "padded.mp4")
+    subprocess.run([get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+                    "-f", "lavfi", "-i", f"testsrc=size=160x120:rate={FPS}:duration={VIDEO_SECONDS}",
+                    "-f", "lavfi", "-i", f"sine=duration={AUDIO_SECONDS}",
+                    "-c:v", "libx264", "-c:a", "aac", path], check=True)
+    return path
+
+
+def test_video_duration():
+    """A clip with longer audio lasts as long as its video"""
+    directory = tempfile.mkdtemp()
+    try:
+        info = probe_media(make_padded_clip(directory))
+        assert info['duration'] == VIDEO_SECONDS, info
+        assert info['has_audio']
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_last_frames():
+    """Frames up to the clip's end decode from a freshly opened reader"""
+    directory = tempfile.mkdtemp()
+    try:
+        path = make_padded_clip(directory)
+        clip = LazyVideoClip(path)
+        last = clip.duration - 1.0 / FPS
+        assert clip.get_frame(last).shape == (120, 160, 3)
+
+        # A segment worker opens its own reader and seeks straight to its range
+        edit_list = EditList.from_file(path, clip.duration)
+        assert edit_list.duration == VIDEO_SECONDS
+        path_at, source_time = edit_list.locate(last)
+        assert LazyVideoClip(path_at).get_frame(source_time).shape == (120, 160, 3)
+        clip.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_end_after_release():
+    """A reader reopened after release serves the last frame for times past the video"""
+    directory = tempfile.mkdtemp()
+    try:
+        clip = LazyVideoClip(make_padded_clip(directory))
+        last = clip.get_frame(clip.duration - 1.0 / FPS)
+        for t in [clip.duration, VIDEO_SECONDS + 0.3, AUDIO_SECONDS]:
+            # As the idle sweeper or reader pool would
+            clip.handle.release()
+            assert not clip.handle.is_open()
+            assert (clip.get_frame(t) == last).all(), t
+        clip.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_collect_inside_pool_lock():
+    """A clip collected while the reader pool's lock is held does not deadlock"""
+    directory = tempfile.mkdtemp()
+    try:
+        clip = LazyVideoClip(make_padded_clip(directory))
+        clip.get_frame(1.0)
+        handle = clip.handle
+        cycle = [clip]
+        cycle.append(cycle)
+        del clip, cycle
+
+        def collect():
+            with READER_POOL.lock:
+                gc.collect()
+
+        worker = threading.Thread(target=collect, daemon=True)
+        worker.start()
+        worker.join(10)
+        assert not worker.is_alive(), "finalizer blocked on the pool lock"
+        READER_POOL.collect()
+        assert not handle.is_open()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_partial_last_frame():
+    """Single-pass and rendition exports both encode a partial last frame"""
+    directory = tempfile.mkdtemp()
+    try:
+        # 10.5 frame intervals at 10 fps
+        video = ColorClip((160, 120), color=(200, 40, 40), duration=1.05).set_fps(10)
+        single = os.path.join(directory, "single.mp4")
+        write_pipelined(video, single, 10)
+        rendition, = export_renditions(video, os.path.join(directory, "rendition.mp4"),
+                                       [parse_rendition('120p')], log=lambda *args: None)
+        for path in [single, rendition]:
+            assert round(probe_streams(path)['video_duration'] * 10) == 11, path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """Run all tests"""
+    print("VEdit CLI - Media Test")
+    print("=" * 40)
+
+    tests = [test_video_duration, test_last_frames, test_end_after_release,
+             test_collect_inside_pool_lock, test_partial_last_frame]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+
+    print("=" * 40)
+    print(f"Results: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+VEdit CLI - Command Parser Test
+
+Checks the command grammar: targets, calls, quoting, unquoted paths with
+spaces and malformed lines.
+
+Usage: python test_parser.py
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vedit_parser import CommandParser, ParseError
+
+PARSER = CommandParser(['upload', 'remove', 'text', 'export', 'split', 'merge_all'],
+                       {'rm': 'remove'})
+
+
+def parse_error(line):
+    """Message of the ParseError a line raises, or None"""
+    try:
+        PARSER.parse(line)
+    except ParseError as e:
+        return str(e)
+    return None
+
+
+def test_targets():
+    """target: verb(...) with and without a space after the colon"""
+    for line in ["video_1: remove(0:02, 0:04)", "video_1:remove(0:02, 0:04)",
+                 "video_1 : remove(0:02, 0:04)", "video_1: rm(0:02, 0:04)"]:
+        cmd = PARSER.parse(line)
+        assert (cmd.verb, cmd.target, cmd.args, cmd.call) == \
+            ('remove', 'video_1', ['0:02', '0:04'], True), line
+
+
+def test_calls():
+    """Empty calls, empty arguments and case-insensitive verbs"""
+    assert PARSER.parse("merge_all()").args == []
+    assert PARSER.parse("MERGE_ALL(cut)").args == ['cut']
+    assert PARSER.parse("export(a, , b)").args == ['a', '', 'b']
+    assert PARSER.parse("   ") is None
+
+
+def test_quoting():
+    """Quoted arguments keep commas, parentheses, case and escaped quotes"""
+    cmd = PARSER.parse('text("Hello, (World)", center, 50, white)')
+    assert cmd.args == ['Hello, (World)', 'center', '50', 'white']
+    assert PARSER.parse("text('It\\'s', top, 40, red)").args[0] == "It's"
+    assert PARSER.parse('text("say \\"hi\\"", top, 40, red)').args[0] == 'say "hi"'
+    assert PARSER.parse('upload "C:\\My Videos\\a.mp4"').args == ['C:\\My Videos\\a.mp4']
+
+
+def test_unquoted_paths():
+    """Command.rest and call arguments take unquoted paths with spaces as written"""
+    cmd = PARSER.parse("upload C:\\My Videos\\clip one.mp4")
+    assert cmd.args == ['C:\\My', 'Videos\\clip', 'one.mp4']
+    assert cmd.rest(0) == "C:\\My Videos\\clip one.mp4"
+    assert cmd.rest(1) == "Videos\\clip one.mp4"
+    assert cmd.rest(3) is None
+    assert PARSER.parse("upload  /tmp/a  b.mp4").rest(0) == "/tmp/a  b.mp4"
+    assert PARSER.parse("export(/home/me/My Exports)").args == ['/home/me/My Exports']
+    assert PARSER.parse("split video_1 auto").rest(0) == "video_1 auto"
+
+
+def test_errors():
+    """Malformed lines raise ParseError with a useful message"""
+    assert parse_error('upload "unterminated') == 'Unterminated string in: upload "unterminated'
+    assert parse_error("text('a, top") is not None
+    assert parse_error('text("a", top') == "Missing ')'"
+    assert parse_error("remove(1, 2) extra") == "Unexpected text after ')'"
+    assert parse_error("frobnicate now") == "Unknown command: frobnicate"
+
+
+def main():
+    """Run all tests"""
+    print("VEdit CLI - Command Parser Test")
+    print("=" * 40)
+
+    tests = [test_targets, test_calls, test_quoting, test_unquoted_paths, test_errors]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+
+    print("=" * 40)
+    print(f"Results: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
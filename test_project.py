@@ -0,0 +1,243 @@
+"""
+VEdit CLI - Project and Recovery Test
+
+Checks that a project saved in the binary format loads back to the same
+timeline, that a crashed session is rebuilt from its snapshot plus the
+journal tail, with failed commands left out of the journal, that a session's
+export settings are recovered with it without reaching other sessions, that
+muted clips stay muted through later edits and that an export is logged as
+queued before it starts.
+
+Usage: python test_project.py
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from moviepy.editor import ColorClip, AudioClip
+from PIL import Image
+from config import CONFIG
+from vedit_engine import VideoEditorEngine
+from vedit_journal import JOURNAL_FILE, find_crashed_sessions
+
+# Commands building a timeline with cuts, a photo, text and a reframe
+EDITS = [
+    "video_1: trim(0:00, 0:02)",
+    "photo_1: trim(0:00, 0:01)",
+    'text("Hello, (World)", center, 40, white)',
+    "reframe 9:16 0:00=0.2 0:01=0.8",
+    "merge_all(cut)",
+]
+
+
+def make_media(directory):
+    """A short test video and still image; returns their paths"""
+    video = os.path.join(directory, "clip.mp4")
+    ColorClip((160, 90), color=(200, 40, 40), duration=3).write_videofile(
+        video, fps=10, codec='libx264', audio=False, logger=None)
+    photo = os.path.join(directory, "still.png")
+    Image.new("RGB", (160, 90), (40, 40, 200)).save(photo)
+    return video, photo
+
+
+def make_clip_with_audio(directory):
+    """A short test video with a sine tone; returns its path"""
+    path = os.path.join(directory, "tone.mp4")
+    tone = AudioClip(lambda t: np.sin(2 * np.pi * 440 * np.atleast_1d(t))[:, None].repeat(2, 1),
+                     duration=3, fps=44100)
+    ColorClip((160, 90), color=(40, 200, 40), duration=3).set_audio(tone).write_videofile(
+        path, fps=10, codec='libx264', audio_codec='aac', logger=None)
+    return path
+
+
+def build_session(engine, video, photo, edits=EDITS):
+    """Upload the media and apply edits, checking that each command worked"""
+    for command in [f"upload {video}", f"upload {photo}"] + edits:
+        assert engine.execute(command), command
+
+
+def timeline_of(engine):
+    """The engine's project timeline, without the project name"""
+    timeline = engine.project_timeline(warn=False)
+    timeline.pop('name')
+    return timeline
+
+
+def test_project_round_trip():
+    """A saved binary project loads back to the same timeline"""
+    directory = tempfile.mkdtemp()
+    try:
+        video, photo = make_media(directory)
+        engine = VideoEditorEngine()
+        build_session(engine, video, photo)
+        saved = timeline_of(engine)
+        assert saved['clips'] and saved['photo_clips'] and saved['text_overlays'] and saved['reframes']
+        project = os.path.join(directory, "round trip.vedit")
+        assert engine.execute(f"project save {project}")
+        engine.shutdown()
+
+        loaded = VideoEditorEngine()
+        assert loaded.execute(f"project load {project}")
+        assert timeline_of(loaded) == saved
+        loaded.shutdown()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_journal_replay():
+    """A crashed session is rebuilt from its snapshot and journal tail"""
+    directory = tempfile.mkdtemp()
+    recovery_directory = CONFIG['error']['recovery_directory']
+    CONFIG['error']['recovery_directory'] = os.path.join(directory, "recovery")
+    try:
+        video, photo = make_media(directory)
+        engine = VideoEditorEngine(journal=True)
+        build_session(engine, video, photo, EDITS[:2])
+        engine.write_snapshot()
+
+        # The journal tail: edits after the snapshot, and commands that fail
+        for command in EDITS[2:]:
+            assert engine.execute(command), command
+        assert not engine.execute("video_9: trim(0:00, 0:01)")
+        assert not engine.execute("reframe 9:16 sideways")
+        expected = timeline_of(engine)
+
+        # Crash: the session directory is left behind
+        engine.journal.close(clean=False)
+        engine.journal = None
+        engine.shutdown()
+        session = find_crashed_sessions(CONFIG['error']['recovery_directory'])[0]
+        with open(os.path.join(session, JOURNAL_FILE), 'rb') as f:
+            tail = [json.loads(line)['command'] for line in f]
+        assert tail == EDITS[2:], tail
+
+        # (Without a journal of its own, whose directory would share the crashed
+        # session's name within the same second and process)
+        recovered = VideoEditorEngine()
+        assert recovered.execute("project recover")
+        assert timeline_of(recovered) == expected
+        assert not os.path.exists(session)
+        recovered.shutdown()
+    finally:
+        CONFIG['error']['recovery_directory'] = recovery_directory
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_settings_recovered():
+    """A recovered session gets its export settings back, other sessions keep theirs"""
+    directory = tempfile.mkdtemp()
+    recovery_directory = CONFIG['error']['recovery_directory']
+    CONFIG['error']['recovery_directory'] = os.path.join(directory, "recovery")
+    defaults = dict(CONFIG['video'])
+    try:
+        video, photo = make_media(directory)
+        engine = VideoEditorEngine(journal=True)
+        build_session(engine, video, photo, ["export_settings segment 4",
+                                             "overlay_settings fill_mode stretch"])
+        engine.video_config.update(default_fps=24, default_bitrate='2500k', keyframe_interval=1.0)
+        engine.write_snapshot()
+        assert CONFIG['video'] == defaults
+        engine.journal.close(clean=False)
+        engine.journal = None
+        engine.shutdown()
+
+        other = VideoEditorEngine()
+        recovered = VideoEditorEngine()
+        assert recovered.execute("project recover")
+        settings = recovered.video_config
+        assert settings['segment_duration'] == 4.0 and settings['overlay_fill_mode'] == 'stretch'
+        assert (settings['default_fps'], settings['default_bitrate'],
+                settings['keyframe_interval']) == (24, '2500k', 1.0)
+        assert other.video_config == defaults and CONFIG['video'] == defaults
+        other.shutdown()
+        recovered.shutdown()
+    finally:
+        CONFIG['error']['recovery_directory'] = recovery_directory
+        CONFIG['video'].clear()
+        CONFIG['video'].update(defaults)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_mute_survives_edits():
+    """Clips muted by 'audio remove' stay muted when edits rebuild them"""
+    directory = tempfile.mkdtemp()
+    try:
+        video, photo = make_media(directory)
+        tone = make_clip_with_audio(directory)
+        engine = VideoEditorEngine()
+        for command in [f"upload {tone}", f"upload {video}", f"upload {photo}", "audio remove",
+                        "video_1: trim(0:00, 0:02)", "split video_1 0:01"]:
+            assert engine.execute(command), command
+        assert engine.is_muted('video_1_part1') and engine.is_muted('video_1_part2')
+        assert engine.clips['video_1_part1'].audio is None
+        # Silent sources are not "muted", so they can still be stream-copied
+        assert not engine.is_muted('video_2') and not engine.is_muted('photo_1')
+        assert not engine.is_cut_only()
+
+        project = os.path.join(directory, "muted.vedit")
+        assert engine.execute(f"project save {project}")
+        engine.shutdown()
+        loaded = VideoEditorEngine()
+        assert loaded.execute(f"project load {project}")
+        assert loaded.is_muted('video_1_part2') and loaded.clips['video_1_part2'].audio is None
+        loaded.shutdown()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_export_log_order():
+    """An export job is logged as queued before it is logged as started"""
+    directory = tempfile.mkdtemp()
+    try:
+        video, photo = make_media(directory)
+        engine = VideoEditorEngine()
+        messages = []
+
+        def write_log(message, color="white"):
+            # A slow "queued" log gives an already submitted job time to start
+            if " queued" in message:
+                time.sleep(0.5)
+            messages.append(message)
+
+        engine.write_log = write_log
+        output = os.path.join(directory, "out.mp4")
+        for command in [f"upload {video}", "video_1: trim(0:00, 0:01)", f"export({output})"]:
+            assert engine.execute(command), command
+        jobs = [m.split(':')[0] for m in messages if m.startswith("Export job 1 ")]
+        assert jobs[:2] == ["Export job 1 queued", "Export job 1 started"], messages
+        engine.shutdown()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """Run all tests"""
+    print("VEdit CLI - Project and Recovery Test")
+    print("=" * 40)
+
+    tests = [test_project_round_trip, test_journal_replay, test_settings_recovered,
+             test_mute_survives_edits, test_export_log_order]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+
+    print("=" * 40)
+    print(f"Results: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+VEdit CLI - Edit List Test
+
+Checks the range arithmetic of EditList (vedit_timeline) that every cut,
+trim and split goes through: range edges, edits spanning several ranges and
+edits that leave nothing.
+
+Usage: python test_timeline.py
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vedit_timeline import EditList
+
+# a.mp4 0-4, b.mp4 10-12, a.mp4 6-9: a 9-second timeline with edges at 4 and 6
+THREE = EditList([('a.mp4', 0, 4), ('b.mp4', 10, 12), ('a.mp4', 6, 9)])
+
+
+def ranges(edit_list):
+    """Ranges rounded so float noise does not fail a comparison"""
+    return [(path, round(src_in, 6), round(src_out, 6)) for path, src_in, src_out in edit_list]
+
+
+def test_split_at_edges():
+    """Splits at range edges, inside ranges and at the ends"""
+    before, after = THREE.split(4)
+    assert ranges(before) == [('a.mp4', 0, 4)]
+    assert ranges(after) == [('b.mp4', 10, 12), ('a.mp4', 6, 9)]
+
+    before, after = THREE.split(6)
+    assert ranges(before) == [('a.mp4', 0, 4), ('b.mp4', 10, 12)]
+    assert ranges(after) == [('a.mp4', 6, 9)]
+
+    before, after = THREE.split(5)
+    assert ranges(before) == [('a.mp4', 0, 4), ('b.mp4', 10, 11)]
+    assert ranges(after) == [('b.mp4', 11, 12), ('a.mp4', 6, 9)]
+    assert before.duration + after.duration == THREE.duration
+
+    before, after = THREE.split(0)
+    assert len(before) == 0 and after == THREE
+    before, after = THREE.split(THREE.duration)
+    assert before == THREE and len(after) == 0
+
+
+def test_slice_and_trim():
+    """Slices clamp to the timeline and keep partial ranges at both ends"""
+    assert ranges(THREE.slice(3, 7)) == [('a.mp4', 3, 4), ('b.mp4', 10, 12), ('a.mp4', 6, 7)]
+    assert ranges(THREE.trim(-5, 2)) == [('a.mp4', 0, 2)]
+    assert ranges(THREE.trim(8, 50)) == [('a.mp4', 8, 9)]
+    assert THREE.slice(4, 4).duration == 0
+    assert len(THREE.slice(7, 3)) == 0
+    assert THREE.locate(4) == ('b.mp4', 10)
+    assert THREE.locate(8.5) == ('a.mp4', 8.5)
+
+
+def test_remove_spanning_ranges():
+    """Removes that cross range edges splice the remaining pieces together"""
+    assert ranges(THREE.remove(3, 7)) == [('a.mp4', 0, 3), ('a.mp4', 7, 9)]
+    assert ranges(THREE.remove(4, 6)) == [('a.mp4', 0, 4), ('a.mp4', 6, 9)]
+    assert ranges(THREE.remove(0, 5)) == [('b.mp4', 11, 12), ('a.mp4', 6, 9)]
+    assert THREE.remove(3, 7).duration == THREE.duration - 4
+    assert ranges(THREE.remove(8, 9)) == [('a.mp4', 0, 4), ('b.mp4', 10, 12), ('a.mp4', 6, 8)]
+    assert THREE.remove(5, 5) == THREE and THREE.remove(9, 20) == THREE
+    removed = THREE.remove(4.5, 5)
+    assert removed.starts == [0, 4, 4.5, 5.5] and removed.duration == THREE.duration - 0.5
+
+
+def test_reversed_range():
+    """Removing a range whose end is before its start is an error"""
+    try:
+        THREE.remove(7, 3)
+    except ValueError:
+        pass
+    else:
+        assert False, "remove(7, 3) did not raise"
+    assert THREE.remove(7, 7) == THREE
+
+
+def test_empty_results():
+    """Edits that remove everything give an empty edit list"""
+    for result in [THREE.remove(0, THREE.duration), THREE.remove(-1, 100),
+                   THREE.trim(9, 12), EditList().slice(0, 5), EditList().split(1)[1]]:
+        assert len(result) == 0 and result.duration == 0
+    # Zero-length ranges are dropped
+    assert len(EditList([('a.mp4', 2, 2), ('a.mp4', 3, 1)])) == 0
+
+
+def test_remove_source_ranges():
+    """Source cuts apply to every range that plays them, across range edges"""
+    cuts = {'a.mp4': [(1, 2), (3.5, 7), (8.5, 20)], 'b.mp4': [(9, 10.5)]}
+    assert ranges(THREE.remove_source_ranges(cuts)) == [
+        ('a.mp4', 0, 1), ('a.mp4', 2, 3.5), ('b.mp4', 10.5, 12), ('a.mp4', 7, 8.5)]
+    assert THREE.remove_source_ranges({}) == THREE
+    assert len(THREE.remove_source_ranges({'a.mp4': [(0, 9)], 'b.mp4': [(0, 12)]})) == 0
+
+
+def main():
+    """Run all tests"""
+    print("VEdit CLI - Edit List Test")
+    print("=" * 40)
+
+    tests = [test_split_at_edges, test_slice_and_trim, test_remove_spanning_ranges,
+             test_reversed_range, test_empty_results, test_remove_source_ranges]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+
+    print("=" * 40)
+    print(f"Results: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
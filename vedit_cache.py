@@ -0,0 +1,270 @@
+"""
+VEdit CLI - Artifact Cache
+
+Persistent on-disk cache for derived artifacts: probed metadata, rendered
+text bitmaps, thumbnails, proxies and encoded segments. Entries are keyed by
+a hash of the source content plus the operation parameters, so the same
+work is never redone for the same input, and the directory is kept under
+PERFORMANCE_CONFIG['max_cache_size'] by least-recently-used eviction.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import CONFIG
+
+# Shared cache instance, created on first use
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+# Memoized content hashes keyed by (path, size, mtime)
+_FILE_HASHES = {}
+
+
+def file_hash(file_path):
+    """Fast content hash of a media file (size plus head and tail chunks)"""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _FILE_HASHES:
+        return _FILE_HASHES[memo_key]
+
+    chunk_size = CONFIG['performance']['chunk_size']
+    digest = hashlib.sha1(str(stat.st_size).encode('utf8'))
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(chunk_size))
+        if stat.st_size > chunk_size:
+            f.seek(max(chunk_size, stat.st_size - chunk_size))
+            digest.update(f.read(chunk_size))
+
+    _FILE_HASHES[memo_key] = digest.hexdigest()
+    return _FILE_HASHES[memo_key]
+
+
+class CacheStore:
+    """Size-bounded LRU store of artifact files under one directory"""
+
+    # Entries used this recently are never evicted, so an export can rely on
+    # the artifacts it just looked up until it has finished with them
+    PROTECT_SECONDS = 60
+
+    def __init__(self, directory, max_size, enabled=True):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # relative path -> (size, last access)
+        self.total_size = 0
+        self._sweeper = None
+        self._stop = threading.Event()
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    def _scan(self):
+        """Index existing entries, oldest access first"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.part'):
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, os.path.relpath(path, self.directory), stat.st_size))
+
+        for mtime, rel_path, size in sorted(found):
+            self.entries[rel_path] = (size, mtime)
+            self.total_size += size
+
+    @staticmethod
+    def make_key(source_hash, operation, params=None):
+        """Key for an artifact derived from a source by an operation"""
+        payload = json.dumps([source_hash, operation, params], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf8')).hexdigest()
+
+    def _relative(self, key, ext):
+        return os.path.join(key[:2], key + ext)
+
+    def path_for(self, key, ext):
+        """Final location of an entry (which may not exist yet)"""
+        return os.path.join(self.directory, self._relative(key, ext))
+
+    def lookup(self, key, ext):
+        """Return the path of a cached entry and mark it used, or None"""
+        if not self.enabled:
+            return None
+
+        rel_path = self._relative(key, ext)
+        path = os.path.join(self.directory, rel_path)
+        with self.lock:
+            if rel_path not in self.entries:
+                return None
+            if not os.path.exists(path):
+                size, _ = self.entries.pop(rel_path)
+                self.total_size -= size
+                return None
+            size, _ = self.entries.pop(rel_path)
+            self.entries[rel_path] = (size, time.time())
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def reserve(self, key, ext):
+        """Temporary path to write a new entry to before calling commit()"""
+        path = self.path_for(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path + '.part'
+
+    def commit(self, key, ext, written_path=None):
+        """Move a written artifact into the cache and enforce the size limit"""
+        rel_path = self._relative(key, ext)
+        path = os.path.join(self.directory, rel_path)
+        written_path = written_path or path + '.part'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(written_path, path)
+
+        size = os.path.getsize(path)
+        with self.lock:
+            if rel_path in self.entries:
+                self.total_size -= self.entries.pop(rel_path)[0]
+            self.entries[rel_path] = (size, time.time())
+            self.total_size += size
+
+        self.enforce_limit()
+        return path
+
+    def store_file(self, key, ext, source_path):
+        """Copy an existing file into the cache; returns the cached path"""
+        if not self.enabled:
+            return source_path
+        part_path = self.reserve(key, ext)
+        shutil.copyfile(source_path, part_path)
+        return self.commit(key, ext, part_path)
+
+    def get_json(self, key):
+        """Load a cached JSON document, or None"""
+        path = self.lookup(key, '.json')
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_json(self, key, data):
+        """Store a JSON document"""
+        if not self.enabled:
+            return
+        part_path = self.reserve(key, '.json')
+        with open(part_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        self.commit(key, '.json', part_path)
+
+    def get_array(self, key, mmap_mode=None):
+        """Load a cached NumPy array (optionally memory-mapped), or None"""
+        path = self.lookup(key, '.npy')
+        if path is None:
+            return None
+        try:
+            return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+
+    def put_array(self, key, array):
+        """Store a NumPy array"""
+        if not self.enabled:
+            return
+        part_path = self.reserve(key, '.npy')
+        with open(part_path, 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+        self.commit(key, '.npy', part_path)
+
+    def enforce_limit(self):
+        """Evict least recently used entries until the cache fits max_size"""
+        if not self.enabled:
+            return 0
+
+        evicted = 0
+        cutoff = time.time() - self.PROTECT_SECONDS
+        with self.lock:
+            for rel_path in list(self.entries):
+                if self.total_size <= self.max_size:
+                    break
+                size, last_access = self.entries[rel_path]
+                if last_access > cutoff:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, rel_path))
+                except OSError:
+                    pass
+                del self.entries[rel_path]
+                self.total_size -= size
+                evicted += 1
+        return evicted
+
+    def sweep(self):
+        """Drop abandoned partial writes and enforce the size limit"""
+        cutoff = time.time() - CONFIG['performance']['cleanup_interval']
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if name.endswith('.part') and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+        return self.enforce_limit()
+
+    def start_sweeper(self, interval):
+        """Run sweep() every interval seconds on a daemon thread"""
+        if not self.enabled or self._sweeper is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=loop, name="vedit-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        """Stop the background sweeper"""
+        self._stop.set()
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self.lock:
+            for rel_path in list(self.entries):
+                try:
+                    os.remove(os.path.join(self.directory, rel_path))
+                except OSError:
+                    pass
+            self.entries.clear()
+            self.total_size = 0
+
+    def stats(self):
+        """Return (entry count, total bytes)"""
+        with self.lock:
+            return len(self.entries), self.total_size
+
+
+def get_cache():
+    """Shared CacheStore configured from PERFORMANCE_CONFIG"""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            performance = CONFIG['performance']
+            _CACHE = CacheStore(performance['cache_directory'],
+                                performance['max_cache_size'],
+                                performance['enable_cache'])
+            _CACHE.start_sweeper(performance['cleanup_interval'])
+        return _CACHE
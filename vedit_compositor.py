@@ -0,0 +1,292 @@
+"""
+VEdit CLI - Flat Compositor
+
+Single-pass compositing of overlay and text layers onto the base timeline.
+Instead of nesting one CompositeVideoClip per overlay, every layer is laid
+out once and an interval index maps each frame time straight to the layers
+visible at that time. Visible layers are blended in place into one
+preallocated float buffer, so the cost per frame only depends on the layers
+that are actually on screen.
+
+Text is rendered once with Pillow into premultiplied RGBA bitmaps held in a
+content-addressed cache, and only the text's bounding box is blended.
+"""
+
+import json
+import bisect
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import cv2
+from PIL import Image, ImageDraw, ImageFont
+from moviepy.editor import VideoClip
+from vedit_cache import get_cache
+
+
+def resolve_position(position, size, canvas_size):
+    """Convert a moviepy-style position into a top-left pixel offset
+
+    Accepts 'center', or an (x, y) pair whose items are pixels or one of
+    'left'/'center'/'right' and 'top'/'center'/'bottom'.
+    """
+    w, h = size
+    canvas_w, canvas_h = canvas_size
+
+    if isinstance(position, str):
+        position = (position, position) if position == 'center' else (0, 0)
+
+    x, y = position
+    named_x = {'left': 0, 'center': (canvas_w - w) / 2, 'right': canvas_w - w}
+    named_y = {'top': 0, 'center': (canvas_h - h) / 2, 'bottom': canvas_h - h}
+    x = named_x.get(x, x) if isinstance(x, str) else x
+    y = named_y.get(y, y) if isinstance(y, str) else y
+    return int(round(x)), int(round(y))
+
+
+def scale_position(position, factor):
+    """Pixel offset of a layer on a canvas scaled by factor"""
+    return int(round(position[0] * factor)), int(round(position[1] * factor))
+
+
+def canvas_window(position, size, canvas_shape):
+    """Slices of the canvas and of the layer where they overlap, or None"""
+    canvas_h, canvas_w = canvas_shape[:2]
+    x, y = position
+    w, h = size
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, canvas_w), min(y + h, canvas_h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return ((slice(y0, y1), slice(x0, x1)),
+            (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+
+class CompositeLayer:
+    """One clip placed on the timeline at a fixed pixel position"""
+
+    def __init__(self, clip, start, end, position=(0, 0), fade_in=0.0, fade_out=0.0):
+        self.clip = clip
+        self.start = start
+        self.end = end
+        self.position = position
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.size = tuple(clip.size)
+        self._scratch = np.empty((self.size[1], self.size[0], 3), dtype=np.float32)
+
+    def opacity(self, t):
+        """Layer opacity at local time t from its fade envelope"""
+        opacity = 1.0
+        if self.fade_in > 0:
+            opacity = min(opacity, t / self.fade_in)
+        if self.fade_out > 0:
+            opacity = min(opacity, (self.end - self.start - t) / self.fade_out)
+        return max(0.0, min(1.0, opacity))
+
+    def scaled(self, factor):
+        """The same layer laid out on a canvas scaled by factor (for previews)"""
+        return CompositeLayer(self.clip.resize(factor), self.start, self.end,
+                              scale_position(self.position, factor),
+                              self.fade_in, self.fade_out)
+
+    def blend_into(self, buffer, t):
+        """Blend this layer into the float canvas buffer at local time t"""
+        # Clip the layer rectangle to the canvas
+        window = canvas_window(self.position, self.size, buffer.shape)
+        if window is None:
+            return
+
+        opacity = self.opacity(t)
+        if opacity <= 0:
+            return
+
+        dst_slice, src_slice = window
+        src = self.clip.get_frame(t)[src_slice + (slice(0, 3),)]
+        region = buffer[dst_slice]
+
+        alpha = None
+        if self.clip.mask is not None:
+            alpha = self.clip.mask.get_frame(t)[src_slice]
+
+        if alpha is None and opacity >= 1.0:
+            region[...] = src
+            return
+
+        # region += (src - region) * alpha, reusing the layer's scratch buffer
+        scratch = self._scratch[:region.shape[0], :region.shape[1]]
+        np.subtract(src, region, out=scratch)
+        if alpha is not None:
+            scratch *= alpha[..., None].astype(np.float32, copy=False)
+        if opacity < 1.0:
+            scratch *= opacity
+        region += scratch
+
+
+class TextBitmap:
+    """Premultiplied RGBA rendering of a piece of text"""
+
+    def __init__(self, rgba):
+        rgba = rgba.astype(np.float32)
+        alpha = rgba[..., 3:4] / 255.0
+        self.size = (rgba.shape[1], rgba.shape[0])
+        self.premultiplied = rgba[..., :3] * alpha
+        self.inverse_alpha = 1.0 - alpha
+
+    def scaled(self, factor):
+        """Bitmap resized by factor; premultiplied channels scale linearly"""
+        scaled = TextBitmap.__new__(TextBitmap)
+        w, h = self.size
+        size = (max(1, int(round(w * factor))), max(1, int(round(h * factor))))
+        scaled.size = size
+        scaled.premultiplied = cv2.resize(self.premultiplied, size, interpolation=cv2.INTER_AREA)
+        scaled.inverse_alpha = cv2.resize(self.inverse_alpha, size,
+                                          interpolation=cv2.INTER_AREA)[..., None]
+        return scaled
+
+
+def load_font(font_name, size):
+    """Load a TrueType font by name/path, falling back to common system fonts"""
+    for candidate in [font_name, 'arial.ttf', 'DejaVuSans.ttf']:
+        if not candidate:
+            continue
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def render_text_rgba(text, size, color, stroke_color, stroke_width, bg_color, font_name):
+    """Rasterize text with Pillow into an RGBA array cropped to its bounding box"""
+    font = load_font(font_name, size)
+    left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox(
+        (0, 0), text, font=font, stroke_width=stroke_width)
+
+    background = bg_color if bg_color and bg_color != 'transparent' else (0, 0, 0, 0)
+    image = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), background)
+    ImageDraw.Draw(image).text((-left, -top), text, font=font, fill=color,
+                               stroke_width=stroke_width, stroke_fill=stroke_color)
+    return np.asarray(image)
+
+
+class TextBitmapCache:
+    """Content-addressed LRU cache of rendered text bitmaps
+
+    Misses fall back to the on-disk artifact cache before rendering, so text
+    is rasterized once per style across sessions.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def key(text, size, color, stroke_color, stroke_width, bg_color, font_name):
+        """Hash of everything that affects the rendered pixels"""
+        params = [text, size, color, stroke_color, stroke_width, bg_color, font_name]
+        return hashlib.sha1(json.dumps(params).encode('utf8')).hexdigest()
+
+    def get(self, text, size, color, stroke_color=None, stroke_width=0,
+            bg_color=None, font_name=None):
+        """Return the bitmap for the given text style, rendering it on a miss"""
+        key = self.key(text, size, color, stroke_color, stroke_width, bg_color, font_name)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        disk_cache = get_cache()
+        disk_key = disk_cache.make_key(None, 'text_bitmap', key)
+        rgba = disk_cache.get_array(disk_key)
+        if rgba is None:
+            rgba = render_text_rgba(text, size, color, stroke_color,
+                                    stroke_width, bg_color, font_name)
+            disk_cache.put_array(disk_key, rgba)
+
+        bitmap = TextBitmap(rgba)
+        self.entries[key] = bitmap
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return bitmap
+
+
+# Shared by every export and preview in the process
+TEXT_CACHE = TextBitmapCache()
+
+
+class BitmapLayer:
+    """Static premultiplied bitmap placed on the timeline"""
+
+    def __init__(self, bitmap, start, end, position=(0, 0)):
+        self.bitmap = bitmap
+        self.start = start
+        self.end = end
+        self.position = position
+        self.size = bitmap.size
+
+    def scaled(self, factor):
+        """The same layer laid out on a canvas scaled by factor (for previews)"""
+        return BitmapLayer(self.bitmap.scaled(factor), self.start, self.end,
+                           scale_position(self.position, factor))
+
+    def blend_into(self, buffer, t):
+        """Blend the bitmap over its bounding box: dst = dst * (1 - a) + src"""
+        window = canvas_window(self.position, self.size, buffer.shape)
+        if window is None:
+            return
+
+        dst_slice, src_slice = window
+        region = buffer[dst_slice]
+        region *= self.bitmap.inverse_alpha[src_slice]
+        region += self.bitmap.premultiplied[src_slice]
+
+
+class FlatCompositor(VideoClip):
+    """Video clip drawing a list of layers over a base clip in one pass"""
+
+    def __init__(self, base, layers):
+        VideoClip.__init__(self, duration=base.duration)
+        self.base = base
+        self.layers = list(layers)
+        self.size = base.size
+        self.fps = getattr(base, 'fps', None)
+        self.audio = base.audio
+
+        # Interval index: layer sets for each span between layer boundaries
+        self._bounds = sorted(set([l.start for l in self.layers] + [l.end for l in self.layers]))
+        self._active = [[l for l in self.layers if l.start <= bound < l.end]
+                        for bound in self._bounds]
+
+        w, h = self.size
+        self._buffer = np.empty((h, w, 3), dtype=np.float32)
+        self._output = np.empty((h, w, 3), dtype=np.uint8)
+        self.make_frame = self.render_frame
+
+    def active_layers(self, t):
+        """Layers visible at timeline time t, in stacking order"""
+        index = bisect.bisect_right(self._bounds, t) - 1
+        if index < 0:
+            return []
+        return self._active[index]
+
+    def blend_frame(self, t, frame):
+        """Composite the active layers over an already decoded base frame"""
+        active = self.active_layers(t)
+        if not active:
+            return frame
+
+        np.copyto(self._buffer, frame[:, :, :3], casting='unsafe')
+        for layer in active:
+            layer.blend_into(self._buffer, t - layer.start)
+        np.rint(self._buffer, out=self._buffer)
+        np.clip(self._buffer, 0, 255, out=self._buffer)
+        np.copyto(self._output, self._buffer, casting='unsafe')
+        return self._output
+
+    def render_frame(self, t):
+        """Frame at time t (the returned array is reused by the next call)"""
+        return self.blend_frame(t, self.base.get_frame(t))
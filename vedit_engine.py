@@ -0,0 +1,2097 @@
+"""
+VEdit CLI - Editing Engine
+
+GUI-free command interpreter for VEdit CLI. The engine holds the project
+state and every command handler; the Tk front-end in vedit_cli.py subclasses
+it and only overrides the output hooks. This module must not import tkinter
+or customtkinter so it can run on machines without a display.
+
+Usage: python vedit_engine.py [script_file]   (reads stdin when omitted)
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import queue
+import shutil
+import tempfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from moviepy.editor import *
+from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+import cv2
+from config import CONFIG
+from vedit_export import (export_segmented, export_stream_copy, can_fork_workers, export_workers,
+                          uses_segments)
+from vedit_renditions import parse_rendition, export_renditions
+from vedit_reframe import AspectView, aspect_key, parse_aspect, parse_position
+from vedit_pipeline import write_pipelined, frame_count
+from vedit_compositor import FlatCompositor, CompositeLayer, BitmapLayer, TEXT_CACHE, resolve_position
+from vedit_cache import get_cache, file_hash
+from vedit_project import write_project, read_project, is_project_file, PROJECT_SETTINGS
+from vedit_parser import CommandParser, ParseError
+from vedit_journal import SessionJournal, find_crashed_sessions, prune_sessions, read_session
+from vedit_media import (create_proxy, probe_streams, probe_media, seed_probe, LazyVideoClip,
+                         LazyAudioFileClip, READER_POOL)
+from vedit_timeline import EditList, clip_from_edit_list, is_still_image
+from vedit_jobs import (ExportQueue, JobCancelled, ExportProgress, find_interrupted_exports,
+                        TIMELINE_FILE, RESUME_SETTINGS, COMPLETED, CANCELLED, FAILED)
+from vedit_preview import PreviewRenderer, PreviewSource
+from vedit_index import MediaIndex, edit_list_peaks, sparkline
+from vedit_scenes import detect_scenes
+from vedit_mixer import AudioMix, MIX_SAMPLE_RATE
+from vedit_silence import detect_silence
+
+# Verb -> (handler method, whether it takes the parsed Command)
+COMMAND_TABLE = {
+    'upload': ('handle_upload', True),
+    'remove': ('handle_clip_manipulation', True),
+    'trim': ('handle_clip_manipulation', True),
+    'merge_all': ('handle_merge', True),
+    'export': ('handle_export', True),
+    'export_settings': ('handle_export_settings', True),
+    'overlay': ('handle_overlay', True),
+    'overlay_settings': ('handle_overlay_settings', True),
+    'text': ('handle_text_overlay', True),
+    'reframe': ('handle_reframe', True),
+    'audio': ('handle_audio', True),
+    'split': ('handle_split', True),
+    'gif': ('handle_gif_overlay', True),
+    'project': ('handle_project', True),
+    'proxy': ('handle_proxy', True),
+    'cache': ('handle_cache', True),
+    'preview': ('handle_preview', True),
+    'help': ('show_help', False),
+    'clear': ('clear_output', False),
+    'list': ('list_clips', False),
+    'quit': ('quit', False),
+}
+
+# Commands that never change project state and so are not journaled
+UNJOURNALED_COMMANDS = {'help', 'clear', 'list', 'export', 'cache', 'preview', 'quit'}
+
+def is_journaled(cmd):
+    """Whether replaying a parsed command is needed to rebuild the session"""
+    if cmd.verb in UNJOURNALED_COMMANDS:
+        return False
+    if cmd.verb == 'project':
+        # Saves and recovery change nothing; a bare load opens a dialog and
+        # journals the chosen file itself
+        return cmd.word(0) == 'new' or (cmd.word(0) == 'load' and len(cmd.args) > 1)
+    if cmd.verb == 'upload':
+        return cmd.word(0) != 'dialog'
+    return True
+
+class VideoEditorEngine:
+    def __init__(self, background=False, journal=False):
+        self.clips = {}
+        self.audio_clips = {}
+        self.photo_clips = {}
+        self.current_project = None
+        self.output_path = None
+        self.transition_type = "dissolve"
+        self.overlay_clips = []
+        self.text_overlays = []
+        self.audio_overdubs = []
+        self.reframes = {}              # aspect 'W:H' -> [[time, crop position], ...]
+        
+        # This session's copy of VIDEO_CONFIG: settings commands and loaded
+        # or recovered projects change it, never the shared CONFIG['video']
+        self.video_config = dict(CONFIG['video'])
+        
+        # Source ranges (path, in, out) of clips that have only been cut
+        self.clip_sources = {}
+        self.clip_recipes = {}
+        
+        # Proxy files by original path, and finished background proxy jobs
+        self.proxies = {}
+        self.proxy_jobs = set()
+        self.proxy_results = queue.Queue()
+        
+        # Filmstrip/waveform indexes by source path, built in the background
+        self.media_indexes = {}
+        self.index_jobs = set()
+        self.index_pool = None
+        
+        # Exports run as queued jobs; headless sessions wait for each one
+        self.background = background
+        self.export_jobs = ExportQueue()
+        
+        # Thumbnail previews, decoded on a background thread; edit_version
+        # changes with every edit so cached project frames go stale
+        self.previewer = PreviewRenderer(self.show_preview_frame, log=self.log,
+                                         index_lookup=self.media_indexes.get)
+        self.preview_target = None
+        self.edit_version = 0
+        self.status = "Ready"
+        
+        # Command table resolved to bound handlers once, for O(1) dispatch
+        self.parser = CommandParser(COMMAND_TABLE, CONFIG['command']['aliases'])
+        self.commands = {verb: (getattr(self, name), takes_command)
+                         for verb, (name, takes_command) in COMMAND_TABLE.items()}
+        self.running = True
+        
+        # The thread running a command, and whether that command logged an error
+        self.command_thread = None
+        self.command_failed = False
+        
+        # Crash-recovery journal (interactive sessions only)
+        self.replaying = False
+        self.journal = None
+        if journal:
+            self.journal = SessionJournal(CONFIG['error']['recovery_directory'])
+        
+    def log(self, message, color="white"):
+        """Log a message; an error (red) from the running command marks it failed"""
+        if threading.current_thread() is self.command_thread:
+            if color == "red":
+                self.command_failed = True
+            if self.replaying:
+                # Replayed commands were logged when they first ran
+                return
+        self.write_log(message, color)
+        
+    def write_log(self, message, color="white"):
+        """Write a log message to stdout with timestamp"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print(f"[{timestamp}] {message}", flush=True)
+        
+    def set_status(self, text):
+        """Record the current status line"""
+        self.status = text
+        
+    def clear_output(self):
+        """Clear the output display (no-op without a GUI)"""
+        pass
+        
+    def update_project_info(self):
+        """Update the project information display (no-op without a GUI)"""
+        pass
+        
+    def update_preview(self, clip_name=None):
+        """Update the preview panel (no-op without a GUI)"""
+        pass
+        
+    def ask_open_filename(self, **options):
+        """Ask the user for a file to open; headless sessions cannot prompt"""
+        self.log("File dialogs are not available in headless mode, pass a path instead", "yellow")
+        return None
+        
+    def ask_save_filename(self, **options):
+        """Ask the user for a file to save to; headless sessions cannot prompt"""
+        self.log("File dialogs are not available in headless mode, pass a path instead", "yellow")
+        return None
+        
+    def execute(self, command):
+        """Execute a single command, logging instead of raising errors"""
+        command = command.strip()
+        if not command:
+            return False
+            
+        self.log(f"vedit> {command}", "green")
+        
+        self.command_thread = threading.current_thread()
+        self.command_failed = False
+        try:
+            self.apply_ready_proxies()
+            cmd = self.parse_and_execute(command)
+        except Exception as e:
+            self.log(f"Error: {str(e)}", "red")
+            return False
+        finally:
+            self.command_thread = None
+            
+        # Handlers report failure by logging an error; only commands that
+        # worked are journaled
+        if self.command_failed:
+            return False
+        if cmd is not None and is_journaled(cmd):
+            self.edit_version += 1
+            self.record(command)
+        return True
+            
+    def record(self, command):
+        """Journal a state-changing command and snapshot when one is due"""
+        if self.journal is None or self.replaying:
+            return
+        self.journal.append(command)
+        if self.journal.snapshot_due() or command.lower().startswith("project"):
+            self.write_snapshot()
+            
+    def write_snapshot(self):
+        """Compact the journal into a snapshot of the current timeline"""
+        timeline = self.project_timeline(warn=False)
+        if timeline['skipped']:
+            # The snapshot would lose clips only the journal can rebuild
+            self.journal.last_snapshot = time.time()
+            return
+        try:
+            self.journal.write_snapshot(self.project_manifest(timeline), timeline)
+        except Exception as e:
+            self.log(f"Autosave failed: {str(e)}", "red")
+            
+    def check_recovery(self):
+        """Tell the user about sessions that ended in a crash"""
+        exclude = self.journal.directory if self.journal else None
+        sessions = find_crashed_sessions(CONFIG['error']['recovery_directory'], exclude)
+        if sessions:
+            prune_sessions(sessions, max(1, CONFIG['error']['max_backup_files']))
+            self.log("An unfinished session was found. Type 'project recover' to restore it.", "yellow")
+            
+        exports = self.interrupted_exports()
+        if exports:
+            prune_sessions(exports, max(1, CONFIG['error']['max_interrupted_exports']))
+            exports = exports[:max(1, CONFIG['error']['max_interrupted_exports'])]
+            self.log(f"{len(exports)} export(s) were interrupted. Type 'export resume [n]' "
+                     "to finish one:", "yellow")
+            for number, work_dir in enumerate(exports, 1):
+                progress = ExportProgress(work_dir)
+                self.log(f"  {number}: {progress.data.get('output_file')} "
+                         f"({progress.segments_done()} segment(s) finished)", "yellow")
+            
+    def recover_session(self):
+        """Rebuild the newest crashed session from its snapshot and journal"""
+        exclude = self.journal.directory if self.journal else None
+        sessions = find_crashed_sessions(CONFIG['error']['recovery_directory'], exclude)
+        if not sessions:
+            self.log("No unfinished session to recover", "yellow")
+            return
+            
+        started = time.time()
+        manifest, timeline, commands = read_session(sessions[0])
+        self.new_project()
+        if timeline is not None:
+            missing = self.check_project_sources(manifest['sources'])
+            self.restore_timeline(timeline, missing)
+            
+        # Replay the journal tail without journaling or logging it again
+        self.replaying = True
+        failures = 0
+        try:
+            for command in commands:
+                self.command_failed = False
+                try:
+                    self.parse_and_execute(command)
+                except Exception:
+                    self.command_failed = True
+                if self.command_failed:
+                    failures += 1
+        finally:
+            self.replaying = False
+            self.command_failed = False
+            
+        if self.journal is not None:
+            self.write_snapshot()
+        shutil.rmtree(sessions[0], ignore_errors=True)
+        
+        self.log(f"Recovered session: {len(commands)} command(s) replayed "
+                 f"in {time.time() - started:.2f}s", "green")
+        if failures:
+            self.log(f"{failures} command(s) could not be replayed", "yellow")
+        self.update_project_info()
+        
+    def shutdown(self):
+        """Stop export jobs and close the session journal cleanly (nothing left to recover)"""
+        if self.export_jobs.cancel_all(interrupt=True):
+            self.log("Stopping running exports (resume them with 'export resume')...", "yellow")
+        self.export_jobs.shutdown(wait=True)
+        self.previewer.close()
+        if self.index_pool is not None:
+            self.index_pool.shutdown(wait=False, cancel_futures=True)
+        if self.journal is not None:
+            self.journal.close(clean=True)
+            self.journal = None
+            
+    def run_script(self, lines):
+        """Execute command lines, skipping blanks and # comments; returns how many failed"""
+        failures = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not self.execute(line):
+                failures += 1
+            if not self.running:
+                break
+        return failures
+        
+    def parse_and_execute(self, command):
+        """Parse and execute the command; returns the parsed Command or None"""
+        try:
+            cmd = self.parser.parse(command)
+        except ParseError as e:
+            self.log(str(e), "red")
+            return None
+        if cmd is None:
+            return None
+            
+        handler, takes_command = self.commands[cmd.verb]
+        if takes_command:
+            handler(cmd)
+        else:
+            handler()
+        return cmd
+        
+    def quit(self):
+        """End the session (stops a running script)"""
+        self.running = False
+        self.log("Goodbye")
+            
+    def handle_upload(self, cmd):
+        """Handle upload commands"""
+        # The path is the rest of the line, as typed
+        file_path = cmd.rest(0)
+        if not file_path:
+            self.log("Usage: upload <file_path>", "yellow")
+            return
+            
+        # Open file dialog if path is not provided
+        if file_path.lower() == "dialog":
+            file_path = self.ask_open_filename(
+                title="Select video/audio/photo file",
+                filetypes=[
+                    ("Video files", "*.mp4 *.avi *.mov *.mkv *.wmv"),
+                    ("Audio files", "*.mp3 *.wav *.aac *.flac"),
+                    ("Image files", "*.jpg *.jpeg *.png *.bmp *.gif"),
+                    ("All files", "*.*")
+                ]
+            )
+            if file_path:
+                self.record(f"upload {file_path}")
+            
+        if not file_path or not os.path.exists(file_path):
+            self.log(f"File not found: {file_path}", "red")
+            return
+            
+        try:
+            file_ext = Path(file_path).suffix.lower()
+            
+            if file_ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv']:
+                # Video file (metadata only; decoding starts on first frame)
+                clip = LazyVideoClip(file_path)
+                clip_name = f"video_{len(self.clips) + 1}"
+                self.clips[clip_name] = clip
+                self.clip_sources[clip_name] = EditList.from_file(file_path, clip.duration)
+                self.log(f"Uploaded video: {clip_name} ({clip.duration:.2f}s)")
+                self.start_index(file_path)
+                if self.video_config['proxy_mode']:
+                    self.start_proxy(file_path)
+                self.update_preview(clip_name)
+                self.update_project_info()
+                
+            elif file_ext in ['.mp3', '.wav', '.aac', '.flac']:
+                # Audio file
+                audio = LazyAudioFileClip(file_path)
+                audio_name = f"audio_{len(self.audio_clips) + 1}"
+                self.audio_clips[audio_name] = audio
+                self.log(f"Uploaded audio: {audio_name} ({audio.duration:.2f}s)")
+                self.start_index(file_path)
+                self.update_project_info()
+                
+            elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif']:
+                # Image file
+                if file_ext == '.gif':
+                    clip = LazyVideoClip(file_path)
+                else:
+                    # Convert image to video clip
+                    img = Image.open(file_path)
+                    # Create a 3-second video from image
+                    clip = ImageClip(file_path, duration=3)
+                    
+                photo_name = f"photo_{len(self.photo_clips) + 1}"
+                self.photo_clips[photo_name] = clip
+                self.clip_sources[photo_name] = EditList.from_file(file_path, clip.duration)
+                self.log(f"Uploaded photo: {photo_name} ({clip.duration:.2f}s)")
+                self.start_index(file_path)
+                self.update_project_info()
+                
+        except Exception as e:
+            self.log(f"Error uploading file: {str(e)}", "red")
+            
+    def handle_clip_manipulation(self, cmd):
+        """Handle clip manipulation commands like remove and trim"""
+        if not cmd.target or not cmd.call:
+            self.log("Usage: clip_name: remove(start_time, end_time)", "yellow")
+            return
+            
+        clip_name, operation = cmd.target.lower(), cmd.verb
+        
+        # Find the clip
+        clip = None
+        if clip_name in self.clips:
+            clip = self.clips[clip_name]
+        elif clip_name in self.photo_clips:
+            clip = self.photo_clips[clip_name]
+        else:
+            self.log(f"Clip '{clip_name}' not found", "red")
+            return
+            
+        if operation == "remove" and cmd.word(0) == "silence":
+            self.remove_silence(clip_name, cmd.args[1:])
+            return
+            
+        # Parse time range
+        times = cmd.args
+        if len(times) != 2:
+            self.log("Time range must be in format: start_time, end_time", "yellow")
+            return
+            
+        try:
+            start_time = self.parse_time(times[0].strip())
+            end_time = self.parse_time(times[1].strip())
+            
+            if clip_name in self.clip_sources:
+                # Cut the edit list and play it flat instead of nesting subclips
+                edit_list = self.clip_sources[clip_name]
+                if operation == "remove":
+                    edit_list = edit_list.remove(start_time, end_time)
+                else:
+                    edit_list = edit_list.trim(start_time, end_time)
+                if not edit_list:
+                    self.log("Edit would leave the clip empty", "red")
+                    return
+                self.clip_sources[clip_name] = edit_list
+                new_clip = self.build_clip(edit_list, self.is_muted(clip_name),
+                                           self.video_config['proxy_mode'])
+                if clip_name in self.clips:
+                    self.clips[clip_name] = new_clip
+                else:
+                    self.photo_clips[clip_name] = new_clip
+                self.log(f"Modified {clip_name}: {operation}({start_time:.2f}s, {end_time:.2f}s)")
+                return
+                
+            if operation == "remove":
+                # Remove the specified section
+                if start_time == 0:
+                    # Remove from beginning
+                    new_clip = clip.subclip(end_time, clip.duration)
+                elif end_time >= clip.duration:
+                    # Remove from end
+                    new_clip = clip.subclip(0, start_time)
+                else:
+                    # Remove middle section
+                    part1 = clip.subclip(0, start_time)
+                    part2 = clip.subclip(end_time, clip.duration)
+                    new_clip = concatenate_videoclips([part1, part2])
+                    
+            elif operation == "trim":
+                # Trim to specified range
+                new_clip = clip.subclip(start_time, end_time)
+                
+            # Update the clip
+            if clip_name in self.clips:
+                self.clips[clip_name] = new_clip
+            else:
+                self.photo_clips[clip_name] = new_clip
+            # The recipe no longer describes the edited clip
+            self.clip_recipes.pop(clip_name, None)
+                
+            self.log(f"Modified {clip_name}: {operation}({start_time:.2f}s, {end_time:.2f}s)")
+            
+        except Exception as e:
+            self.log(f"Error processing clip: {str(e)}", "red")
+            
+    def parse_time(self, time_str):
+        """Parse time string (MM:SS or SS format) to seconds"""
+        if ':' in time_str:
+            parts = time_str.split(':')
+            if len(parts) == 2:
+                return int(parts[0]) * 60 + float(parts[1])
+            elif len(parts) == 3:
+                return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+        return float(time_str)
+        
+    def handle_merge(self, cmd):
+        """Handle merge commands"""
+        # merge_all, merge_all() and merge_all(transition_type)
+        if not cmd.args:
+            self.transition_type = "dissolve"
+            self.log("Merge transition set to: dissolve (default)")
+            return
+            
+        if cmd.call and len(cmd.args) == 1 and re.fullmatch(r'\w+', cmd.args[0]):
+            transition = cmd.word(0)
+            self.transition_type = transition
+            self.log(f"Merge transition set to: {transition}")
+        else:
+            self.log("Usage: merge_all or merge_all(transition_type)", "yellow")
+            
+    def handle_export(self, cmd):
+        """Handle export commands"""
+        if not cmd.call:
+            action = cmd.word(0)
+            job = None
+            if action == "status":
+                self.show_export_status(cmd.word(1))
+            elif action == "cancel" and cmd.word(1):
+                self.cancel_export(cmd.word(1))
+            elif action == "resume":
+                job = self.resume_export(cmd.word(1))
+            else:
+                self.log("Usage: export(output_path[, rendition, ...]) | export status [job_id] | "
+                         "export cancel <job_id|all> | export resume [n]", "yellow")
+            if job is not None and not self.background:
+                self.wait_for_export(job)
+            return
+            
+        if not cmd.args or not cmd.args[0].strip():
+            self.log("Usage: export(output_path[, rendition, ...])", "yellow")
+            return
+            
+        output_path = cmd.args[0].strip()
+        
+        # Extra arguments are renditions encoded from the same decode (e.g. 1080p, 720p@2500k)
+        renditions = []
+        for spec in cmd.args[1:]:
+            try:
+                renditions.append(parse_rendition(spec.strip(), self.video_config))
+            except ValueError as e:
+                self.log(str(e), "red")
+                return
+        if len({r['name'] for r in renditions}) != len(renditions):
+            self.log("Each rendition can only be exported once", "red")
+            return
+        
+        # Create output directory if it doesn't exist
+        os.makedirs(output_path, exist_ok=True)
+        
+        self.output_path = output_path
+        self.log(f"Export path set to: {output_path}")
+        
+        # Queue the export (headless runs block until it is done)
+        job = self.export_project(renditions=renditions or None)
+        if job is not None and not self.background:
+            self.wait_for_export(job)
+            
+    def wait_for_export(self, job):
+        """Block until an export job ends; a failed job fails the command that queued it"""
+        job.wait()
+        if job.state == FAILED:
+            self.command_failed = True
+            
+    def show_export_status(self, job_id=""):
+        """Log the state and progress of export jobs"""
+        if job_id:
+            job = self.export_jobs.get(int(job_id)) if job_id.isdigit() else None
+            if job is None:
+                self.log(f"No export job {job_id}", "red")
+                return
+            jobs = [job]
+        else:
+            jobs = self.export_jobs.list()
+            if not jobs:
+                self.log("No export jobs")
+                return
+            self.log(f"Export jobs ({len(self.export_jobs.active())} active, "
+                     f"{self.export_jobs.max_jobs} at a time):", "cyan")
+        for job in jobs:
+            self.log(f"  {job.describe()}")
+            
+    def cancel_export(self, job_id):
+        """Cancel one export job, or all of them"""
+        if job_id == "all":
+            count = self.export_jobs.cancel_all()
+            self.log(f"Cancelling {count} export job(s)", "yellow")
+            return
+        job = self.export_jobs.get(int(job_id)) if job_id.isdigit() else None
+        if job is None:
+            self.log(f"No export job {job_id}", "red")
+        elif job.cancel():
+            self.log(f"Cancelling export job {job.id}", "yellow")
+        else:
+            self.log(f"Export job {job.id} already {job.state}", "yellow")
+            
+    def handle_export_settings(self, cmd):
+        """Handle export settings commands"""
+        video_config = self.video_config
+        action, value = cmd.word(0), cmd.word(1)
+        
+        if action == "show":
+            # Show current settings
+            performance = CONFIG['performance']
+            self.log("Current export settings:", "cyan")
+            self.log(f"  Mode: {video_config['export_mode']}")
+            self.log(f"  Incremental: {'on' if video_config['incremental_export'] else 'off'}"
+                     " (segmented mode only)")
+            if video_config['export_mode'] == 'segmented' and not can_fork_workers():
+                self.log("  Segmented export needs fork() support; exports use the single encoder",
+                         "yellow")
+            self.log(f"  Segment split: {video_config['segment_split']}")
+            self.log(f"  Segment duration: {video_config['segment_duration']}s")
+            self.log(f"  Keyframe interval: {video_config['keyframe_interval']}s")
+            self.log(f"  Workers: {performance['max_threads'] if performance['use_multithreading'] else 1}")
+            
+        elif action == "mode":
+            if value in ['single', 'segmented']:
+                video_config['export_mode'] = value
+                self.log(f"Export mode set to: {value}", "green")
+            else:
+                self.log("Usage: export_settings mode [single|segmented]", "yellow")
+                
+        elif action == "incremental":
+            if value in ['on', 'off']:
+                video_config['incremental_export'] = value == 'on'
+                self.log(f"Incremental export: {value}", "green")
+            else:
+                self.log("Usage: export_settings incremental [on|off]", "yellow")
+                
+        elif action == "split":
+            if value in ['interval', 'clips']:
+                video_config['segment_split'] = value
+                self.log(f"Segment split set to: {value}", "green")
+            else:
+                self.log("Usage: export_settings split [interval|clips]", "yellow")
+                
+        elif action == "segment":
+            if re.fullmatch(r'\d+(?:\.\d+)?', value) and float(value) > 0:
+                video_config['segment_duration'] = float(value)
+                self.log(f"Segment duration set to: {float(value)}s", "green")
+            else:
+                self.log("Usage: export_settings segment <seconds>", "yellow")
+        else:
+            self.log("Usage:", "yellow")
+            self.log("  export_settings show")
+            self.log("  export_settings mode [single|segmented]")
+            self.log("  export_settings incremental [on|off]")
+            self.log("  export_settings split [interval|clips]")
+            self.log("  export_settings segment <seconds>")
+            
+    def export_project(self, resume_dir=None, renditions=None):
+        """Queue an export of the project; returns its ExportJob, or None
+
+        resume_dir is the job directory of an interrupted export of this
+        timeline, whose finished segments are reused. renditions (from
+        parse_rendition) export one file per rendition instead of one file.
+        """
+        try:
+            if not self.clips and not self.photo_clips:
+                self.log("No clips to export", "red")
+                return None
+                
+            settings = None
+            if resume_dir:
+                # The resumed job alone uses the settings the export was started with
+                progress = ExportProgress(resume_dir)
+                output_file = progress.data['output_file']
+                settings = progress.data.get('settings')
+            else:
+                # Generate output filename
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_file = self.unique_output_file(
+                    os.path.join(self.output_path, f"vedit_export_{timestamp}.mp4"))
+            
+            # Compose now so edits made while the job waits do not leak into it
+            render = self.prepare_export(output_file, renditions, settings)
+            
+            # Progress is kept per segment; single-pass and rendition exports have none to resume
+            work_dir = resume_dir
+            if (work_dir is None and CONFIG['error']['resumable_exports'] and not renditions
+                    and uses_segments(self.video_config)):
+                work_dir = self.create_export_dir(output_file)
+                
+        except Exception as e:
+            self.log(f"Export error: {str(e)}", "red")
+            self.set_status("Export failed")
+            return None
+            
+        job = self.export_jobs.submit(output_file, render,
+                                      on_progress=self.report_export_progress,
+                                      on_finish=self.finish_export,
+                                      work_dir=work_dir,
+                                      on_queued=self.report_export_queued)
+        return job
+        
+    def create_export_dir(self, output_file):
+        """Job directory of a resumable export, holding the timeline as submitted"""
+        root = CONFIG['error']['recovery_directory']
+        os.makedirs(root, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        work_dir = os.path.abspath(tempfile.mkdtemp(prefix=f"export_{stamp}_", dir=root))
+        timeline = self.project_timeline(warn=False)
+        write_project(os.path.join(work_dir, TIMELINE_FILE), self.project_manifest(timeline), timeline)
+        progress = ExportProgress(work_dir)
+        progress.data['output_file'] = os.path.abspath(output_file)
+        progress.data['settings'] = {key: self.video_config[key] for key in RESUME_SETTINGS}
+        progress.save()
+        return work_dir
+        
+    def interrupted_exports(self):
+        """Job directories of unfinished resumable exports, newest first"""
+        active = [job.work_dir for job in self.export_jobs.active()]
+        return find_interrupted_exports(CONFIG['error']['recovery_directory'], active)
+        
+    def resume_export(self, number=""):
+        """Continue an interrupted export from its first unfinished segment"""
+        exports = self.interrupted_exports()
+        if not exports:
+            self.log("No interrupted export to resume", "yellow")
+            return None
+        if number and (not number.isdigit() or not 1 <= int(number) <= len(exports)):
+            self.log(f"Usage: export resume [1-{len(exports)}]", "yellow")
+            return None
+            
+        work_dir = exports[int(number or 1) - 1]
+        try:
+            manifest, timeline = read_project(os.path.join(work_dir, TIMELINE_FILE))
+        except (ValueError, OSError) as e:
+            self.log(f"Cannot resume export: {str(e)}", "red")
+            return None
+            
+        # Finished segments only fit the timeline they were rendered from
+        if self.clips or self.photo_clips:
+            if not self.same_timeline(self.project_timeline(warn=False), timeline):
+                self.log("The interrupted export is of a different timeline. "
+                         "Use 'project new' (after saving) to resume it.", "red")
+                return None
+        else:
+            missing = self.check_project_sources(manifest['sources'])
+            self.restore_timeline(timeline, missing)
+            self.update_project_info()
+            
+        progress = ExportProgress(work_dir)
+        self.log(f"Resuming export of {progress.data['output_file']} "
+                 f"({progress.segments_done()} segment(s) already finished, "
+                 f"with the export settings it was started with)", "cyan")
+        return self.export_project(resume_dir=work_dir)
+        
+    @staticmethod
+    def same_timeline(current, saved):
+        """Whether two project timelines render the same pictures and sound"""
+        ignored = ('name', 'output_path', 'skipped')
+        def normalized(timeline):
+            return json.dumps({key: value for key, value in timeline.items() if key not in ignored},
+                              sort_keys=True, default=str)
+        return normalized(current) == normalized(saved)
+        
+    def unique_output_file(self, output_file):
+        """Avoid clobbering an existing file or another job's output"""
+        taken = {job.output_file for job in self.export_jobs.active()}
+        base, ext = os.path.splitext(output_file)
+        candidate, n = output_file, 1
+        while candidate in taken or os.path.exists(candidate):
+            n += 1
+            candidate = f"{base}_{n}{ext}"
+        return candidate
+        
+    def prepare_export(self, output_file, renditions=None, settings=None):
+        """Compose the timeline and return the job function that encodes it
+
+        The job uses the export settings as they are now, with any given
+        settings overriding them; later setting changes do not affect it.
+        """
+        video_config = dict(self.video_config, **(settings or {}))
+        # Cut-only timelines can be stream-copied straight from the sources
+        sources = None
+        if self.is_cut_only() and not renditions:
+            sources = [r for name in self.clips for r in self.clip_sources[name]]
+            
+        # Combine all clips (full-resolution originals, never proxies)
+        all_clips = [self.export_clip(name) for name in self.clips] + list(self.photo_clips.values())
+        
+        if len(all_clips) == 1:
+            final_video = all_clips[0]
+        else:
+            # Apply transitions
+            if self.transition_type == "dissolve":
+                final_video = concatenate_videoclips(all_clips, method="compose")
+            else:
+                final_video = concatenate_videoclips(all_clips)
+                
+        views = overlays = None
+        if renditions:
+            # Renditions share one decode and lay overlays and text out per aspect
+            overlays = self.prepare_overlays()
+            views = [self.aspect_view(final_video, rendition, overlays) for rendition in renditions]
+        else:
+            # Apply overlays and text overlays
+            final_video = self.apply_overlays(final_video)
+        
+        # Overdubs are mixed by the job, before the pictures are encoded
+        audio_mix = self.build_audio_mix(final_video)
+        clip_durations = [clip.duration for clip in all_clips]
+        segmented = not renditions and video_config['export_mode'] == 'segmented'
+        use_segments = not renditions and uses_segments(video_config)
+        fingerprint = None
+        if use_segments and video_config['incremental_export']:
+            fingerprint = self.segment_fingerprinter(list(self.clips) + list(self.photo_clips),
+                                                     clip_durations, final_video, video_config)
+        
+        def render(job):
+            self.set_status(f"Exporting job {job.id}...")
+            self.log(f"Export job {job.id} started", "cyan")
+            
+            if sources is not None:
+                try:
+                    copied = export_stream_copy(sources, output_file, log=self.log, job=job,
+                                                video_config=video_config)
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    self.log(f"Stream copy failed ({str(e)}), rendering instead", "yellow")
+                    copied = False
+                else:
+                    if not copied:
+                        self.log("Sources cannot be stream-copied, rendering instead", "yellow")
+                if copied:
+                    return
+                    
+            progress = ExportProgress(job.work_dir) if job.resumable else None
+            audio_file = None
+            if audio_mix is not None:
+                audio_file = progress.finished_audio('mix') if progress else None
+                if audio_file is None:
+                    audio_file = audio_mix.write(os.path.join(job.work_dir, "mix.m4a"),
+                                                 job.work_dir, job=job, log=self.log)
+                    if progress:
+                        progress.audio_done('mix', audio_file)
+                        
+            if not use_segments and audio_file is None and final_video.audio is not None:
+                # Encoded up front, once; the picture encoders copy it in
+                # (the job's private work dir keeps concurrent exports' audio apart)
+                audio_file = os.path.join(job.work_dir, video_config['temp_audio_file'])
+                final_video.audio.write_audiofile(audio_file, fps=MIX_SAMPLE_RATE, codec='aac', logger=None)
+                
+            if renditions:
+                job.outputs = export_renditions(final_video, output_file, renditions,
+                                                audio_file=audio_file, log=self.log, job=job,
+                                                views=views, overlays=overlays,
+                                                video_config=video_config)
+                return
+                
+            fps = getattr(final_video, 'fps', None) or video_config['default_fps']
+            job.set_total(frame_count(final_video.duration, fps))
+            if use_segments:
+                export_segmented(final_video, output_file,
+                                 clip_durations=clip_durations,
+                                 log=self.log, job=job, audio_file=audio_file,
+                                 fingerprint=fingerprint, progress=progress,
+                                 video_config=video_config)
+            else:
+                if segmented:
+                    self.log("Segmented export needs fork() support, using single encoder", "yellow")
+                    
+                def on_frame(count):
+                    job.check_cancelled()
+                    job.set_done(count)
+                    
+                # Decode, composite and encode run as overlapped stages
+                write_pipelined(final_video, output_file, fps, codec='libx264',
+                                audio_file=audio_file, on_frame=on_frame)
+                                          
+        return render
+        
+    def aspect_view(self, video, rendition, overlays):
+        """AspectView of a rendition: its crop window and its own overlay layout"""
+        aspect = rendition.get('aspect')
+        keyframes = self.reframes.get(aspect_key(aspect), []) if aspect else []
+        
+        def layout(canvas, stand_ins):
+            return (self.build_overlay_layers(canvas, verbose=False, overlays=stand_ins) +
+                    self.build_text_layers(canvas))
+            
+        return AspectView(video.size, video.duration, aspect, keyframes, overlays, layout)
+        
+    def segment_fingerprinter(self, names, clip_durations, video, video_config=None):
+        """fingerprint(start, end) of the pictures of a timeline range, or None
+
+        A fingerprint hashes everything that can change the range's frames:
+        the source ranges (and source contents) playing in it, the overlays
+        active in it, all text, the layout settings and the encoder settings.
+        Ranges showing something that cannot be described get None and are
+        always encoded. video_config defaults to the session's settings.
+        """
+        video_config = video_config or self.video_config
+        
+        def content(description):
+            # Source files by content, so replacing a file changes the hash
+            if description is None:
+                return None
+            description = dict(description)
+            description.pop('muted', None)
+            if description['type'] == 'edit_list':
+                description['edit_list'] = [[file_hash(path), src_in, src_out]
+                                            for path, src_in, src_out in description['edit_list']]
+            return {key: file_hash(value) if isinstance(value, str) and os.path.isfile(value) else value
+                    for key, value in description.items()}
+            
+        # Snapshot now: the fingerprints describe the timeline as submitted
+        parts = []
+        elapsed = 0.0
+        for name, duration in zip(names, clip_durations):
+            sources = self.clip_sources.get(name)
+            if sources is not None:
+                parts.append((elapsed, elapsed + duration, sources, None))
+            else:
+                parts.append((elapsed, elapsed + duration, None, content(self.describe_clip(name))))
+            elapsed += duration
+            
+        overlays = []
+        for overlay in self.overlay_clips:
+            if overlay.get('sources'):
+                description = {'type': 'edit_list', 'edit_list': [list(r) for r in overlay['sources']]}
+            else:
+                description = overlay.get('recipe')
+            overlays.append((overlay['from_time'], overlay['to_time'],
+                             content(description), overlay['effect']))
+            
+        shared = {'text': list(self.text_overlays),
+                  'transition': self.transition_type,
+                  'size': list(video.size),
+                  'fps': getattr(video, 'fps', None) or video_config['default_fps'],
+                  'settings': {key: value for key, value in video_config.items()
+                               if key.startswith(('overlay_', 'default_'))},
+                  'gop': video_config['keyframe_interval']}
+        
+        def fingerprint(start, end):
+            items = []
+            for part_start, part_end, sources, description in parts:
+                if part_end <= start or part_start >= end:
+                    continue
+                if sources is not None:
+                    local = sources.slice(start - part_start, end - part_start)
+                    description = content({'type': 'edit_list', 'edit_list': list(local)})
+                if description is None:
+                    return None
+                items.append([round(part_start - start, 6), description])
+            for from_time, to_time, description, effect in overlays:
+                if to_time <= start or from_time >= end:
+                    continue
+                if description is None:
+                    return None
+                items.append([round(from_time - start, 6), round(to_time - start, 6), description, effect])
+            return get_cache().make_key(None, 'timeline_segment',
+                                        [round(end - start, 6), items, shared])
+            
+        return fingerprint
+        
+    def report_export_queued(self, job):
+        """Report a job entering the export queue"""
+        self.log(f"Export job {job.id} queued: {job.output_file}", "cyan")
+        
+    def report_export_progress(self, job):
+        """Report every tenth of an export's frames to the log and status line"""
+        step = int(job.fraction() * 10)
+        if step > job.reported_step:
+            job.reported_step = step
+            self.set_status(f"Exporting job {job.id}: {job.fraction():.0%}")
+            if step < 10:
+                self.log(job.describe())
+                
+    def finish_export(self, job):
+        """Report how an export job ended"""
+        if job.state == COMPLETED:
+            self.log(f"Export completed: {', '.join(job.outputs)}", "green")
+            self.set_status("Export completed")
+        elif job.state == CANCELLED:
+            self.log(f"Export job {job.id} cancelled", "yellow")
+            self.set_status("Export cancelled")
+        else:
+            self.log(f"Export error: {job.error}", "red")
+            self.set_status("Export failed")
+            
+    def start_proxy(self, file_path):
+        """Encode (or fetch from cache) a proxy for a source in the background"""
+        if file_path in self.proxies or file_path in self.proxy_jobs:
+            return
+        self.proxy_jobs.add(file_path)
+        
+        def worker():
+            try:
+                self.proxy_results.put((file_path, create_proxy(file_path), None))
+            except Exception as e:
+                self.proxy_results.put((file_path, None, e))
+                
+        threading.Thread(target=worker, daemon=True).start()
+        
+    def start_index(self, file_path):
+        """Build (or load from cache) a source's filmstrip and waveform in the background"""
+        if file_path in self.media_indexes or file_path in self.index_jobs or is_still_image(file_path):
+            return
+        self.index_jobs.add(file_path)
+        if self.index_pool is None:
+            self.index_pool = ThreadPoolExecutor(max_workers=CONFIG['performance']['index_workers'],
+                                                 thread_name_prefix="vedit-index")
+            
+        def worker():
+            try:
+                self.media_indexes[file_path] = MediaIndex.build(file_path)
+            except Exception as e:
+                self.log(f"Indexing failed for {file_path}: {str(e)}", "red")
+            finally:
+                self.index_jobs.discard(file_path)
+                
+        self.index_pool.submit(worker)
+        
+    def clip_waveform(self, name):
+        """Text waveform of a clip or audio file from the indexes ('' until built)"""
+        columns = CONFIG['ui']['list_waveform_columns']
+        if name in self.audio_clips:
+            index = self.media_indexes.get(self.audio_clips[name].filename)
+            return sparkline(index.waveform, columns) if index is not None else ""
+        sources = self.clip_sources.get(name)
+        if not sources or self.is_muted(name):
+            return ""
+        return sparkline(edit_list_peaks(sources, self.media_indexes), columns)
+        
+    def apply_ready_proxies(self):
+        """Swap finished proxies into the clips that use their sources"""
+        while True:
+            try:
+                file_path, proxy_path, error = self.proxy_results.get_nowait()
+            except queue.Empty:
+                break
+                
+            self.proxy_jobs.discard(file_path)
+            if error is not None:
+                self.log(f"Proxy failed for {file_path}: {str(error)}", "red")
+                continue
+            if proxy_path is None:
+                continue
+                
+            self.proxies[file_path] = proxy_path
+            if self.video_config['proxy_mode']:
+                self.rebuild_clips(True, [file_path])
+                self.log(f"Proxy ready: {os.path.basename(file_path)}", "green")
+                
+    def uses_proxies(self, sources):
+        """Whether a clip built from these sources currently plays proxies"""
+        return bool(sources) and self.video_config['proxy_mode'] and \
+            any(path in self.proxies for path, _, _ in sources)
+        
+    def build_clip(self, sources, muted=False, use_proxies=True):
+        """Build a clip from an edit list against proxies or originals"""
+        clip = clip_from_edit_list(sources, self.proxies if use_proxies else None)
+        return clip.without_audio() if muted else clip
+        
+    def is_muted(self, name):
+        """Whether a clip plays without the sound its source files have ('audio remove')"""
+        clip = self.clips.get(name, self.photo_clips.get(name))
+        sources = self.clip_sources.get(name)
+        if clip is None or clip.audio is not None or not sources:
+            return False
+        return any(probe_media(path)['has_audio'] for path in sources.paths())
+        
+    def rebuild_clips(self, use_proxies, paths):
+        """Rebuild the clips playing any of the given source files"""
+        for name, sources in self.clip_sources.items():
+            if name in self.clips and any(path in paths for path, _, _ in sources):
+                self.clips[name] = self.build_clip(sources, self.is_muted(name), use_proxies)
+                
+    def export_clip(self, name):
+        """Clip to render for export, swapping proxies back to originals"""
+        sources = self.clip_sources.get(name)
+        if self.uses_proxies(sources):
+            return self.build_clip(sources, self.is_muted(name), use_proxies=False)
+        return self.clips[name]
+        
+    def handle_proxy(self, cmd):
+        """Handle proxy editing commands"""
+        video_config = self.video_config
+        action = cmd.word(0) if len(cmd.args) == 1 else ' '.join(cmd.args)
+        
+        if action in ["", "show"]:
+            self.log("Proxy editing:", "cyan")
+            self.log(f"  Mode: {'on' if video_config['proxy_mode'] else 'off'}")
+            self.log(f"  Proxy height: {video_config['proxy_height']}px")
+            self.log(f"  Ready: {len(self.proxies)} | Encoding: {len(self.proxy_jobs)}")
+        elif action == "on":
+            video_config['proxy_mode'] = True
+            sources = set(path for edit_list in self.clip_sources.values() for path in edit_list.paths())
+            for path in sources:
+                self.start_proxy(path)
+            self.rebuild_clips(True, self.proxies)
+            self.log("Proxy mode on: editing uses low-resolution proxies, export uses originals", "green")
+        elif action == "off":
+            video_config['proxy_mode'] = False
+            self.rebuild_clips(False, self.proxies)
+            self.log("Proxy mode off: editing uses original media", "green")
+        else:
+            self.log("Usage: proxy [show|on|off]", "yellow")
+            
+    def is_cut_only(self):
+        """Check whether the timeline is only trims/removes/splits of video files"""
+        if not self.video_config['stream_copy_cuts']:
+            return False
+        if self.photo_clips or self.overlay_clips or self.text_overlays or self.audio_overdubs:
+            return False
+        if any(self.is_muted(name) for name in self.clips):
+            return False
+        return bool(self.clips) and all(name in self.clip_sources and self.clip_sources[name]
+                                        for name in self.clips)
+        
+    def handle_overlay(self, cmd):
+        """Handle overlay commands"""
+        # overlay(source, from_time, to_time, effect)
+        if not cmd.call or len(cmd.args) != 4:
+            self.log("Usage: overlay(source, from_time, to_time, effect)", "yellow")
+            return
+            
+        source, from_time, to_time, effect = cmd.args
+        source, effect = source.strip().lower(), effect.lower()
+        
+        try:
+            from_time = self.parse_time(from_time.strip())
+            to_time = self.parse_time(to_time.strip())
+            
+            # Find source clip
+            source_clip = None
+            if source in self.clips:
+                source_clip = self.clips[source]
+            elif source in self.photo_clips:
+                source_clip = self.photo_clips[source]
+            else:
+                self.log(f"Source '{source}' not found", "red")
+                return
+                
+            overlay_info = {
+                'source': source,
+                'clip': source_clip,
+                'recipe': self.clip_recipes.get(source),
+                'sources': self.clip_sources.get(source),
+                'muted': self.is_muted(source),
+                'from_time': from_time,
+                'to_time': to_time,
+                'effect': effect.strip()
+            }
+            
+            self.overlay_clips.append(overlay_info)
+            self.log(f"Overlay added: {source} ({from_time:.2f}s - {to_time:.2f}s) with {effect}")
+            
+        except Exception as e:
+            self.log(f"Error adding overlay: {str(e)}", "red")
+            
+    def apply_overlays(self, base_video):
+        """Apply overlay and text layers to the base video in one flat pass"""
+        layers = self.build_overlay_layers(base_video) + self.build_text_layers(base_video)
+        if not layers:
+            return base_video
+            
+        return FlatCompositor(base_video, layers)
+        
+    def prepare_overlays(self):
+        """Every overlay trimmed to its span: dicts of clip, start, end and fades"""
+        overlays = []
+        
+        for overlay in self.overlay_clips:
+            try:
+                clip = overlay['clip']
+                if self.uses_proxies(overlay.get('sources')):
+                    clip = self.build_clip(overlay['sources'], overlay['muted'], use_proxies=False)
+                from_time = overlay['from_time']
+                to_time = overlay['to_time']
+                effect = overlay['effect']
+                
+                # Trim overlay clip to duration
+                duration = to_time - from_time
+                overlay_clip = clip.subclip(0, min(duration, clip.duration))
+                
+                # Apply effects as opacity fades over the base video
+                fade = self.video_config['default_fade_duration']
+                overlays.append({'clip': overlay_clip, 'start': from_time,
+                                 'end': from_time + overlay_clip.duration,
+                                 'fade_in': fade if effect == "fade-in-out" else 0.0,
+                                 'fade_out': fade if effect in ["fade-in-out", "pop-in-fade-out"] else 0.0})
+                
+            except Exception as e:
+                self.log(f"Error applying overlay: {str(e)}", "red")
+                
+        return overlays
+        
+    def build_overlay_layers(self, base_video, verbose=True, overlays=None):
+        """Lay out every overlay as a compositor layer over the base video
+
+        overlays defaults to prepare_overlays(); reframed exports pass
+        stand-ins for clips they decode themselves.
+        """
+        layers = []
+        
+        if overlays is None:
+            overlays = self.prepare_overlays()
+        for overlay in overlays:
+            try:
+                overlay_clip = overlay['clip']
+                
+                # Resize overlay based on configuration
+                overlay_config = self.video_config
+                
+                # Log original overlay size for debugging
+                original_size = f"{overlay_clip.w}x{overlay_clip.h}"
+                base_size = f"{base_video.w}x{base_video.h}"
+                
+                if overlay_config['overlay_fill_mode'] == 'stretch':
+                    # Stretch to fill entire screen (original behavior)
+                    overlay_clip = overlay_clip.resize(width=base_video.w, height=base_video.h)
+                    if verbose:
+                        self.log(f"Overlay resized (stretch): {original_size} -> {base_size}")
+                else:
+                    # Fit while maintaining aspect ratio (default)
+                    max_size_percent = overlay_config['overlay_max_size_percent'] / 100.0
+                    max_width = int(base_video.w * max_size_percent)
+                    max_height = int(base_video.h * max_size_percent)
+                    
+                    # Calculate aspect ratios
+                    base_aspect = base_video.w / base_video.h
+                    overlay_aspect = overlay_clip.w / overlay_clip.h
+                    
+                    # Resize to fit within bounds while maintaining aspect ratio
+                    if overlay_aspect > base_aspect:
+                        # Overlay is wider - resize by width first
+                        overlay_clip = overlay_clip.resize(width=max_width)
+                        if overlay_clip.h > max_height:
+                            overlay_clip = overlay_clip.resize(height=max_height)
+                    else:
+                        # Overlay is taller - resize by height first
+                        overlay_clip = overlay_clip.resize(height=max_height)
+                        if overlay_clip.w > max_width:
+                            overlay_clip = overlay_clip.resize(width=max_width)
+                    
+                    # Log final size for debugging
+                    final_size = f"{overlay_clip.w}x{overlay_clip.h}"
+                    if verbose:
+                        self.log(f"Overlay resized (fit): {original_size} -> {final_size} (max: {max_width}x{max_height})")
+                
+                position = resolve_position('center', overlay_clip.size, base_video.size)
+                layers.append(CompositeLayer(overlay_clip, overlay['start'], overlay['end'],
+                                             position, overlay['fade_in'], overlay['fade_out']))
+                
+            except Exception as e:
+                self.log(f"Error applying overlay: {str(e)}", "red")
+                
+        return layers
+        
+    def handle_text_overlay(self, cmd):
+        """Handle text overlay commands"""
+        # text("text", position, size, color); quoted text keeps its case and commas
+        if not cmd.call or len(cmd.args) != 4 or not cmd.args[2].strip().isdigit():
+            self.log("Usage: text(\"text\", position, size, color)", "yellow")
+            return
+            
+        text, position, size, color = cmd.args
+        
+        text_info = {
+            'text': text,
+            'position': position.strip().lower(),
+            'size': int(size.strip()),
+            'color': color.strip().lower()
+        }
+        
+        self.text_overlays.append(text_info)
+        self.log(f"Text overlay added: \"{text}\" at {position}")
+        
+    def handle_reframe(self, cmd):
+        """Handle crop windows for aspect ratio renditions"""
+        # reframe [show] | reframe W:H [position | time=position ...] | reframe W:H off
+        if not cmd.args or cmd.word(0) == "show":
+            if not self.reframes:
+                self.log("No reframing set (renditions like 9:16 are cropped at the center)")
+            for aspect, keyframes in self.reframes.items():
+                path = ", ".join(f"{t:.2f}s={position:g}" for t, position in keyframes)
+                self.log(f"  {aspect}: {path}")
+            return
+            
+        try:
+            aspect = aspect_key(parse_aspect(cmd.args[0]))
+            if cmd.word(1) == "off":
+                self.reframes.pop(aspect, None)
+                self.log(f"Reframing for {aspect} removed")
+                return
+                
+            keyframes = []
+            for arg in cmd.args[1:] or ["center"]:
+                if '=' in arg:
+                    when, position = arg.split('=', 1)
+                    keyframes.append([self.parse_time(when), parse_position(position)])
+                elif len(cmd.args) == 2:
+                    keyframes.append([0.0, parse_position(arg)])
+                else:
+                    raise ValueError("Keyframes are written time=position (e.g. 0:05=0.8)")
+        except ValueError as e:
+            self.log(str(e), "red")
+            self.log("Usage: reframe W:H [position | time=position ...] | reframe W:H off", "yellow")
+            return
+            
+        self.reframes[aspect] = sorted(keyframes)
+        if len(keyframes) == 1:
+            self.log(f"{aspect} renditions cropped at position {keyframes[0][1]:g}")
+        else:
+            self.log(f"{aspect} renditions follow {len(keyframes)} crop keyframes")
+            
+    def build_text_layers(self, video):
+        """Lay out every text overlay as a compositor layer over the video"""
+        layers = []
+        
+        text_config = self.video_config
+        
+        for text_info in self.text_overlays:
+            try:
+                # Render (or reuse) the text bitmap
+                bitmap = TEXT_CACHE.get(text_info['text'],
+                                        text_info['size'],
+                                        text_info['color'],
+                                        stroke_color=text_config['default_text_stroke_color'],
+                                        stroke_width=text_config['default_text_stroke_width'],
+                                        bg_color=text_config['default_text_bg_color'],
+                                        font_name=text_config['default_text_font'])
+                                  
+                # Position text
+                if text_info['position'] == 'center':
+                    position = 'center'
+                elif text_info['position'] == 'top':
+                    position = ('center', 50)
+                elif text_info['position'] == 'bottom':
+                    position = ('center', video.h - 100)
+                else:
+                    position = text_info['position']
+                position = resolve_position(position, bitmap.size, video.size)
+                
+                # Text stays on screen for the whole video
+                layers.append(BitmapLayer(bitmap, 0, video.duration, position))
+                
+            except Exception as e:
+                self.log(f"Error applying text overlay: {str(e)}", "red")
+                
+        return layers
+        
+    def handle_audio(self, cmd):
+        """Handle audio commands"""
+        action = cmd.word(0)
+        if action == "remove":
+            # Remove audio from all clips
+            for name, clip in self.clips.items():
+                self.clips[name] = clip.without_audio()
+            for name, clip in self.photo_clips.items():
+                self.photo_clips[name] = clip.without_audio()
+            self.log("Audio removed from all clips")
+            
+        elif action == "overdub":
+            # audio overdub audio_name start_time [gain_db [fade_in [fade_out]]]
+            if 3 <= len(cmd.args) <= 6:
+                audio_name, start_time = cmd.word(1), cmd.args[2]
+                if audio_name in self.audio_clips:
+                    try:
+                        gain_db = float(cmd.arg(3, 0))
+                        fade_in = self.parse_time(cmd.arg(4, "0"))
+                        fade_out = self.parse_time(cmd.arg(5, "0"))
+                    except ValueError:
+                        self.log("Gain is in dB (e.g. -6); fades are times", "red")
+                        return
+                    start_time = self.parse_time(start_time)
+                    self.audio_overdubs.append({
+                        'name': audio_name,
+                        'audio': self.audio_clips[audio_name],
+                        'start_time': start_time,
+                        'gain_db': gain_db,
+                        'fade_in': fade_in,
+                        'fade_out': fade_out
+                    })
+                    details = f", {gain_db:+.1f} dB" if gain_db else ""
+                    if fade_in or fade_out:
+                        details += f", fades {fade_in:.2f}s/{fade_out:.2f}s"
+                    self.log(f"Audio overdub added: {audio_name} at {start_time:.2f}s{details}")
+                else:
+                    self.log(f"Audio '{audio_name}' not found", "red")
+            else:
+                self.log("Usage: audio overdub audio_name start_time [gain_db [fade_in [fade_out]]]", "yellow")
+                
+    def build_audio_mix(self, video):
+        """AudioMix of the video's audio and the overdubs, or None without overdubs"""
+        if not self.audio_overdubs:
+            return None
+            
+        mix = AudioMix(video.duration, video.audio)
+        for overdub in self.audio_overdubs:
+            try:
+                mix.add(overdub['audio'].filename, overdub['start_time'],
+                        overdub.get('gain_db', 0.0), overdub.get('fade_in', 0.0),
+                        overdub.get('fade_out', 0.0))
+            except Exception as e:
+                self.log(f"Error applying audio overdub: {str(e)}", "red")
+                
+        return mix if mix.tracks else None
+        
+    def remove_silence(self, clip_name, args):
+        """Cut every silent stretch out of a clip in one edit"""
+        if clip_name not in self.clip_sources or len(args) > 2:
+            if len(args) > 2:
+                self.log("Usage: clip_name: remove(silence[, threshold_db[, min_length]])", "yellow")
+            else:
+                self.log(f"Silence removal needs an uploaded clip; {clip_name} has no source file", "red")
+            return
+            
+        try:
+            threshold_db = float(args[0]) if args else None
+            min_length = self.parse_time(args[1]) if len(args) > 1 else None
+        except ValueError:
+            self.log("Threshold is in dBFS (e.g. -40); minimum length is a time", "red")
+            return
+            
+        edit_list = self.clip_sources[clip_name]
+        try:
+            cuts = {path: detect_silence(path, threshold_db, min_length)
+                    for path in edit_list.paths() if not is_still_image(path)}
+        except Exception as e:
+            self.log(f"Error detecting silence: {str(e)}", "red")
+            return
+            
+        new_list = edit_list.remove_source_ranges(cuts)
+        removed = edit_list.duration - new_list.duration
+        if removed <= 0:
+            self.log(f"No silence found in {clip_name}", "yellow")
+            return
+        if not new_list:
+            self.log("Edit would leave the clip empty", "red")
+            return
+            
+        self.clip_sources[clip_name] = new_list
+        new_clip = self.build_clip(new_list, self.is_muted(clip_name),
+                                   self.video_config['proxy_mode'])
+        if clip_name in self.clips:
+            self.clips[clip_name] = new_clip
+        else:
+            self.photo_clips[clip_name] = new_clip
+        self.log(f"Removed {removed:.2f}s of silence from {clip_name} "
+                 f"({edit_list.duration:.2f}s -> {new_list.duration:.2f}s)")
+        
+    def handle_split(self, cmd):
+        """Handle split commands"""
+        if len(cmd.args) == 2 and cmd.word(1) == "auto":
+            self.split_at_scenes(cmd.word(0))
+            return
+            
+        if len(cmd.args) != 2:
+            self.log("Usage: split clip_name time|auto", "yellow")
+            return
+            
+        clip_name, split_time = cmd.word(0), cmd.args[1]
+        split_time = self.parse_time(split_time)
+        
+        clip = self.clips.get(clip_name, self.photo_clips.get(clip_name))
+        if clip is not None and not 0 < split_time < clip.duration:
+            self.log(f"Split time must be inside {clip_name} (0-{clip.duration:.2f}s)", "red")
+            return
+            
+        # Find clip (parts stay muted if it was)
+        muted = self.is_muted(clip_name)
+        if clip_name in self.clips:
+            clip = self.clips[clip_name]
+            del self.clips[clip_name]
+        elif clip_name in self.photo_clips:
+            clip = self.photo_clips[clip_name]
+            del self.photo_clips[clip_name]
+        else:
+            self.log(f"Clip '{clip_name}' not found", "red")
+            return
+            
+        # Split clip
+        if clip_name in self.clip_sources:
+            # Each part plays its half of the edit list directly
+            for part_name, edit_list in zip([f"{clip_name}_part1", f"{clip_name}_part2"],
+                                            self.clip_sources.pop(clip_name).split(split_time)):
+                self.clip_sources[part_name] = edit_list
+                self.clips[part_name] = self.build_clip(edit_list, muted,
+                                                        self.video_config['proxy_mode'])
+        else:
+            part1 = clip.subclip(0, split_time)
+            part2 = clip.subclip(split_time, clip.duration)
+            self.clip_recipes.pop(clip_name, None)
+            
+            # Add split parts
+            self.clips[f"{clip_name}_part1"] = part1
+            self.clips[f"{clip_name}_part2"] = part2
+        
+        self.log(f"Split {clip_name} at {split_time:.2f}s into {clip_name}_part1 and {clip_name}_part2")
+        
+    def split_at_scenes(self, clip_name):
+        """Split a video clip at every detected scene change"""
+        if clip_name not in self.clips and clip_name not in self.photo_clips:
+            self.log(f"Clip '{clip_name}' not found", "red")
+            return
+        if clip_name not in self.clip_sources:
+            self.log(f"Automatic split needs an uploaded video clip; {clip_name} has no source file", "red")
+            return
+            
+        edit_list = self.clip_sources[clip_name]
+        try:
+            points = self.scene_split_points(edit_list)
+        except Exception as e:
+            self.log(f"Error detecting scenes: {str(e)}", "red")
+            return
+            
+        if not points:
+            self.log(f"No scene changes found in {clip_name}", "yellow")
+            return
+            
+        # Same naming and mute handling as a manual split, with N parts
+        bounds = [0.0] + points + [edit_list.duration]
+        part_names = [f"{clip_name}_part{i + 1}" for i in range(len(bounds) - 1)]
+        
+        # Animated GIFs have source files too but live with the photos
+        muted = self.is_muted(clip_name)
+        if clip_name in self.clips:
+            del self.clips[clip_name]
+        else:
+            del self.photo_clips[clip_name]
+        del self.clip_sources[clip_name]
+        for part_name, start, end in zip(part_names, bounds, bounds[1:]):
+            part = edit_list.slice(start, end)
+            self.clip_sources[part_name] = part
+            self.clips[part_name] = self.build_clip(part, muted, self.video_config['proxy_mode'])
+            
+        times = ", ".join(f"{point:.2f}s" for point in points)
+        self.log(f"Split {clip_name} at {len(points)} scene change(s) ({times}) into "
+                 f"{part_names[0]}..{part_names[-1]}")
+        
+    def scene_split_points(self, edit_list):
+        """Timeline times of the scene changes inside an edit list's ranges"""
+        min_scene = CONFIG['performance']['scene_min_length']
+        points = []
+        elapsed = 0.0
+        for path, src_in, src_out in edit_list:
+            if not is_still_image(path):
+                for cut in detect_scenes(path, workers=export_workers(), log=self.log,
+                                         start=src_in, end=src_out):
+                    # Cuts too close to a range edge would leave slivers
+                    if src_in + min_scene <= cut <= src_out - min_scene:
+                        points.append(elapsed + cut - src_in)
+            elapsed += src_out - src_in
+        return points
+        
+    def handle_overlay_settings(self, cmd):
+        """Handle overlay settings commands"""
+        action = cmd.word(0)
+        
+        if action == "show":
+            # Show current settings
+            settings = self.video_config
+            self.log("Current overlay settings:", "cyan")
+            self.log(f"  Fill mode: {settings['overlay_fill_mode']}")
+            self.log(f"  Maintain aspect ratio: {settings['overlay_maintain_aspect_ratio']}")
+            self.log(f"  Max size: {settings['overlay_max_size_percent']}%")
+            
+        elif action == "fill_mode":
+            # Change fill mode
+            if len(cmd.args) == 2:
+                mode = cmd.word(1)
+                if mode in ['fit', 'stretch']:
+                    self.video_config['overlay_fill_mode'] = mode
+                    self.log(f"Overlay fill mode set to: {mode}", "green")
+                else:
+                    self.log("Invalid mode. Use 'fit' or 'stretch'", "red")
+            else:
+                self.log("Usage: overlay_settings fill_mode [fit|stretch]", "yellow")
+                
+        elif action == "max_size":
+            # Change max size percentage
+            if len(cmd.args) == 2 and cmd.args[1].isdigit():
+                size = int(cmd.args[1])
+                if 1 <= size <= 200:
+                    self.video_config['overlay_max_size_percent'] = size
+                    self.log(f"Overlay max size set to: {size}%", "green")
+                else:
+                    self.log("Size must be between 1 and 200", "red")
+            else:
+                self.log("Usage: overlay_settings max_size <1-200>", "yellow")
+        else:
+            self.log("Usage:", "yellow")
+            self.log("  overlay_settings show")
+            self.log("  overlay_settings fill_mode [fit|stretch]")
+            self.log("  overlay_settings max_size <1-200>")
+        
+    def handle_gif_overlay(self, cmd):
+        """Handle GIF overlay on audio commands"""
+        if len(cmd.args) < 2:
+            self.log("Usage: gif audio_name gif_path", "yellow")
+            return
+            
+        audio_name, gif_path = cmd.word(0), cmd.rest(1)
+        
+        if audio_name not in self.audio_clips:
+            self.log(f"Audio '{audio_name}' not found", "red")
+            return
+            
+        if not os.path.exists(gif_path):
+            self.log(f"GIF file not found: {gif_path}", "red")
+            return
+            
+        try:
+            audio = self.audio_clips[audio_name]
+            video_with_audio = self.build_gif_video(gif_path, audio)
+            
+            # Add to clips
+            clip_name = f"gif_video_{len(self.clips) + 1}"
+            self.clips[clip_name] = video_with_audio
+            self.clip_recipes[clip_name] = {'type': 'gif_video', 'gif': gif_path, 'audio': audio_name}
+            
+            self.log(f"Created GIF video: {clip_name} ({audio.duration:.2f}s)")
+            
+        except Exception as e:
+            self.log(f"Error creating GIF video: {str(e)}", "red")
+            
+    def build_gif_video(self, gif_path, audio):
+        """Loop a GIF for the length of an audio clip and attach the audio"""
+        gif_clip = LazyVideoClip(gif_path)
+        
+        # Loop GIF to match audio duration
+        if gif_clip.duration < audio.duration:
+            loops_needed = int(audio.duration / gif_clip.duration) + 1
+            gif_clip = concatenate_videoclips([gif_clip] * loops_needed)
+            
+        # Trim to audio duration
+        gif_clip = gif_clip.subclip(0, audio.duration)
+        
+        # Set audio
+        return gif_clip.set_audio(audio)
+            
+    def handle_project(self, cmd):
+        """Handle project commands"""
+        action, file_path = cmd.word(0), cmd.rest(1)
+        if action not in ["save", "load", "new", "recover"]:
+            self.log("Usage: project [save|load|new|recover] [file_path]", "yellow")
+            return
+            
+        if action == "save":
+            self.save_project(file_path)
+        elif action == "load":
+            self.load_project(file_path)
+        elif action == "recover":
+            self.recover_session()
+        else:
+            self.new_project()
+            
+    def save_project(self, file_path=None):
+        """Save current project"""
+        if not file_path:
+            file_path = self.ask_save_filename(
+                defaultextension=".vedit",
+                filetypes=[("VEdit project", "*.vedit")]
+            )
+        if file_path:
+            try:
+                timeline = self.project_timeline()
+                write_project(file_path, self.project_manifest(timeline), timeline)
+                self.current_project = file_path
+                self.log(f"Project saved: {file_path}")
+            except Exception as e:
+                self.log(f"Error saving project: {str(e)}", "red")
+                
+    def describe_clip(self, name):
+        """Serializable description a clip can be rebuilt from, or None"""
+        if name in self.clip_sources:
+            return {'type': 'edit_list',
+                    'edit_list': [list(r) for r in self.clip_sources[name]],
+                    'muted': self.is_muted(name)}
+        if name in self.clip_recipes:
+            return dict(self.clip_recipes[name])
+        return None
+        
+    def project_timeline(self, warn=True):
+        """Full editing state as plain data for a project file
+
+        Names of clips and overlays that cannot be described are listed
+        under 'skipped'.
+        """
+        timeline = {'name': Path(self.current_project).stem if self.current_project else
+                    CONFIG['default_project']['name'],
+                    'transition_type': self.transition_type,
+                    'output_path': self.output_path,
+                    'settings': {key: self.video_config[key] for key in PROJECT_SETTINGS},
+                    'clips': {}, 'photo_clips': {}, 'audio_clips': {},
+                    'overlays': [], 'text_overlays': list(self.text_overlays),
+                    'reframes': {aspect: [list(k) for k in keyframes]
+                                 for aspect, keyframes in self.reframes.items()},
+                    'audio_overdubs': [], 'skipped': []}
+        
+        for table, clips in [('clips', self.clips), ('photo_clips', self.photo_clips)]:
+            for name in clips:
+                description = self.describe_clip(name)
+                if description is None:
+                    timeline['skipped'].append(name)
+                    continue
+                timeline[table][name] = description
+                
+        for name, audio in self.audio_clips.items():
+            timeline['audio_clips'][name] = {'path': audio.filename}
+            
+        for overlay in self.overlay_clips:
+            if overlay.get('sources'):
+                description = {'type': 'edit_list',
+                               'edit_list': [list(r) for r in overlay['sources']],
+                               'muted': overlay['muted']}
+            elif overlay.get('recipe'):
+                description = dict(overlay['recipe'])
+            else:
+                timeline['skipped'].append(f"overlay of {overlay.get('source')}")
+                continue
+            timeline['overlays'].append({'source': overlay.get('source'), 'clip': description,
+                                         'from_time': overlay['from_time'],
+                                         'to_time': overlay['to_time'],
+                                         'effect': overlay['effect']})
+            
+        for overdub in self.audio_overdubs:
+            timeline['audio_overdubs'].append({'name': overdub['name'],
+                                               'start_time': overdub['start_time'],
+                                               'gain_db': overdub.get('gain_db', 0.0),
+                                               'fade_in': overdub.get('fade_in', 0.0),
+                                               'fade_out': overdub.get('fade_out', 0.0)})
+            
+        if warn:
+            for name in timeline['skipped']:
+                self.log(f"Not saved: {name} was edited in a way projects cannot record", "yellow")
+        return timeline
+        
+    def project_manifest(self, timeline):
+        """Content hash and probed streams of every file the timeline uses"""
+        paths = set(audio['path'] for audio in timeline['audio_clips'].values())
+        descriptions = list(timeline['clips'].values()) + list(timeline['photo_clips'].values())
+        descriptions += [overlay['clip'] for overlay in timeline['overlays']]
+        for description in descriptions:
+            if description['type'] == 'edit_list':
+                paths.update(path for path, _, _ in description['edit_list'])
+            else:
+                paths.add(description['gif'])
+                
+        sources = {}
+        for path in sorted(paths):
+            sources[path] = {'hash': file_hash(path), 'streams': probe_streams(path)}
+        return {'format': 'vedit', 'sources': sources}
+            
+    def load_project(self, file_path=None):
+        """Load project"""
+        if not file_path:
+            file_path = self.ask_open_filename(
+                filetypes=[("VEdit project", "*.vedit")]
+            )
+            if file_path:
+                self.record(f"project load {file_path}")
+        if file_path:
+            try:
+                if not is_project_file(file_path):
+                    # Projects saved before the binary format only held counts
+                    with open(file_path, 'r') as f:
+                        project_data = json.load(f)
+                    self.log(f"Project loaded: {file_path}")
+                    self.log(f"Contains: {project_data['clips_count']} clips, "
+                            f"{project_data['audio_count']} audio files, "
+                            f"{project_data['photos_count']} photos")
+                    self.log("This project was saved by an older version without a timeline", "yellow")
+                    return
+                    
+                manifest, timeline = read_project(file_path)
+                self.new_project()
+                missing = self.check_project_sources(manifest['sources'])
+                self.restore_timeline(timeline, missing)
+                self.current_project = file_path
+                self.log(f"Project loaded: {file_path}")
+                self.log(f"Contains: {len(self.clips)} clips, {len(self.audio_clips)} audio files, "
+                         f"{len(self.photo_clips)} photos")
+                self.update_project_info()
+            except Exception as e:
+                self.log(f"Error loading project: {str(e)}", "red")
+                
+    def check_project_sources(self, sources):
+        """Validate project sources and seed their probes; returns unusable paths"""
+        missing = set()
+        for path, info in sources.items():
+            if not os.path.exists(path):
+                self.log(f"Missing source: {path}", "red")
+                missing.add(path)
+            elif file_hash(path) != info['hash']:
+                self.log(f"Source changed since the project was saved: {path}", "yellow")
+            else:
+                seed_probe(path, info['streams'])
+        return missing
+        
+    def rebuild_described_clip(self, description):
+        """Rebuild a clip from describe_clip() output; returns (clip, edit list)"""
+        if description['type'] == 'edit_list':
+            edit_list = EditList(description['edit_list'])
+            return self.build_clip(edit_list, description['muted'],
+                                   self.video_config['proxy_mode']), edit_list
+        audio = self.audio_clips[description['audio']]
+        return self.build_gif_video(description['gif'], audio), None
+        
+    def restore_timeline(self, timeline, missing=()):
+        """Rebuild project state from project_timeline() output"""
+        def usable(description):
+            if description['type'] == 'edit_list':
+                return not any(path in missing for path, _, _ in description['edit_list'])
+            return description['gif'] not in missing and description['audio'] in self.audio_clips
+            
+        self.transition_type = timeline['transition_type']
+        self.output_path = timeline['output_path']
+        self.video_config.update(timeline['settings'])
+        
+        for name, audio in timeline['audio_clips'].items():
+            if audio['path'] not in missing:
+                self.audio_clips[name] = LazyAudioFileClip(audio['path'])
+                
+        for table, clips in [('clips', self.clips), ('photo_clips', self.photo_clips)]:
+            for name, description in timeline[table].items():
+                if not usable(description):
+                    continue
+                clips[name], edit_list = self.rebuild_described_clip(description)
+                if edit_list is not None:
+                    self.clip_sources[name] = edit_list
+                else:
+                    self.clip_recipes[name] = description
+                    
+        for overlay in timeline['overlays']:
+            if not usable(overlay['clip']):
+                continue
+            clip, edit_list = self.rebuild_described_clip(overlay['clip'])
+            self.overlay_clips.append({'source': overlay['source'], 'clip': clip,
+                                       'recipe': None if edit_list else overlay['clip'],
+                                       'sources': edit_list,
+                                       'muted': overlay['clip'].get('muted', False),
+                                       'from_time': overlay['from_time'],
+                                       'to_time': overlay['to_time'],
+                                       'effect': overlay['effect']})
+            
+        self.text_overlays.extend(timeline['text_overlays'])
+        self.reframes.update(timeline.get('reframes', {}))
+        
+        for path in set(path for sources in self.clip_sources.values() for path in sources.paths()) | \
+                set(audio.filename for audio in self.audio_clips.values()):
+            self.start_index(path)
+        
+        for overdub in timeline['audio_overdubs']:
+            if overdub['name'] in self.audio_clips:
+                self.audio_overdubs.append({'name': overdub['name'],
+                                            'audio': self.audio_clips[overdub['name']],
+                                            'start_time': overdub['start_time'],
+                                            'gain_db': overdub.get('gain_db', 0.0),
+                                            'fade_in': overdub.get('fade_in', 0.0),
+                                            'fade_out': overdub.get('fade_out', 0.0)})
+                    
+    def handle_preview(self, cmd):
+        """Handle preview commands: preview [clip_name|project] [time]"""
+        target = cmd.arg(0) or "project"
+        try:
+            t = self.parse_time(cmd.arg(1) or "0")
+        except ValueError:
+            self.log("Usage: preview [clip_name|project] [time]", "yellow")
+            return
+            
+        source = self.preview_source(target)
+        if source is None:
+            return
+        if not 0 <= t <= source.duration:
+            self.log(f"Preview time must be between 0 and {source.duration:.2f}s", "red")
+            return
+            
+        self.preview_target = source
+        if self.background:
+            self.previewer.request(source, t)
+        else:
+            frame, shown, cached = self.previewer.render(source, t)
+            self.show_preview_frame(source, shown, frame, cached)
+            
+    def preview_source(self, target="project"):
+        """Snapshot of a clip (or the whole project) for the preview renderer"""
+        target = target.lower()
+        if target == "project":
+            names = list(self.clips) + list(self.photo_clips)
+            if not names:
+                self.log("No clips to preview", "red")
+                return None
+            parts = [self.preview_part(name) for name in names]
+            size = self.preview_part_size(names[0], parts[0])
+            
+            # Lay overlays and text out on a stand-in for the full-size timeline
+            base = VideoClip(duration=sum(part.duration for part in parts))
+            base.size = size
+            layers = self.build_overlay_layers(base, verbose=False) + self.build_text_layers(base)
+            return PreviewSource("project", ("project", self.edit_version), parts, size,
+                                 layers, self.proxies)
+                                 
+        if target not in self.clips and target not in self.photo_clips:
+            self.log(f"Clip '{target}' not found", "red")
+            return None
+        part = self.preview_part(target)
+        key = ("clip", tuple(part.ranges)) if isinstance(part, EditList) else ("clip", id(part))
+        return PreviewSource(target, key, [part], self.preview_part_size(target, part),
+                             path_map=self.proxies)
+                             
+    def preview_part(self, name):
+        """Edit list of a clip when it has one (decoded directly), else the clip"""
+        sources = self.clip_sources.get(name)
+        if sources:
+            return sources
+        return self.clips.get(name) or self.photo_clips[name]
+        
+    def preview_part_size(self, name, part):
+        """Full-resolution frame size of a clip, ignoring proxies"""
+        if isinstance(part, EditList):
+            return tuple(probe_media(part.ranges[0][0])['size'])
+        return tuple(part.size)
+        
+    def show_preview_frame(self, source, t, frame, cached):
+        """Display a rendered preview frame (headless sessions just report it)"""
+        origin = "cached" if cached else "decoded"
+        self.log(f"Preview {source.name} @ {t:.2f}s: {frame.shape[1]}x{frame.shape[0]} ({origin})")
+        
+    def handle_cache(self, cmd):
+        """Handle artifact cache commands"""
+        cache = get_cache()
+        action = ' '.join(cmd.args).lower()
+        
+        if action in ["", "show"]:
+            count, size = cache.stats()
+            max_size = CONFIG['performance']['max_cache_size']
+            self.log("Artifact cache:", "cyan")
+            self.log(f"  Enabled: {cache.enabled}")
+            self.log(f"  Directory: {cache.directory}")
+            self.log(f"  Entries: {count}")
+            self.log(f"  Size: {size / (1024 * 1024):.1f} MB of {max_size / (1024 * 1024):.0f} MB")
+        elif action == "clear":
+            cache.clear()
+            self.log("Artifact cache cleared", "green")
+        else:
+            self.log("Usage: cache [show|clear]", "yellow")
+            
+    def new_project(self):
+        """Start new project"""
+        self.clips.clear()
+        self.audio_clips.clear()
+        self.photo_clips.clear()
+        self.overlay_clips.clear()
+        self.text_overlays.clear()
+        self.reframes.clear()
+        self.audio_overdubs.clear()
+        self.clip_sources.clear()
+        self.clip_recipes.clear()
+        # Close decoders now rather than whenever the old clips are collected
+        READER_POOL.release_all()
+        self.previewer.invalidate()
+        self.log("New project started")
+        
+    def list_clips(self):
+        """List all loaded clips"""
+        if not self.clips and not self.audio_clips and not self.photo_clips:
+            self.log("No clips loaded")
+            self.update_preview()
+            return
+            
+        self.log("=== LOADED CLIPS ===", "cyan")
+        
+        if self.clips:
+            self.log("Video clips:", "yellow")
+            for name, clip in self.clips.items():
+                self.log(f"  {name}: {clip.duration:.2f}s  {self.clip_waveform(name)}".rstrip())
+                
+        if self.audio_clips:
+            self.log("Audio clips:", "yellow")
+            for name, audio in self.audio_clips.items():
+                self.log(f"  {name}: {audio.duration:.2f}s  {self.clip_waveform(name)}".rstrip())
+                
+        if self.photo_clips:
+            self.log("Photo clips:", "yellow")
+            for name, photo in self.photo_clips.items():
+                self.log(f"  {name}: {photo.duration:.2f}s")
+                
+        readers = READER_POOL.stats()
+        self.log(f"Open decoders: {readers['open']}/{readers['limit']} "
+                 f"(peak {readers['peak']}, {readers['evicted']} evicted)")
+        active = self.export_jobs.active()
+        if active:
+            self.log(f"Export jobs: {len(active)} queued or running (export status for details)")
+                
+        # Update preview with first video clip if available
+        if self.clips:
+            first_clip = list(self.clips.keys())[0]
+            self.update_preview(first_clip)
+        else:
+            self.update_preview()
+                
+    def show_help(self):
+        """Show help information"""
+        help_text = """
+=== VEdit CLI Help ===
+
+UPLOAD COMMANDS:
+  upload <file_path>          - Upload video/audio/photo file
+  upload dialog               - Open file dialog to select file
+
+CLIP MANIPULATION:
+  clip_name: remove(start, end)  - Remove section from clip
+  clip_name: remove(silence)     - Remove silent sections from clip
+  clip_name: trim(start, end)    - Trim clip to section
+  split clip_name time           - Split clip at time
+  split clip_name auto           - Split clip at every scene change
+
+MERGE & EXPORT:
+  merge_all                      - Set merge transition to dissolve (default)
+  merge_all(transition)          - Set merge transition (dissolve, cut)
+  export(output_path)            - Export to specified path
+  export(path, 1080p, 720p@2500k) - Export several renditions from one decode
+  export(path, 16:9, 9:16, 1:1)  - Export several aspect ratios from one decode
+  reframe 9:16 [position]        - Crop position (0-1, left/center/right) for an aspect
+  reframe 9:16 0:00=0.2 0:05=0.8 - Keyframed crop position; 'reframe 9:16 off' resets
+  preview [clip_name|project] [time] - Show a frame in the preview panel
+  export status [job_id]         - Progress and ETA of export jobs
+  export resume [n]              - Finish an interrupted export
+  export cancel <job_id|all>     - Cancel queued or running exports
+  export_settings show           - Show export settings
+  export_settings mode [single|segmented] - Parallel segment encoding
+  export_settings incremental [on|off]    - Reuse unchanged segments (segmented mode)
+  export_settings split [interval|clips]  - Where segments are cut
+  export_settings segment <seconds>       - Segment length (interval mode)
+
+OVERLAY COMMANDS:
+  overlay(source, from, to, effect)  - Overlay video/photo
+  text("text", position, size, color) - Add text overlay
+  overlay_settings show               - Show overlay settings
+  overlay_settings fill_mode [fit|stretch] - Set overlay fill mode
+  overlay_settings max_size <1-200>  - Set overlay max size percentage
+
+AUDIO COMMANDS:
+  audio remove                   - Remove audio from all clips
+  audio overdub audio_name time [gain_db [fade_in [fade_out]]] - Overdub audio at time
+
+SPECIAL FEATURES:
+  gif audio_name gif_path        - Create video from audio + GIF
+  project [save|load|new] [file] - Project management
+  project recover                - Restore a session that crashed
+  cache [show|clear]             - Show or clear the artifact cache
+  proxy [show|on|off]            - Edit against low-resolution proxies
+
+TIPS:
+• Use 'list' to see all loaded clips
+• Use 'help' for command reference
+• Times can be MM:SS or SS format
+• Commands and clip names are case-insensitive; paths and text keep their case
+        """
+        self.log(help_text, "cyan")
+
+def main(argv=None):
+    """Run a command script without constructing the GUI"""
+    parser = argparse.ArgumentParser(description="Run VEdit CLI commands headless")
+    parser.add_argument("--headless", action="store_true",
+                        help="accepted for symmetry with vedit_cli.py")
+    parser.add_argument("script", nargs="?", default="-",
+                        help="command script to run ('-' or omitted reads stdin)")
+    args = parser.parse_args(argv)
+    
+    engine = VideoEditorEngine()
+    try:
+        if args.script == "-":
+            failures = engine.run_script(sys.stdin)
+        else:
+            if not os.path.exists(args.script):
+                engine.log(f"Script not found: {args.script}", "red")
+                return 2
+            with open(args.script, 'r', encoding='utf-8') as f:
+                failures = engine.run_script(f)
+    finally:
+        engine.shutdown()
+        
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+"""
+VEdit CLI - Export Helpers
+
+Encoding back-ends used by VideoEditorEngine.export_project. The default
+path is a single pipelined encode (vedit_pipeline); the segmented path cuts the
+composed timeline into frame-aligned segments, encodes them in parallel
+worker processes and concat-muxes the result without re-encoding; with a
+segment fingerprint, segments whose inputs did not change since an earlier
+export are taken from the cache instead of being encoded again. Cut-only
+timelines skip moviepy entirely and are stream-copied from the sources,
+re-encoding only the partial GOPs at each cut point.
+
+Every back-end takes an optional ExportJob (vedit_jobs) to report encoded
+frames to and to poll for cancellation, and writes its temporary files to
+the job's private work directory.
+"""
+
+import os
+import gc
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.audio.io.readers import FFMPEG_AudioReader
+from config import CONFIG
+from vedit_media import probe_streams, probe_keyframes, detach_handles
+from vedit_cache import get_cache, file_hash
+from vedit_pipeline import write_pipelined, frame_count
+
+# Timeline handed to forked segment workers (set just before the pool starts)
+_SEGMENT_SOURCE = None
+
+# Shared frame counter and cancel flag, inherited by forked segment workers
+_SEGMENT_FRAMES = None
+_SEGMENT_CANCEL = None
+
+# Held while the globals above are set and a pool forks its workers, so
+# concurrent export jobs each hand their own timeline to their own workers
+_FORK_LOCK = threading.Lock()
+
+
+def ffmpeg_binary():
+    """Return the ffmpeg executable moviepy is configured to use"""
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments, raising IOError on failure"""
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error"] + list(args)
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise IOError(f"ffmpeg failed: {result.stderr.decode('utf8', 'ignore').strip()}")
+    return result
+
+
+def export_workers():
+    """Number of encoder processes allowed by PERFORMANCE_CONFIG"""
+    performance = CONFIG['performance']
+    if not performance['use_multithreading']:
+        return 1
+    return max(1, int(performance['max_threads']))
+
+
+def can_fork_workers():
+    """Segment workers inherit the timeline by fork, which Windows lacks"""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def uses_segments(video_config=None):
+    """Whether exports go through segments: segmented mode, where fork() is available
+
+    Incremental reuse and resumable progress are kept per segment, so they
+    only apply to these exports.
+    """
+    return (video_config or CONFIG['video'])['export_mode'] == 'segmented' and can_fork_workers()
+
+
+def keyframe_interval_frames(fps, video_config=None):
+    """GOP length in frames for the configured keyframe interval"""
+    return max(1, int(round((video_config or CONFIG['video'])['keyframe_interval'] * fps)))
+
+
+def segment_ranges(duration, fps, clip_durations=None, video_config=None):
+    """Split a timeline into frame-aligned (start, end) ranges
+
+    In 'clips' mode the cuts fall on clip boundaries; otherwise segments are a
+    whole number of GOPs long so each one starts on a natural keyframe.
+    """
+    video_config = video_config or CONFIG['video']
+    total_frames = int(round(duration * fps))
+
+    if video_config['segment_split'] == 'clips' and clip_durations:
+        cut_frames = []
+        elapsed = 0.0
+        for clip_duration in clip_durations[:-1]:
+            elapsed += clip_duration
+            cut_frames.append(int(round(elapsed * fps)))
+    else:
+        gop = keyframe_interval_frames(fps, video_config)
+        gops_per_segment = max(1, int(round(video_config['segment_duration'] * fps / gop)))
+        step = gop * gops_per_segment
+        cut_frames = list(range(step, total_frames, step))
+
+    # Drop duplicate or degenerate cuts and convert back to seconds
+    bounds = [0] + sorted(f for f in set(cut_frames) if 0 < f < total_frames) + [total_frames]
+    ranges = []
+    for start_frame, end_frame in zip(bounds, bounds[1:]):
+        start = start_frame / fps
+        end = duration if end_frame == total_frames else end_frame / fps
+        ranges.append((start, end))
+    return ranges
+
+
+def _init_segment_worker():
+    """Detach inherited ffmpeg readers so this process opens its own pipes"""
+    # The pipes belong to the parent; dropping them (without terminating the
+    # parent's subprocess) makes each reader re-initialize on first access.
+    for obj in gc.get_objects():
+        if isinstance(obj, (FFMPEG_VideoReader, FFMPEG_AudioReader)):
+            obj.proc = None
+    detach_handles()
+
+
+def _count_segment_frame(count):
+    """Count a worker's frame into the shared counter and poll the cancel flag"""
+    if _SEGMENT_CANCEL.is_set():
+        raise RuntimeError("Segment cancelled")
+    with _SEGMENT_FRAMES.get_lock():
+        _SEGMENT_FRAMES.value += 1
+
+
+def _encode_segment(index, start, end, path, codec, fps, ffmpeg_params):
+    """Encode one video-only segment of the inherited timeline"""
+    if _SEGMENT_CANCEL.is_set():
+        return index
+    # Times stay absolute, so a compositor's layers line up without a subclip
+    write_pipelined(_SEGMENT_SOURCE, path, fps, codec=codec, ffmpeg_params=ffmpeg_params,
+                    start=start, end=end, on_frame=_count_segment_frame)
+    return index
+
+
+def write_concat_list(paths, list_file):
+    """Write an ffmpeg concat demuxer list for the given files"""
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def concat_segments(segment_paths, output_file, audio_file=None, work_dir=None):
+    """Losslessly join encoded segments (and an optional audio track)"""
+    work_dir = work_dir or os.path.dirname(os.path.abspath(output_file))
+    list_file = os.path.join(work_dir, "segments.txt")
+    write_concat_list(segment_paths, list_file)
+
+    args = ["-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_file:
+        args += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"]
+    args += ["-c", "copy", "-movflags", "+faststart", output_file]
+    run_ffmpeg(args)
+
+
+def _encode_segments(video, todo, workers, codec, fps, ffmpeg_params, frames, log, job,
+                     on_done=None):
+    """Encode (index, start, end, path) segments of the timeline on a fork pool
+
+    on_done(index) is called in this process as each segment is finished.
+    """
+    global _SEGMENT_SOURCE, _SEGMENT_FRAMES, _SEGMENT_CANCEL
+
+    context = multiprocessing.get_context("fork")
+    cancel = context.Event()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_segment_worker) as pool:
+        # A fork pool starts all its workers on the first submit
+        with _FORK_LOCK:
+            _SEGMENT_SOURCE = video.without_audio()
+            _SEGMENT_FRAMES, _SEGMENT_CANCEL = frames, cancel
+            try:
+                futures = [pool.submit(_encode_segment, i, start, end, path,
+                                       codec, fps, ffmpeg_params)
+                           for i, start, end, path in todo]
+            finally:
+                _SEGMENT_SOURCE = _SEGMENT_FRAMES = _SEGMENT_CANCEL = None
+
+        try:
+            pending = set(futures)
+            done = 0
+            while pending:
+                finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if job:
+                    job.set_done(frames.value)
+                    job.check_cancelled()
+                for future in finished:
+                    index = future.result()
+                    done += 1
+                    log(f"Segment {done}/{len(todo)} encoded")
+                    if on_done:
+                        on_done(index)
+        except BaseException:
+            # Stop queued segments and make running ones bail out at their next frame
+            cancel.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def export_segmented(video, output_file, clip_durations=None, log=print, job=None,
+                     audio_file=None, fingerprint=None, progress=None, video_config=None):
+    """Encode the timeline in parallel segments and concat-mux the result
+
+    audio_file, when given, is an already encoded track used instead of
+    rendering video.audio. fingerprint(start, end), when given, keys each
+    segment's pictures in the cache: segments already encoded with the same
+    fingerprint are reused and only the rest are encoded. progress (an
+    ExportProgress of the job's directory) records each finished segment and
+    supplies the ones an interrupted run of this job already finished.
+    video_config, when given, stands in for CONFIG['video'] (e.g. the
+    settings a resumed export was started with).
+    """
+    video_config = video_config or CONFIG['video']
+    fps = getattr(video, 'fps', None) or video_config['default_fps']
+    codec = video_config['default_codec']
+    gop = keyframe_interval_frames(fps, video_config)
+    ffmpeg_params = ["-g", str(gop)]
+
+    ranges = segment_ranges(video.duration, fps, clip_durations, video_config)
+    cache = get_cache()
+    keys = [fingerprint(start, end) if fingerprint else None for start, end in ranges]
+    cached = [cache.lookup(key, '.mp4') if key else None for key in keys]
+    finished = [None] * len(ranges)
+    if progress is not None:
+        finished = [None if path else progress.finished_segment(i, start, end, keys[i])
+                    for i, ((start, end), path) in enumerate(zip(ranges, cached))]
+
+    own_dir = job is None
+    if own_dir:
+        work_dir = tempfile.mkdtemp(prefix="vedit_segments_",
+                                    dir=os.path.dirname(os.path.abspath(output_file)))
+    else:
+        work_dir = job.work_dir
+    try:
+        segment_paths = [path or os.path.join(work_dir, f"segment_{i:05d}.mp4")
+                         for i, path in enumerate(cached)]
+        todo = [(i, start, end, segment_paths[i])
+                for i, (start, end) in enumerate(ranges) if cached[i] is None and finished[i] is None]
+        workers = max(1, min(export_workers(), len(todo)))
+        resumed = sum(1 for path in finished if path)
+        if resumed:
+            log(f"Resuming: {resumed} of {len(ranges)} segments already finished")
+        if fingerprint:
+            log(f"Incremental export: {sum(1 for path in cached if path)} of {len(ranges)} segments "
+                f"unchanged, encoding {len(todo)} on {workers} worker(s)")
+        else:
+            log(f"Segmented export: {len(ranges)} segments, encoding {len(todo)} on {workers} worker(s)")
+
+        # Reused and resumed segments count as done from the start
+        reused_frames = sum(frame_count(end - start, fps)
+                            for (start, end), path, done in zip(ranges, cached, finished) if path or done)
+        frames = multiprocessing.get_context("fork").Value('q', reused_frames)
+        if job:
+            job.set_done(reused_frames)
+
+        # Render the audio track once in this process; workers only encode pictures
+        if audio_file is None and video.audio is not None:
+            audio_file = progress.finished_audio('timeline') if progress else None
+            if audio_file is None:
+                audio_file = os.path.join(work_dir, "audio.m4a")
+                video.audio.write_audiofile(audio_file,
+                                            fps=44100,
+                                            codec=video_config['default_audio_codec'],
+                                            logger=job.progress_logger() if job else None)
+                if progress:
+                    progress.audio_done('timeline', audio_file)
+
+        def segment_done(index):
+            if progress is not None and os.path.exists(segment_paths[index]):
+                start, end = ranges[index]
+                progress.segment_done(index, start, end, segment_paths[index], keys[index])
+
+        while todo:
+            _encode_segments(video, todo, workers, codec, fps, ffmpeg_params, frames, log, job,
+                             on_done=segment_done)
+            # Mark reused entries as used again; re-encode any evicted meanwhile
+            todo = []
+            for i, path in enumerate(cached):
+                if path and cache.lookup(keys[i], '.mp4') is None:
+                    segment_paths[i] = os.path.join(work_dir, f"segment_{i:05d}.mp4")
+                    todo.append((i, ranges[i][0], ranges[i][1], segment_paths[i]))
+                    cached[i] = None
+
+        if job:
+            job.check_cancelled()
+        concat_segments(segment_paths, output_file, audio_file, work_dir)
+
+        # Keep the new segments for the next export of this timeline
+        if cache.enabled:
+            for i, key in enumerate(keys):
+                if key and cached[i] is None:
+                    cache.commit(key, '.mp4', segment_paths[i])
+
+    finally:
+        if own_dir and video_config['remove_temp_files']:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def stream_copy_compatible(sources):
+    """Return the shared stream parameters if the sources can be stream-copied
+
+    Every source must be H.264 (plus optional AAC) with identical picture and
+    audio parameters, otherwise the concatenated streams would not be valid.
+    """
+    params = None
+    for path in sorted(set(path for path, _, _ in sources)):
+        streams = probe_streams(path)
+        if streams['video_codec'] != 'h264' or streams.get('pix_fmt') != 'yuv420p':
+            return None
+        if streams['audio_codec'] not in (None, 'aac'):
+            return None
+        key = (streams['size'], streams['fps'], streams['audio_codec'],
+               streams.get('sample_rate'), streams.get('channel_layout'))
+        if params is None:
+            params = key
+        elif key != params:
+            return None
+    return params
+
+
+def plan_smart_cut(src_in, src_out, keyframes, fps, source_duration=None):
+    """Split a source range into ('encode'|'copy', start, end) pieces
+
+    Whole GOPs between the first and last keyframe inside the range are
+    copied; the partial GOPs at either end are re-encoded. The end of the
+    source file is a clean cut point just like a keyframe.
+    """
+    tolerance = 0.5 / fps
+    if source_duration:
+        keyframes = list(keyframes) + [source_duration]
+    inside = [k for k in keyframes if src_in - tolerance <= k <= src_out + tolerance]
+    if len(inside) < 2:
+        return [('encode', src_in, src_out)]
+
+    copy_start, copy_end = inside[0], inside[-1]
+    if abs(copy_start - src_in) <= tolerance:
+        copy_start = src_in
+    if abs(copy_end - src_out) <= tolerance:
+        copy_end = src_out
+
+    pieces = []
+    if copy_start > src_in:
+        pieces.append(('encode', src_in, copy_start))
+    pieces.append(('copy', copy_start, copy_end))
+    if src_out > copy_end:
+        pieces.append(('encode', copy_end, src_out))
+    return pieces
+
+
+def _write_piece(kind, path, start, end, piece_path, has_audio, sample_rate, encoder):
+    """Write one stream-copied or re-encoded piece as MPEG-TS
+
+    encoder is the (video codec, audio codec) of re-encoded pieces.
+    """
+    args = ["-ss", f"{start:.6f}", "-i", path, "-t", f"{end - start:.6f}", "-map", "0:v:0"]
+    if has_audio:
+        args += ["-map", "0:a:0"]
+
+    if kind == 'copy':
+        args += ["-c", "copy"]
+    else:
+        args += ["-c:v", encoder[0], "-pix_fmt", "yuv420p"]
+        if has_audio:
+            args += ["-c:a", encoder[1], "-ar", str(sample_rate)]
+
+    # MPEG-TS keeps parameter sets in-band so copied and re-encoded pieces
+    # can be joined even though their encoder headers differ
+    args += ["-bsf:v", "h264_mp4toannexb", "-f", "mpegts", piece_path]
+    run_ffmpeg(args)
+
+
+def export_stream_copy(sources, output_file, log=print, job=None, video_config=None):
+    """Export a cut-only timeline by stream copy with smart-rendered cut points
+
+    Returns False (without writing anything) when the sources cannot be
+    stream-copied, so the caller can fall back to a full render.
+    video_config, when given, stands in for CONFIG['video'].
+    """
+    video_config = video_config or CONFIG['video']
+    params = stream_copy_compatible(sources)
+    if params is None:
+        return False
+
+    _, fps, audio_codec, sample_rate, _ = params
+    has_audio = audio_codec is not None
+    paths = set(path for path, _, _ in sources)
+    keyframes = {path: probe_keyframes(path) for path in paths}
+    durations = {path: probe_streams(path)['duration'] for path in paths}
+
+    cache = get_cache()
+    encoder = [video_config['default_codec'], video_config['default_audio_codec']]
+
+    own_dir = job is None
+    if own_dir:
+        work_dir = tempfile.mkdtemp(prefix="vedit_copy_",
+                                    dir=os.path.dirname(os.path.abspath(output_file)))
+    else:
+        work_dir = job.work_dir
+        job.set_total(round(sum(src_out - src_in for _, src_in, src_out in sources) * fps))
+    try:
+        piece_paths = []
+        copied = encoded = reused = 0.0
+        for path, src_in, src_out in sources:
+            for kind, start, end in plan_smart_cut(src_in, src_out, keyframes[path], fps,
+                                                   durations[path]):
+                if job:
+                    job.check_cancelled()
+                piece_path = os.path.join(work_dir, f"piece_{len(piece_paths):05d}.ts")
+                if kind == 'copy':
+                    # Copying again is as cheap as reading a cached copy, so
+                    # only re-encoded pieces are worth their cache space
+                    _write_piece(kind, path, start, end, piece_path, has_audio, sample_rate, encoder)
+                else:
+                    # Keyed by source content, range and encoder settings
+                    key = cache.make_key(file_hash(path), 'smart_cut_piece',
+                                         [kind, round(start, 6), round(end, 6), has_audio, encoder])
+                    cached_path = cache.lookup(key, '.ts')
+                    if cached_path is not None:
+                        piece_path = cached_path
+                        reused += end - start
+                    else:
+                        _write_piece(kind, path, start, end, piece_path, has_audio, sample_rate,
+                                     encoder)
+                        cache.store_file(key, '.ts', piece_path)
+                piece_paths.append(piece_path)
+                if kind == 'copy':
+                    copied += end - start
+                else:
+                    encoded += end - start
+                if job:
+                    job.set_done(round((copied + encoded) * fps))
+
+        log(f"Stream copy: {copied:.2f}s copied, {encoded:.2f}s re-encoded at cut points"
+            f" ({reused:.2f}s of them reused from cache)")
+
+        list_file = os.path.join(work_dir, "pieces.txt")
+        write_concat_list(piece_paths, list_file)
+        args = ["-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy"]
+        if has_audio:
+            args += ["-bsf:a", "aac_adtstoasc"]
+        args += ["-movflags", "+faststart", output_file]
+        run_ffmpeg(args)
+
+    finally:
+        if own_dir and video_config['remove_temp_files']:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return True
@@ -0,0 +1,215 @@
+"""
+VEdit CLI - Media Indexes
+
+Compact per-file indexes for finding cut points without playing media:
+
+    filmstrip  one small thumbnail every PERFORMANCE_CONFIG['filmstrip_interval']
+               seconds, in a single (frames, height, width, 3) uint8 array
+    waveform   (buckets, 2) float32 min/max sample peaks, 'waveform_resolution'
+               buckets per second of audio (all channels mixed down)
+
+Each is produced by one streaming ffmpeg decode at reduced size or sample
+rate, written straight into its cache entry and read back memory-mapped, so
+an index is computed once per source file and costs no RAM until used.
+"""
+
+import os
+import math
+import subprocess
+import numpy as np
+from moviepy.config import get_setting
+from config import CONFIG
+from vedit_cache import get_cache, file_hash
+from vedit_media import probe_streams
+
+# Sample rate waveform peaks are measured at
+WAVEFORM_SAMPLE_RATE = 8000
+
+# Characters of the text waveform drawn by 'list'
+SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+
+
+def filmstrip_params():
+    performance = CONFIG['performance']
+    return {'interval': performance['filmstrip_interval'],
+            'height': performance['filmstrip_height']}
+
+
+def waveform_params():
+    return {'resolution': CONFIG['performance']['waveform_resolution'],
+            'sample_rate': WAVEFORM_SAMPLE_RATE}
+
+
+def _open_ffmpeg(args):
+    cmd = [get_setting("FFMPEG_BINARY"), "-loglevel", "error"] + list(args) + ["-"]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            bufsize=1024 * 1024)
+
+
+def _finish(cache, key, part_path):
+    """Move a written index into the cache and return its final path"""
+    if not cache.enabled:
+        final_path = os.path.splitext(part_path)[0]
+        os.replace(part_path, final_path)
+        return final_path
+    return cache.commit(key, '.npy', part_path)
+
+
+def _load(path):
+    return np.load(path, mmap_mode='r', allow_pickle=False)
+
+
+def build_filmstrip(file_path):
+    """Memory-mapped filmstrip of a video file (cached), or None without video"""
+    streams = probe_streams(file_path)
+    if not streams.get('size') or not streams.get('duration'):
+        return None
+
+    params = filmstrip_params()
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'filmstrip', params)
+    path = cache.lookup(key, '.npy')
+    if path is not None:
+        return _load(path)
+
+    w, h = streams['size']
+    height = params['height']
+    width = max(2, int(round(w * height / h / 2)) * 2)
+    count = max(1, math.ceil(streams['duration'] / params['interval']))
+    frame_bytes = width * height * 3
+
+    # Written in place as ffmpeg delivers frames; never held in memory whole
+    part_path = cache.reserve(key, '.npy')
+    strip = np.lib.format.open_memmap(part_path, mode='w+', dtype=np.uint8,
+                                      shape=(count, height, width, 3))
+    proc = _open_ffmpeg(["-i", file_path, "-an", "-sn",
+                         "-vf", f"fps=1/{params['interval']},scale={width}:{height}",
+                         "-f", "rawvideo", "-pix_fmt", "rgb24"])
+    filled = 0
+    try:
+        while filled < count:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            strip[filled] = np.frombuffer(data, np.uint8).reshape(height, width, 3)
+            filled += 1
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if filled == 0:
+        del strip
+        os.remove(part_path)
+        raise IOError(f"Could not decode thumbnails from {file_path}")
+    # The container duration may promise a frame more than the stream has
+    strip[filled:] = strip[filled - 1]
+    strip.flush()
+    del strip
+    return _load(_finish(cache, key, part_path))
+
+
+def build_waveform(file_path):
+    """Memory-mapped min/max peak index of a file's audio (cached), or None"""
+    streams = probe_streams(file_path)
+    if not streams.get('audio_codec') or not streams.get('duration'):
+        return None
+
+    params = waveform_params()
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'waveform', params)
+    path = cache.lookup(key, '.npy')
+    if path is not None:
+        return _load(path)
+
+    bucket = max(1, params['sample_rate'] // params['resolution'])
+    count = max(1, math.ceil(streams['duration'] * params['resolution']))
+    part_path = cache.reserve(key, '.npy')
+    peaks = np.lib.format.open_memmap(part_path, mode='w+', dtype=np.float32,
+                                      shape=(count, 2))
+    proc = _open_ffmpeg(["-i", file_path, "-vn", "-sn", "-ac", "1",
+                         "-ar", str(params['sample_rate']), "-f", "f32le"])
+
+    # Whole buckets per read; min/max reduce each block in one call
+    chunk_buckets = 1024
+    filled = 0
+    try:
+        while filled < count:
+            data = proc.stdout.read(4 * bucket * chunk_buckets)
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) // 4 * 4], np.float32)
+            whole = len(samples) // bucket
+            if whole == 0:
+                samples = np.pad(samples, (0, bucket - len(samples)))
+                whole = 1
+            blocks = samples[:whole * bucket].reshape(whole, bucket)
+            take = min(whole, count - filled)
+            peaks[filled:filled + take, 0] = blocks[:take].min(axis=1)
+            peaks[filled:filled + take, 1] = blocks[:take].max(axis=1)
+            filled += take
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    peaks[filled:] = 0
+    peaks.flush()
+    del peaks
+    return _load(_finish(cache, key, part_path))
+
+
+class MediaIndex:
+    """Filmstrip and waveform of one source file"""
+
+    def __init__(self, file_path, filmstrip=None, waveform=None):
+        self.file_path = file_path
+        self.filmstrip = filmstrip
+        self.waveform = waveform
+        self.interval = filmstrip_params()['interval']
+        self.resolution = waveform_params()['resolution']
+
+    @classmethod
+    def build(cls, file_path):
+        """Build (or load from the cache) both indexes of a file"""
+        return cls(file_path, build_filmstrip(file_path), build_waveform(file_path))
+
+    def thumbnail_at(self, t):
+        """(thumbnail, its time) of the filmstrip frame nearest to t, or None"""
+        if self.filmstrip is None:
+            return None
+        index = min(max(int(round(t / self.interval)), 0), len(self.filmstrip) - 1)
+        return self.filmstrip[index], index * self.interval
+
+    def peaks(self, start, end):
+        """Min/max buckets covering source range [start, end)"""
+        if self.waveform is None:
+            return np.zeros((0, 2), np.float32)
+        first = max(int(start * self.resolution), 0)
+        last = max(int(math.ceil(end * self.resolution)), first + 1)
+        return self.waveform[first:last]
+
+
+def edit_list_peaks(edit_list, indexes):
+    """Min/max buckets of an edit list's audio, from its sources' indexes
+
+    Returns None unless every source has a waveform.
+    """
+    parts = []
+    for path, src_in, src_out in edit_list:
+        index = indexes.get(path)
+        if index is None or index.waveform is None:
+            return None
+        parts.append(index.peaks(src_in, src_out))
+    return np.concatenate(parts) if parts else None
+
+
+def sparkline(peaks, columns):
+    """Text waveform: peak amplitude per column as block characters"""
+    if peaks is None or not len(peaks):
+        return ""
+    amplitude = np.abs(np.asarray(peaks)).max(axis=1)
+    columns = min(columns, len(amplitude))
+    edges = np.linspace(0, len(amplitude), columns + 1).astype(int)
+    levels = np.maximum.reduceat(amplitude, edges[:-1])
+    levels = np.clip(levels / max(float(levels.max()), 1e-6), 0, 1)
+    steps = np.rint(levels * (len(SPARK_CHARS) - 1)).astype(int)
+    return "".join(SPARK_CHARS[step] for step in steps)
@@ -0,0 +1,358 @@
+"""
+VEdit CLI - Export Jobs
+
+Exports run as numbered jobs on a bounded pool of worker threads
+(PERFORMANCE_CONFIG['max_export_jobs']). Each job encodes a timeline that was
+composed when it was submitted, so later edits never leak into a queued
+export, and writes its temporary files to a private work directory, so
+overlapping exports cannot collide.
+
+Cancellation is cooperative: encoders check the job's cancel flag once per
+frame (or per piece for stream copies) and raise JobCancelled, which removes
+the partial output. Progress is counted in frames and turned into an ETA from
+the observed encoding rate.
+
+Resumable jobs work in a directory under ERROR_CONFIG['recovery_directory']
+holding the timeline as submitted (TIMELINE_FILE) and an ExportProgress
+record of the segments and audio finished so far. The directory is kept
+when the job fails or is interrupted by the application quitting (or dies
+with the process), so 'export resume' can pick up where it stopped.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from proglog import ProgressBarLogger
+from config import CONFIG
+from vedit_media import probe_streams
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Files of a resumable job directory
+TIMELINE_FILE = 'export.vedit'
+PROGRESS_FILE = 'progress.json'
+
+# VIDEO_CONFIG keys that decide segment boundaries and encoding; a resumed
+# export restores them so its finished segments still fit
+RESUME_SETTINGS = ['export_mode', 'segment_split', 'segment_duration', 'keyframe_interval',
+                   'incremental_export', 'default_codec', 'default_audio_codec', 'default_fps']
+
+
+class JobCancelled(Exception):
+    """Raised inside an encoder when its job has been cancelled"""
+
+
+def format_seconds(seconds):
+    """Format a duration as M:SS (or H:MM:SS)"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ExportJob:
+    """State, progress and cancel flag of one export"""
+
+    def __init__(self, job_id, output_file, on_progress=None):
+        self.id = job_id
+        self.output_file = output_file
+        self.outputs = [output_file]    # every file the job writes
+        self.work_dir = None
+        self.state = QUEUED
+        self.error = None
+        self.frames_done = 0
+        self.frames_total = 0
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.on_progress = on_progress
+        self.reported_step = 0          # last tenth of progress reported to the UI
+        self.resumable = False          # keep the work dir when failed or interrupted
+        self.interrupted = False        # stopped by shutdown rather than by the user
+        self.lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self, interrupt=False):
+        """Ask the job to stop; returns False when it has already finished
+
+        An interrupted job (e.g. the application is quitting) keeps what it
+        has finished so it can be resumed.
+        """
+        if self.state in FINISHED_STATES:
+            return False
+        self.interrupted = interrupt
+        self._cancel.set()
+        return True
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Export job {self.id} cancelled")
+
+    def set_total(self, frames):
+        """Start counting towards a new frame total (e.g. after a fallback)"""
+        with self.lock:
+            self.frames_total = max(int(frames), 0)
+            self.frames_done = 0
+            self.reported_step = 0
+
+    def set_done(self, frames):
+        """Record the number of frames encoded so far"""
+        with self.lock:
+            self.frames_done = min(int(frames), self.frames_total or int(frames))
+        if self.on_progress:
+            self.on_progress(self)
+
+    def fraction(self):
+        """Completed fraction in [0, 1]"""
+        if self.state == COMPLETED:
+            return 1.0
+        if not self.frames_total:
+            return 0.0
+        return min(self.frames_done / self.frames_total, 1.0)
+
+    def eta(self):
+        """Estimated seconds left, or None before any frame was encoded"""
+        if self.state != RUNNING or not self.frames_done or not self.frames_total:
+            return None
+        elapsed = time.time() - self.started
+        rate = self.frames_done / elapsed if elapsed > 0 else 0
+        if rate <= 0:
+            return None
+        return max(self.frames_total - self.frames_done, 0) / rate
+
+    def describe(self):
+        """One-line status for 'export status'"""
+        name = os.path.basename(self.output_file)
+        if self.state == RUNNING:
+            eta = self.eta()
+            eta_text = f", ETA {format_seconds(eta)}" if eta is not None else ""
+            return (f"Job {self.id}: running {self.fraction():.0%} "
+                    f"({self.frames_done}/{self.frames_total} frames{eta_text}) -> {name}")
+        if self.state in FINISHED_STATES and self.started:
+            took = format_seconds(self.finished - self.started)
+            detail = f": {self.error}" if self.state == FAILED else ""
+            return f"Job {self.id}: {self.state} after {took}{detail} -> {name}"
+        return f"Job {self.id}: {self.state} -> {name}"
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns whether it did"""
+        return self._done.wait(timeout)
+
+    def progress_logger(self):
+        """moviepy/proglog logger reporting frames to this job"""
+        return JobProgressLogger(self)
+
+
+class JobProgressLogger(ProgressBarLogger):
+    """Forwards moviepy's frame counter to a job and polls its cancel flag"""
+
+    def __init__(self, job):
+        ProgressBarLogger.__init__(self, logged_bars=None)
+        self.job = job
+
+    def callback(self, **changes):
+        self.job.check_cancelled()
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        self.job.check_cancelled()
+        # 't' is the frame iterator of write_videofile; 'chunk' is audio
+        if bar == 't' and attr == 'index':
+            self.job.set_done(value + 1)
+
+
+class ExportQueue:
+    """Bounded pool running export jobs in submission order"""
+
+    def __init__(self, max_jobs=None, history=None):
+        performance = CONFIG['performance']
+        self.max_jobs = max(1, int(max_jobs or performance['max_export_jobs']))
+        self.history = history or performance['export_job_history']
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.executor = ThreadPoolExecutor(max_workers=self.max_jobs,
+                                           thread_name_prefix="vedit-export")
+
+    def submit(self, output_file, render, on_progress=None, on_finish=None, work_dir=None,
+               on_queued=None):
+        """Queue render(job) to write output_file; returns the ExportJob
+
+        With a work_dir the job is resumable: it works in that directory,
+        which survives a failure or interruption. on_queued(job) is called
+        before the job can start, so it runs ahead of anything render logs.
+        """
+        with self.lock:
+            job = ExportJob(self.next_id, output_file, on_progress)
+            job.work_dir = work_dir
+            job.resumable = work_dir is not None
+            self.next_id += 1
+            self.jobs[job.id] = job
+            self._prune()
+        if on_queued:
+            on_queued(job)
+        self.executor.submit(self._run, job, render, on_finish)
+        return job
+
+    def _prune(self):
+        # Forget the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def _run(self, job, render, on_finish):
+        job.started = time.time()
+        try:
+            job.check_cancelled()
+            job.state = RUNNING
+            if job.work_dir is None:
+                output_dir = os.path.dirname(os.path.abspath(job.output_file))
+                job.work_dir = tempfile.mkdtemp(prefix=f"vedit_job{job.id}_", dir=output_dir)
+            render(job)
+            job.check_cancelled()
+            job.state = COMPLETED
+        except JobCancelled:
+            job.state = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.state = FAILED
+        finally:
+            job.finished = time.time()
+            keep = job.resumable and (job.state == FAILED or job.interrupted)
+            if job.work_dir and CONFIG['video']['remove_temp_files'] and not keep:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+            for output in job.outputs if job.state != COMPLETED else ():
+                # Never leave a truncated export behind
+                try:
+                    if os.path.exists(output):
+                        os.remove(output)
+                except OSError:
+                    pass
+            if on_finish:
+                on_finish(job)
+            job._done.set()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def active(self):
+        """Jobs that are queued or running"""
+        return [job for job in self.list() if job.state not in FINISHED_STATES]
+
+    def cancel_all(self, interrupt=False):
+        """Cancel every unfinished job; returns how many were cancelled"""
+        return sum(1 for job in self.active() if job.cancel(interrupt))
+
+    def shutdown(self, wait=True):
+        """Interrupt outstanding jobs (resumable ones can be resumed) and stop the worker threads"""
+        self.cancel_all(interrupt=True)
+        self.executor.shutdown(wait=wait)
+
+
+class ExportProgress:
+    """Segments and audio a resumable export has finished, kept in its job directory
+
+    Every record is saved (atomically) as soon as the file it describes is
+    complete, so after a crash a record always names a whole file. Records
+    are validated again before they are trusted.
+    """
+
+    def __init__(self, work_dir):
+        self.work_dir = work_dir
+        self.path = os.path.join(work_dir, PROGRESS_FILE)
+        self.lock = threading.Lock()
+        self.data = {'segments': {}, 'audio': {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data.update(json.load(f))
+            except ValueError:
+                pass
+
+    def save(self):
+        part_path = self.path + '.part'
+        with open(part_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(part_path, self.path)
+
+    def _valid(self, record, duration=None):
+        """Whether a recorded file is still there, whole and of the right length"""
+        path = os.path.join(self.work_dir, record['file'])
+        if not os.path.exists(path) or os.path.getsize(path) != record['size']:
+            return None
+        if duration is not None:
+            try:
+                probed = probe_streams(path).get('duration')
+            except Exception:
+                return None
+            if probed is None or abs(probed - duration) > 0.1:
+                return None
+        return path
+
+    def finished_segment(self, index, start, end, key=None):
+        """Path of segment `index` if it was finished for the same range and inputs"""
+        record = self.data['segments'].get(str(index))
+        if not record or [record['start'], record['end'], record['key']] != \
+                [round(start, 6), round(end, 6), key]:
+            return None
+        return self._valid(record, end - start)
+
+    def segment_done(self, index, start, end, path, key=None):
+        with self.lock:
+            self.data['segments'][str(index)] = {'start': round(start, 6), 'end': round(end, 6),
+                                                 'key': key, 'file': os.path.basename(path),
+                                                 'size': os.path.getsize(path)}
+            self.save()
+
+    def finished_audio(self, name):
+        """Path of the finished audio track `name`, or None"""
+        record = self.data['audio'].get(name)
+        return self._valid(record) if record else None
+
+    def audio_done(self, name, path):
+        with self.lock:
+            self.data['audio'][name] = {'file': os.path.basename(path),
+                                        'size': os.path.getsize(path)}
+            self.save()
+
+    def segments_done(self):
+        return len(self.data['segments'])
+
+
+def find_interrupted_exports(root, exclude=()):
+    """Job directories of resumable exports that did not finish, newest first"""
+    if not os.path.isdir(root):
+        return []
+    exclude = set(os.path.abspath(path) for path in exclude if path)
+    found = []
+    for name in os.listdir(root):
+        path = os.path.abspath(os.path.join(root, name))
+        if name.startswith("export_") and path not in exclude \
+                and os.path.exists(os.path.join(path, TIMELINE_FILE)):
+            found.append(path)
+    return sorted(found, key=os.path.getmtime, reverse=True)
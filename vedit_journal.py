@@ -0,0 +1,164 @@
+"""
+VEdit CLI - Session Journal
+
+Crash recovery for interactive sessions. Every state-changing command is
+appended to a journal, one JSON line per command. Lines are flushed right
+away and fsync'ed in batches at most every ERROR_CONFIG['journal_sync_interval']
+seconds. Every 'auto_save_interval' seconds the whole timeline is written as a
+binary project snapshot, and the journal is truncated. Previous snapshots are
+kept as rotating backups, bounded by 'max_backup_files'.
+
+Each session writes to its own directory, which is deleted on a clean exit.
+A directory left behind therefore belongs to a session that crashed.
+Recovering it means loading its snapshot and replaying the journal tail.
+"""
+
+import os
+import json
+import time
+import shutil
+import threading
+from datetime import datetime
+from config import CONFIG
+from vedit_project import write_project, read_project
+
+JOURNAL_FILE = 'journal.log'
+SNAPSHOT_FILE = 'snapshot.vedit'
+
+
+class SessionJournal:
+    """Append-only command journal plus rotating snapshots for one session"""
+
+    def __init__(self, root):
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.directory = os.path.abspath(os.path.join(root, f"session_{stamp}_{os.getpid()}"))
+        self.seq = 0
+        self.last_snapshot = time.time()
+        self.lock = threading.Lock()
+        self._pending = threading.Event()
+        self._closed = threading.Event()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(os.path.join(self.directory, JOURNAL_FILE), 'ab')
+        self._flusher = threading.Thread(target=self._flush_loop, name="vedit-journal", daemon=True)
+        self._flusher.start()
+
+    def append(self, command):
+        """Journal a command; it reaches disk within one sync interval"""
+        with self.lock:
+            self.seq += 1
+            line = json.dumps({'seq': self.seq, 'time': time.time(), 'command': command})
+            self._file.write(line.encode('utf8') + b'\n')
+            self._file.flush()
+        self._pending.set()
+
+    def sync(self):
+        """fsync everything appended so far"""
+        with self.lock:
+            if not self._file.closed:
+                os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def _flush_loop(self):
+        # Batches fsyncs: one per interval however many commands were appended
+        while not self._closed.is_set():
+            self._pending.wait()
+            if self._closed.wait(CONFIG['error']['journal_sync_interval']):
+                break
+            self.sync()
+
+    def snapshot_due(self):
+        return time.time() - self.last_snapshot >= CONFIG['error']['auto_save_interval']
+
+    def write_snapshot(self, manifest, timeline):
+        """Write a compacted snapshot of the timeline and restart the journal"""
+        error_config = CONFIG['error']
+        snapshot = os.path.join(self.directory, SNAPSHOT_FILE)
+        with self.lock:
+            if error_config['backup_project_files'] and os.path.exists(snapshot):
+                self._rotate_backups(snapshot, error_config['max_backup_files'])
+
+            manifest = dict(manifest, journal_seq=self.seq)
+            write_project(snapshot, manifest, timeline)
+
+            # Everything journaled so far is in the snapshot
+            self._file.close()
+            self._file = open(os.path.join(self.directory, JOURNAL_FILE), 'wb')
+            self.last_snapshot = time.time()
+
+    @staticmethod
+    def _rotate_backups(snapshot, max_backups):
+        """snapshot.vedit -> snapshot.1.vedit -> ... -> snapshot.N.vedit"""
+        if max_backups <= 0:
+            return
+        base, ext = os.path.splitext(snapshot)
+        for index in range(max_backups - 1, 0, -1):
+            older = f"{base}.{index}{ext}"
+            if os.path.exists(older):
+                os.replace(older, f"{base}.{index + 1}{ext}")
+        shutil.copyfile(snapshot, f"{base}.1{ext}")
+
+    def close(self, clean=True):
+        """Stop journaling; a clean close removes the session's files"""
+        self._closed.set()
+        self._pending.set()
+        with self.lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+        if clean:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def find_crashed_sessions(root, exclude=None):
+    """Session directories left behind by sessions that did not exit cleanly, newest first"""
+    if not os.path.isdir(root):
+        return []
+    sessions = []
+    for name in os.listdir(root):
+        path = os.path.abspath(os.path.join(root, name))
+        if name.startswith("session_") and os.path.isdir(path) and path != exclude:
+            sessions.append(path)
+    return sorted(sessions, key=os.path.getmtime, reverse=True)
+
+
+def prune_sessions(sessions, keep):
+    """Delete all but the newest `keep` crashed sessions"""
+    for path in sessions[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def read_session(directory):
+    """Return (manifest, timeline, commands) needed to rebuild a crashed session
+
+    Falls back to the newest readable backup when the latest snapshot is
+    damaged; manifest and timeline are None when no snapshot was written.
+    Commands are the journal entries newer than the snapshot, with a torn
+    final line (from a crash mid-write) ignored.
+    """
+    manifest = timeline = None
+    base, ext = os.path.splitext(os.path.join(directory, SNAPSHOT_FILE))
+    candidates = [base + ext] + [f"{base}.{i}{ext}" for i in range(1, CONFIG['error']['max_backup_files'] + 1)]
+    for path in candidates:
+        if not os.path.exists(path):
+            continue
+        try:
+            manifest, timeline = read_project(path)
+            break
+        except (ValueError, OSError):
+            continue
+
+    after = manifest.get('journal_seq', 0) if manifest else 0
+    commands = []
+    journal_path = os.path.join(directory, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line.decode('utf8'))
+                except ValueError:
+                    break
+                if entry['seq'] > after:
+                    commands.append(entry['command'])
+    return manifest, timeline, commands
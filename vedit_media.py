@@ -0,0 +1,444 @@
+"""
+VEdit CLI - Media Helpers
+
+Source probing, lazily opened decoders and proxies used by the editing
+engine. Proxies are low-resolution, all-intra copies of a source used for
+editing and preview; clips are rebuilt from their edit lists (see
+vedit_timeline) against either file.
+
+Uploaded media is opened lazily: only container metadata is probed (and
+cached), and the ffmpeg decoder behind a clip is started on first frame
+access and closed again once it has been idle for a while. Every decoder is
+tracked by the shared READER_POOL, which bounds how many are open at once.
+"""
+
+import os
+import re
+import time
+import weakref
+import threading
+import subprocess
+from collections import OrderedDict, deque
+from moviepy.config import get_setting
+from moviepy.editor import VideoClip, AudioClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.audio.io.readers import FFMPEG_AudioReader
+from config import CONFIG
+from vedit_cache import get_cache, file_hash
+
+
+def _ffmpeg_stderr(args):
+    """Run ffmpeg and return its stderr text (where it reports stream info)"""
+    cmd = [get_setting("FFMPEG_BINARY"), "-hide_banner"] + list(args)
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return result.stderr.decode('utf8', 'ignore')
+
+
+# Bumped when probe_streams() results change meaning, so stale cached probes are ignored
+PROBE_VERSION = 2
+
+
+def probe_streams(file_path):
+    """Return codec parameters of the first video and audio streams"""
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'probe_streams', PROBE_VERSION)
+    streams = cache.get_json(key)
+    if streams is not None:
+        if streams.get('size'):
+            streams['size'] = tuple(streams['size'])
+        return streams
+
+    streams = _probe_streams(file_path)
+    cache.put_json(key, streams)
+    return streams
+
+
+def seed_probe(file_path, streams):
+    """Store known stream parameters for a file (e.g. from a project file)"""
+    if 'video_duration' not in streams:
+        # Saved by an older version, with the container's duration
+        return
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'probe_streams', PROBE_VERSION)
+    if cache.lookup(key, '.json') is None:
+        cache.put_json(key, streams)
+
+
+def _probe_streams(file_path):
+    """Parse stream parameters from ffmpeg's input report
+
+    The container duration can run past the last video frame (audio is often
+    a little longer), and decoders seeking into that gap get no frame at all.
+    Stream-copying the video packets to nowhere, which reads but does not
+    decode them, counts the video frames; a file clip lasts no longer than
+    they do.
+    """
+    infos = _ffmpeg_stderr(["-i", file_path, "-map", "0:v:0?", "-c", "copy", "-f", "null", "-"])
+    streams = {'video_codec': None, 'audio_codec': None, 'duration': None, 'video_duration': None}
+
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', infos)
+    if duration:
+        hours, minutes, seconds = duration.groups()
+        streams['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    video = re.search(r'Stream #\S+.*?: Video: (\w+).*?, (\w+)(?:\([^)]*\))?, (\d+)x(\d+)', infos)
+    if video:
+        streams['video_codec'] = video.group(1)
+        streams['pix_fmt'] = video.group(2)
+        streams['size'] = (int(video.group(3)), int(video.group(4)))
+        fps = re.search(r'([\d.]+) (?:fps|tbr)', infos[video.end():])
+        streams['fps'] = float(fps.group(1)) if fps else None
+        frames = re.findall(r'frame=\s*(\d+)', infos)
+        if frames and streams['fps']:
+            streams['video_duration'] = int(frames[-1]) / streams['fps']
+            if streams['duration'] is not None:
+                streams['duration'] = min(streams['duration'], streams['video_duration'])
+
+    audio = re.search(r'Stream #\S+.*?: Audio: (\w+).*?, (\d+) Hz, ([\w.()]+)', infos)
+    if audio:
+        streams['audio_codec'] = audio.group(1)
+        streams['sample_rate'] = int(audio.group(2))
+        streams['channel_layout'] = audio.group(3)
+
+    return streams
+
+
+def probe_keyframes(file_path):
+    """Return the sorted presentation times of every video keyframe"""
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'probe_keyframes')
+    times = cache.get_json(key)
+    if times is not None:
+        return times
+
+    # Decoding only keyframes keeps this far cheaper than a full decode
+    infos = _ffmpeg_stderr(["-skip_frame", "nokey", "-i", file_path,
+                            "-an", "-vf", "showinfo", "-f", "null", "-"])
+    times = sorted(set(float(t) for t in re.findall(r'pts_time:(-?[\d.]+)', infos)))
+    cache.put_json(key, times)
+    return times
+
+
+def probe_media(file_path):
+    """Metadata needed to list and preview a file, without opening a decoder"""
+    streams = probe_streams(file_path)
+    return {
+        'duration': streams['duration'],
+        'size': streams.get('size'),
+        'fps': streams.get('fps'),
+        'has_video': streams['video_codec'] is not None,
+        'has_audio': streams['audio_codec'] is not None,
+    }
+
+
+class ReaderPool:
+    """Tracks every decoder handle, capping how many hold an open ffmpeg process
+
+    Clips sharing a file's decoder (a clip and its subclips or copies) each
+    hold a reference on its handle; the decoder is closed when the last one is
+    dropped. At most PERFORMANCE_CONFIG['max_concurrent_clips'] decoders stay
+    open at once, least recently used ones being closed first, and decoders
+    idle for 'reader_idle_timeout' seconds are closed by a background sweeper.
+
+    References are dropped by finalizers, which the garbage collector can run
+    in any thread while it holds any lock (this pool's included), so they only
+    queue the handle; the next pool operation or sweep settles the count.
+    """
+
+    def __init__(self, max_open):
+        self.max_open = max_open
+        self.lock = threading.Lock()
+        self.handles = weakref.WeakSet()
+        self.open_handles = OrderedDict()   # id(handle) -> handle, least recent first
+        self.opened = 0
+        self.closed = 0
+        self.evicted = 0
+        self.peak_open = 0
+        self.dropped = deque()
+        self._sweeper = None
+
+    def register(self, handle):
+        with self.lock:
+            self.handles.add(handle)
+
+    def retain(self, handle):
+        """Add a clip's reference to a handle"""
+        with self.lock:
+            handle.refs += 1
+
+    def release(self, handle):
+        """Drop a clip's reference (from a finalizer: never blocks)"""
+        self.dropped.append(handle)
+
+    def collect(self):
+        """Settle dropped references, closing decoders no clip uses any more"""
+        while True:
+            try:
+                handle = self.dropped.popleft()
+            except IndexError:
+                return
+            with self.lock:
+                handle.refs -= 1
+                unused = handle.refs <= 0
+            # A decoder still being read from is left to the idle sweeper
+            if unused:
+                handle.try_release()
+
+    def mark_open(self, handle):
+        """Record a newly opened decoder and close the least recently used extras"""
+        self.collect()
+        with self.lock:
+            self.open_handles[id(handle)] = handle
+            self.opened += 1
+            self.peak_open = max(self.peak_open, len(self.open_handles))
+            victims = [h for h in self.open_handles.values() if h is not handle]
+            victims = victims[:max(0, len(self.open_handles) - self.max_open)]
+        for victim in victims:
+            # Never wait on a decoder another thread is reading from
+            if victim.try_release():
+                with self.lock:
+                    self.evicted += 1
+        self._start_sweeper()
+
+    def mark_used(self, handle):
+        with self.lock:
+            if id(handle) in self.open_handles:
+                self.open_handles.move_to_end(id(handle))
+
+    def mark_closed(self, handle):
+        with self.lock:
+            if self.open_handles.pop(id(handle), None) is not None:
+                self.closed += 1
+
+    def release_idle(self, max_idle):
+        """Close every decoder that has not been used for max_idle seconds"""
+        self.collect()
+        cutoff = time.time() - max_idle
+        with self.lock:
+            idle = [h for h in self.open_handles.values() if h.last_used < cutoff]
+        for handle in idle:
+            handle.try_release()
+
+    def release_all(self):
+        """Close every open decoder (handles reopen on their next access)"""
+        self.collect()
+        with self.lock:
+            handles = list(self.handles)
+        for handle in handles:
+            handle.release()
+
+    def detach(self):
+        """Forget decoders inherited across fork() without closing the parent's"""
+        self.lock = threading.Lock()
+        for handle in list(self.handles):
+            handle.lock = threading.RLock()
+            handle.video_reader = None
+            handle.audio_reader = None
+        self.open_handles.clear()
+        self.dropped.clear()
+        self._sweeper = None
+
+    def _start_sweeper(self):
+        with self.lock:
+            if self._sweeper is not None:
+                return
+
+            def loop():
+                while True:
+                    timeout = CONFIG['performance']['reader_idle_timeout']
+                    time.sleep(max(1.0, timeout / 2))
+                    self.release_idle(timeout)
+
+            self._sweeper = threading.Thread(target=loop, name="vedit-reader-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        """Counters for open decoders and decoder churn"""
+        self.collect()
+        with self.lock:
+            return {'open': len(self.open_handles), 'limit': self.max_open,
+                    'peak': self.peak_open, 'handles': len(self.handles),
+                    'opened': self.opened, 'closed': self.closed, 'evicted': self.evicted}
+
+
+READER_POOL = ReaderPool(CONFIG['performance']['max_concurrent_clips'])
+
+
+def detach_handles():
+    """Forget decoders inherited across fork() without closing the parent's"""
+    READER_POOL.detach()
+
+
+class MediaHandle:
+    """Opens a file's ffmpeg decoders on demand and can release them again"""
+
+    def __init__(self, path, duration=None, fps=None):
+        self.path = path
+        # Start of the last video frame; a reader seeking past it gets no frame
+        self.last_frame_time = duration - 1.0 / fps if duration and fps else None
+        self.refs = 0
+        self.lock = threading.RLock()
+        self.video_reader = None
+        self.audio_reader = None
+        self.last_used = time.time()
+        READER_POOL.register(self)
+
+    def is_open(self):
+        return self.video_reader is not None or self.audio_reader is not None
+
+    def get_video_frame(self, t):
+        """Decode the video frame at time t, opening the decoder if needed"""
+        if self.last_frame_time is not None:
+            t = min(t, self.last_frame_time)
+        with self.lock:
+            if self.video_reader is None:
+                self.video_reader = FFMPEG_VideoReader(self.path)
+                READER_POOL.mark_open(self)
+            else:
+                READER_POOL.mark_used(self)
+            self.last_used = time.time()
+            return self.video_reader.get_frame(t)
+
+    def get_audio_frame(self, t):
+        """Decode audio samples at time(s) t, opening the decoder if needed"""
+        with self.lock:
+            if self.audio_reader is None:
+                self.audio_reader = FFMPEG_AudioReader(self.path, buffersize=200000)
+                READER_POOL.mark_open(self)
+            else:
+                READER_POOL.mark_used(self)
+            self.last_used = time.time()
+            return self.audio_reader.get_frame(t)
+
+    def release(self):
+        """Close any open decoder; the next frame access reopens it"""
+        with self.lock:
+            if self.video_reader is not None:
+                self.video_reader.close()
+                self.video_reader = None
+            if self.audio_reader is not None:
+                self.audio_reader.close_proc()
+                self.audio_reader = None
+            READER_POOL.mark_closed(self)
+
+    def try_release(self):
+        """release() unless another thread is decoding; returns True if released"""
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            self.release()
+        finally:
+            self.lock.release()
+        return True
+
+
+class PooledClip:
+    """Mixin holding a reference on a MediaHandle for each clip copy
+
+    moviepy derives subclips and effects by shallow copy, so every copy
+    retains the shared handle and releases it when garbage collected.
+    """
+
+    def hold(self, handle):
+        self.handle = handle
+        READER_POOL.retain(handle)
+        weakref.finalize(self, READER_POOL.release, handle)
+
+    def __copy__(self):
+        newclip = self.__class__.__new__(self.__class__)
+        newclip.__dict__.update(self.__dict__)
+        newclip.hold(self.handle)
+        return newclip
+
+    def close(self):
+        """Release the decoders behind this clip"""
+        self.handle.release()
+
+
+class LazyAudioClip(PooledClip, AudioClip):
+    """Audio track of a file whose decoder opens on first access"""
+
+    def __init__(self, handle, duration):
+        AudioClip.__init__(self)
+        self.hold(handle)
+        self.fps = 44100
+        self.nchannels = 2
+        self.duration = self.end = duration
+        self.make_frame = handle.get_audio_frame
+
+
+class LazyVideoClip(PooledClip, VideoClip):
+    """Video file clip built from probed metadata; decodes on first access"""
+
+    def __init__(self, path, info=None):
+        VideoClip.__init__(self)
+        info = info or probe_media(path)
+        self.filename = path
+        self.hold(MediaHandle(path, info['duration'], info['fps']))
+        self.size = tuple(info['size'])
+        self.fps = info['fps']
+        self.duration = self.end = info['duration']
+        self.make_frame = self.handle.get_video_frame
+        if info['has_audio']:
+            self.audio = LazyAudioClip(self.handle, info['duration'])
+
+
+class LazyAudioFileClip(LazyAudioClip):
+    """Audio file clip built from probed metadata; decodes on first access"""
+
+    def __init__(self, path, info=None):
+        info = info or probe_media(path)
+        LazyAudioClip.__init__(self, MediaHandle(path), info['duration'])
+        self.filename = path
+
+
+def proxy_params():
+    """Encoding parameters that identify a proxy in the cache"""
+    video_config = CONFIG['video']
+    return {'height': video_config['proxy_height'], 'crf': video_config['proxy_crf'],
+            'codec': 'libx264', 'gop': 1}
+
+
+def cached_proxy(file_path):
+    """Path of an existing proxy for the source, or None"""
+    cache = get_cache()
+    return cache.lookup(cache.make_key(file_hash(file_path), 'proxy', proxy_params()), '.mp4')
+
+
+def create_proxy(file_path):
+    """Return a proxy for the source, encoding one if none is cached
+
+    Returns None for still images and for sources already no larger than
+    the proxy size.
+    """
+    params = proxy_params()
+    streams = probe_streams(file_path)
+    if not streams.get('duration') or not streams.get('size') \
+            or streams['size'][1] <= params['height']:
+        return None
+
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'proxy', params)
+    proxy_path = cache.lookup(key, '.mp4')
+    if proxy_path is not None:
+        return proxy_path
+
+    # Every frame is a keyframe so scrubbing and cuts never decode a GOP
+    part_path = cache.reserve(key, '.mp4')
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-i", file_path,
+           "-vf", f"scale=-2:{params['height']}",
+           "-c:v", params['codec'], "-preset", "ultrafast", "-crf", str(params['crf']),
+           "-g", str(params['gop']), "-pix_fmt", "yuv420p",
+           "-c:a", "aac", "-b:a", "96k", "-f", "mp4", part_path]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise IOError(f"Proxy encode failed: {result.stderr.decode('utf8', 'ignore').strip()}")
+
+    if not cache.enabled:
+        final_path = os.path.splitext(part_path)[0]
+        os.replace(part_path, final_path)
+        return final_path
+    return cache.commit(key, '.mp4', part_path)
+
@@ -0,0 +1,222 @@
+"""
+VEdit CLI - Audio Mixer
+
+Mixes the timeline's own audio with its overdubs for export. Each audio
+source is decoded once by ffmpeg into a float32 (samples, 2) buffer at
+MIX_SAMPLE_RATE, held in memory or, for tracks longer than
+PERFORMANCE_CONFIG['mix_memmap_seconds'], memory-mapped from the job's work
+directory. Tracks are summed block by block with vectorized gain and fade
+envelopes, a look-ahead limiter keeps the sum under 'mix_ceiling_db', and
+the finished PCM is piped straight into the audio encoder.
+"""
+
+import os
+import math
+import subprocess
+import numpy as np
+from moviepy.config import get_setting
+from config import CONFIG
+from vedit_media import probe_streams
+
+MIX_SAMPLE_RATE = 44100
+MIX_CHANNELS = 2
+
+# Samples processed per vectorized step (bounds temporaries for long mixes)
+BLOCK_SAMPLES = 1 << 18
+
+# Samples requested from a moviepy clip at once (its readers buffer ~200000)
+CLIP_BLOCK_SAMPLES = 50000
+
+# Limiter gain is computed per window of this many samples (10ms)
+LIMITER_WINDOW = MIX_SAMPLE_RATE // 100
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+def _buffer(samples, work_dir, name):
+    """Zeroed float32 (samples, channels) buffer, memory-mapped when long"""
+    seconds = samples / MIX_SAMPLE_RATE
+    if work_dir and seconds > CONFIG['performance']['mix_memmap_seconds']:
+        path = os.path.join(work_dir, f"{name}.npy")
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                         shape=(samples, MIX_CHANNELS))
+    return np.zeros((samples, MIX_CHANNELS), np.float32)
+
+
+def decode_audio(file_path, work_dir=None, name="track"):
+    """Decode a file's audio into a float32 (samples, 2) buffer, or None"""
+    streams = probe_streams(file_path)
+    if not streams.get('audio_codec'):
+        return None
+
+    # Room for the probed duration; the decoder decides the final length
+    expected = int(math.ceil((streams.get('duration') or 0) * MIX_SAMPLE_RATE)) + MIX_SAMPLE_RATE
+    pcm = _buffer(expected, work_dir, name)
+    cmd = [get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-i", file_path,
+           "-vn", "-sn", "-ac", str(MIX_CHANNELS), "-ar", str(MIX_SAMPLE_RATE),
+           "-f", "f32le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            bufsize=1024 * 1024)
+    frame_bytes = 4 * MIX_CHANNELS
+    filled = 0
+    pending = b''
+    try:
+        while filled < expected:
+            data = proc.stdout.read(frame_bytes * BLOCK_SAMPLES)
+            if not data:
+                break
+            data = pending + data
+            count = min(len(data) // frame_bytes, expected - filled)
+            pending = data[count * frame_bytes:]
+            pcm[filled:filled + count] = np.frombuffer(data[:count * frame_bytes], np.float32) \
+                .reshape(count, MIX_CHANNELS)
+            filled += count
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    return pcm[:filled]
+
+
+def render_clip_audio(clip, samples, work_dir=None, job=None):
+    """Render a moviepy audio clip into a float32 buffer, one block at a time"""
+    pcm = _buffer(samples, work_dir, "timeline")
+    for start in range(0, samples, CLIP_BLOCK_SAMPLES):
+        if job:
+            job.check_cancelled()
+        end = min(start + CLIP_BLOCK_SAMPLES, samples)
+        times = np.arange(start, end) / MIX_SAMPLE_RATE
+        times = times[times < clip.duration]
+        if not len(times):
+            break
+        block = np.asarray(clip.get_frame(times), dtype=np.float32)
+        if block.ndim == 1:
+            block = block[:, None]
+        pcm[start:start + len(times)] = block[:, :MIX_CHANNELS]
+    return pcm
+
+
+def envelope(first, count, length, gain, fade_in, fade_out):
+    """Gain of samples first..first+count of a track that plays for `length` samples"""
+    index = np.arange(first, first + count, dtype=np.float32)
+    env = np.full(count, gain, np.float32)
+    if fade_in > 0:
+        env *= np.clip(index / (fade_in * MIX_SAMPLE_RATE), 0.0, 1.0)
+    if fade_out > 0:
+        env *= np.clip((length - index) / (fade_out * MIX_SAMPLE_RATE), 0.0, 1.0)
+    return env
+
+
+def limiter_gains(pcm, ceiling):
+    """Per-window gains that keep every sample of pcm at or below ceiling
+
+    Each window's gain is the lowest needed by it or its neighbours within
+    the release time, so the gain interpolated between window centres never
+    exceeds what any sample needs.
+    """
+    windows = math.ceil(len(pcm) / LIMITER_WINDOW)
+    peaks = np.zeros(windows, np.float32)
+    for start in range(0, len(pcm), BLOCK_SAMPLES):
+        block = np.abs(pcm[start:start + BLOCK_SAMPLES]).max(axis=1)
+        count = math.ceil(len(block) / LIMITER_WINDOW)
+        padded = np.zeros(count * LIMITER_WINDOW, np.float32)
+        padded[:len(block)] = block
+        first = start // LIMITER_WINDOW
+        peaks[first:first + count] = padded.reshape(count, LIMITER_WINDOW).max(axis=1)
+
+    gains = np.minimum(1.0, ceiling / np.maximum(peaks, 1e-9))
+    if gains.min() >= 1.0:
+        return None
+    reach = max(1, int(CONFIG['performance']['mix_release'] * 100))
+    padded = np.pad(gains, reach, mode='edge')
+    return np.lib.stride_tricks.sliding_window_view(padded, 2 * reach + 1).min(axis=1)
+
+
+class AudioMix:
+    """Recipe for one export's audio: an optional base clip plus overdub tracks"""
+
+    def __init__(self, duration, base=None):
+        self.duration = duration
+        self.base = base
+        self.tracks = []
+
+    def add(self, file_path, start_time, gain_db=0.0, fade_in=0.0, fade_out=0.0):
+        """Play a file's audio from start_time on the timeline"""
+        self.tracks.append({'path': file_path, 'start_time': start_time, 'gain_db': gain_db,
+                            'fade_in': fade_in, 'fade_out': fade_out})
+
+    def render(self, work_dir=None, job=None, log=print):
+        """Mix everything into one float32 (samples, 2) buffer"""
+        samples = int(math.ceil(self.duration * MIX_SAMPLE_RATE))
+        if self.base is not None:
+            mix = render_clip_audio(self.base, samples, work_dir, job)
+        else:
+            mix = _buffer(samples, work_dir, "mix")
+
+        # Each source is decoded once, however many overdubs use it
+        decoded = {}
+        for track in self.tracks:
+            if job:
+                job.check_cancelled()
+            path = track['path']
+            if path not in decoded:
+                decoded[path] = decode_audio(path, work_dir, f"track{len(decoded)}")
+            pcm = decoded[path]
+            if pcm is None:
+                log(f"No audio in {os.path.basename(path)}, overdub skipped")
+                continue
+
+            offset = int(round(track['start_time'] * MIX_SAMPLE_RATE))
+            first = max(0, -offset)
+            last = min(len(pcm), samples - offset)
+            gain = db_to_gain(track['gain_db'])
+            # A track cut off by the end of the mix fades out before the cut
+            for start in range(first, last, BLOCK_SAMPLES):
+                end = min(start + BLOCK_SAMPLES, last)
+                env = envelope(start, end - start, last, gain,
+                               track['fade_in'], track['fade_out'])
+                mix[offset + start:offset + end] += pcm[start:end] * env[:, None]
+
+        gains = limiter_gains(mix, db_to_gain(CONFIG['performance']['mix_ceiling_db']))
+        if gains is not None:
+            centres = (np.arange(len(gains)) + 0.5) * LIMITER_WINDOW
+            limited = 0
+            for start in range(0, samples, BLOCK_SAMPLES):
+                end = min(start + BLOCK_SAMPLES, samples)
+                block_gains = np.interp(np.arange(start, end), centres, gains).astype(np.float32)
+                if block_gains.min() < 1.0:
+                    mix[start:end] *= block_gains[:, None]
+                    limited += int(np.count_nonzero(block_gains < 1.0))
+            log(f"Limiter reduced gain on {limited / MIX_SAMPLE_RATE:.2f}s of the mix")
+        return mix
+
+    def write(self, output_file, work_dir=None, job=None, log=print):
+        """Render the mix and encode it to output_file; returns output_file"""
+        log(f"Mixing {len(self.tracks)} overdub(s)"
+            f"{' over the timeline audio' if self.base is not None else ''}")
+        mix = self.render(work_dir, job, log)
+
+        cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+               "-f", "f32le", "-ar", str(MIX_SAMPLE_RATE), "-ac", str(MIX_CHANNELS), "-i", "-",
+               "-c:a", CONFIG['video']['default_audio_codec'], output_file]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for start in range(0, len(mix), BLOCK_SAMPLES):
+                if job:
+                    job.check_cancelled()
+                proc.stdin.write(np.ascontiguousarray(mix[start:start + BLOCK_SAMPLES]).tobytes())
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            if not proc.stdin.closed:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+            proc.wait()
+            del mix
+        if proc.returncode != 0:
+            raise IOError(f"Audio encoding failed: {proc.stderr.read().decode('utf8', 'ignore').strip()}")
+        return output_file
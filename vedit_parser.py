@@ -0,0 +1,167 @@
+"""
+VEdit CLI - Command Parser
+
+Tokenizer and grammar for the command language. Every line is scanned once
+with a single compiled regular expression and parsed into a Command:
+
+    verb word word ...            e.g. split video_1 0:05
+    verb(arg, arg, ...)           e.g. overlay(photo_1, 0:01, 0:03, fade-in-out)
+    target: verb(arg, ...)        e.g. video_1: remove(0:02, 0:04)
+
+Verbs and aliases are matched case-insensitively; arguments keep their case,
+so file paths and text survive intact. Quoted strings ("..." or '...') may
+contain spaces, commas and parentheses.
+"""
+
+import re
+
+# One pass over the line; each match is (string, punctuation, word, stray quote)
+_TOKEN_RE = re.compile(r'''\s*(?:
+    ("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | ([(),])
+  | ([^\s(),"']+)
+  | (["'])
+)''', re.VERBOSE)
+
+
+class ParseError(ValueError):
+    """A command line that does not fit the grammar"""
+
+
+def _token_starts(line):
+    """Start offset of every token in the line (only needed on rare paths)"""
+    return [match.start(match.lastindex) for match in _TOKEN_RE.finditer(line)]
+
+
+def _value(token):
+    """Value of one token: quoted strings lose their quotes"""
+    string, punct, word, _ = token
+    if string:
+        return string[1:-1].replace('\\' + string[0], string[0])
+    return punct or word
+
+
+class Command:
+    """A parsed command: verb, optional target clip and arguments
+
+    args holds argument values (quotes removed); first is the index of the
+    first argument's token in raw, so handlers can take the remainder of a
+    line verbatim (e.g. a path containing spaces).
+    """
+
+    __slots__ = ('verb', 'target', 'args', 'first', 'call', 'raw')
+
+    def __init__(self, verb, target=None, args=(), first=0, call=False, raw=''):
+        self.verb = verb
+        self.target = target
+        self.args = list(args)
+        self.first = first
+        self.call = call
+        self.raw = raw
+
+    def __repr__(self):
+        return f"Command({self.verb!r}, target={self.target!r}, args={self.args!r})"
+
+    def arg(self, index, default=None):
+        """Argument value by position"""
+        return self.args[index] if index < len(self.args) else default
+
+    def word(self, index):
+        """Lowercased argument, for matching keywords such as 'show' or 'on'"""
+        return self.args[index].lower() if index < len(self.args) else ''
+
+    def rest(self, index):
+        """Raw text from argument index to the end of the line, or None"""
+        if index >= len(self.args):
+            return None
+        if index == len(self.args) - 1 or self.call:
+            return self.args[index]
+        return self.raw[_token_starts(self.raw)[self.first + index]:].strip()
+
+
+class CommandParser:
+    """Parses command lines against a fixed verb table"""
+
+    def __init__(self, verbs, aliases=None):
+        self.verbs = {verb.lower(): verb.lower() for verb in verbs}
+        for name, verb in (aliases or {}).items():
+            if verb.lower() in self.verbs:
+                self.verbs[name.lower()] = verb.lower()
+
+    def tokenize(self, line):
+        """Return (string, punctuation, word) token tuples (one field is set)"""
+        tokens = _TOKEN_RE.findall(line)
+        for token in tokens:
+            if token[3]:
+                raise ParseError(f"Unterminated string in: {line.strip()}")
+        return tokens
+
+    def resolve(self, word):
+        """Canonical verb for a word (or alias), or None"""
+        return self.verbs.get(word.lower())
+
+    def parse(self, line):
+        """Parse one command line into a Command (None for blank lines)"""
+        tokens = self.tokenize(line)
+        if not tokens:
+            return None
+
+        # Optional "target:" prefix
+        target = None
+        skipped = 0
+        word = tokens[0][2]
+        if word.endswith(':') and len(word) > 1 and len(tokens) > 1:
+            target, tokens, skipped = word[:-1], tokens[1:], 1
+        elif word and len(tokens) > 2 and tokens[1][2] == ':':
+            target, tokens, skipped = word, tokens[2:], 2
+        elif ':' in word[1:]:
+            # "clip:verb(...)" written without a space
+            head, _, tail = word.partition(':')
+            if self.resolve(tail):
+                target, tokens = head, [('', '', tail, '')] + tokens[1:]
+
+        word = tokens[0][2]
+        verb = self.verbs.get(word.lower()) if word else None
+        if verb is None:
+            raise ParseError(f"Unknown command: {tokens[0][0] or tokens[0][1] or word}")
+
+        if len(tokens) > 1 and tokens[1][1] == '(':
+            return self._parse_call(verb, target, line, tokens, skipped)
+
+        args = [_value(token) for token in tokens[1:]]
+        return Command(verb, target, args, skipped + 1, raw=line)
+
+    def _parse_call(self, verb, target, line, tokens, skipped):
+        """Comma-separated arguments of verb(...), which must close the line"""
+        args = []
+        depth = 0
+        start = 2
+        for index in range(2, len(tokens)):
+            punct = tokens[index][1]
+            if punct == '(':
+                depth += 1
+            elif punct == ')' and depth:
+                depth -= 1
+            elif punct == ')':
+                if index != len(tokens) - 1:
+                    raise ParseError("Unexpected text after ')'")
+                if index > 2 or args:
+                    args.append(self._argument(line, tokens, start, index, skipped))
+                return Command(verb, target, args, skipped + 2, call=True, raw=line)
+            elif punct == ',' and not depth:
+                args.append(self._argument(line, tokens, start, index, skipped))
+                start = index + 1
+
+        raise ParseError("Missing ')'")
+
+    @staticmethod
+    def _argument(line, tokens, start, end, skipped):
+        """Value of the argument made of tokens[start:end]"""
+        if end - start == 1:
+            return _value(tokens[start])
+        if end == start:
+            return ''
+        # Several tokens, e.g. an unquoted path with spaces: take it as written
+        starts = _token_starts(line)
+        last = tokens[end - 1]
+        return line[starts[skipped + start]:starts[skipped + end - 1] + len(last[0] or last[1] or last[2])]
@@ -0,0 +1,138 @@
+"""
+VEdit CLI - Frame Pipeline
+
+Encodes a clip as three overlapped stages instead of moviepy's serial
+decode-composite-encode loop. A decoder thread renders the base frames
+ahead of time, the calling thread blends overlay and text layers (when the
+clip is a FlatCompositor) and a writer thread pipes finished frames into
+ffmpeg. The stages are joined by bounded queues of
+PERFORMANCE_CONFIG['pipeline_queue_frames'] frames, so reader I/O and
+ffmpeg's encode time overlap with Python-side compositing and throughput
+approaches that of the slowest stage.
+"""
+
+import math
+import queue
+import threading
+import numpy as np
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from config import CONFIG
+from vedit_compositor import FlatCompositor
+
+# Sentinel closing a stage's queue
+_END = object()
+
+# Seconds a blocked stage waits before checking whether the pipeline stopped
+_POLL_SECONDS = 0.1
+
+
+def frame_count(duration, fps):
+    """Frames encoded for `duration` seconds, as many as moviepy's iter_frames yields
+
+    A last, partial frame interval still gets a frame.
+    """
+    return int(math.ceil(round(duration * fps, 6)))
+
+
+def frame_stages(video):
+    """(decode, composite) functions of a clip; composite is None when it has no layers"""
+    if isinstance(video, FlatCompositor) and video.layers:
+        # The compositor reuses its output buffer, so queued frames are copies
+        return video.base.get_frame, lambda t, frame: video.blend_frame(t, frame).copy()
+    return video.get_frame, None
+
+
+def _put(stage_queue, item, stop):
+    """Queue an item, giving up (False) once the pipeline has stopped"""
+    while not stop.is_set():
+        try:
+            stage_queue.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(stage_queue, stop):
+    """Next queued item, or _END once the pipeline has stopped"""
+    while not stop.is_set():
+        try:
+            return stage_queue.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            pass
+    return _END
+
+
+def write_pipelined(video, output_file, fps, codec='libx264', bitrate=None, preset='medium',
+                    audio_file=None, ffmpeg_params=None, start=0.0, end=None, on_frame=None):
+    """Encode video (from start to end) to output_file with overlapped stages
+
+    on_frame(count) is called from the calling thread after each composited
+    frame and may raise (e.g. JobCancelled) to abort the encode.
+    """
+    end = video.duration if end is None else end
+    total = frame_count(end - start, fps)
+    decode, composite = frame_stages(video)
+    depth = CONFIG['performance']['pipeline_queue_frames']
+    decoded = queue.Queue(maxsize=depth)
+    finished = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    failures = []
+
+    def decoder():
+        try:
+            for index in range(total):
+                t = start + index / fps
+                frame = decode(t)
+                if frame.dtype != np.uint8:
+                    frame = frame.astype(np.uint8)
+                if not _put(decoded, (t, frame), stop):
+                    return
+        except Exception as e:
+            failures.append(e)
+        _put(decoded, _END, stop)
+
+    writer = FFMPEG_VideoWriter(output_file, video.size, fps, codec=codec, audiofile=audio_file,
+                                preset=preset, bitrate=bitrate, ffmpeg_params=ffmpeg_params)
+
+    def encoder():
+        while True:
+            frame = _get(finished, stop)
+            if frame is _END:
+                return
+            if failures:
+                # Keep draining so the compositor never blocks on a dead writer
+                continue
+            try:
+                writer.write_frame(frame)
+            except Exception as e:
+                failures.append(e)
+
+    threads = [threading.Thread(target=decoder, name="vedit-decode", daemon=True),
+               threading.Thread(target=encoder, name="vedit-encode", daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        count = 0
+        while not failures:
+            item = _get(decoded, stop)
+            if item is _END:
+                break
+            t, frame = item
+            _put(finished, composite(t, frame) if composite else frame, stop)
+            count += 1
+            if on_frame:
+                on_frame(count)
+        if failures:
+            stop.set()
+        else:
+            _put(finished, _END, stop)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+        writer.close()
+    if failures:
+        raise failures[0]
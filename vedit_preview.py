@@ -0,0 +1,340 @@
+"""
+VEdit CLI - Preview Rendering
+
+Scrubbable thumbnail-size previews of a clip or of the whole project.
+Frames are decoded on a background thread by OpenCV readers that decode
+forward from the current position and only seek (to the keyframe before the
+target, then forward) when the playhead jumps. While the playhead is being
+dragged, frames are snapped to the keyframe before the requested time so
+each costs a single decode; the exact frame follows once dragging pauses.
+
+Decoded frames are kept in an LRU cache of NumPy arrays keyed by
+(source, time, size), so scrubbing back over a region is served from memory.
+Overlays and text are laid out at full resolution and scaled down with the
+frame, so the preview matches the export's layout.
+"""
+
+import time
+import bisect
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+from PIL import Image
+from moviepy.editor import VideoClip
+from config import CONFIG
+from vedit_compositor import FlatCompositor
+from vedit_media import probe_keyframes
+from vedit_timeline import EditList, is_still_image
+
+
+def thumbnail_size(size, width):
+    """Preview size for a frame size: `width` wide, even dimensions, same aspect"""
+    w, h = size
+    width = min(width, w)
+    height = max(2, int(round(width * h / w / 2)) * 2)
+    return int(width) // 2 * 2, height
+
+
+class ThumbnailCache:
+    """Thread-safe LRU cache of decoded preview frames, bounded in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            frame = self.entries.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key, frame):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self.entries[key] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class PreviewReader:
+    """Downscaling OpenCV reader for one source file at one thumbnail size"""
+
+    # Forward jumps shorter than this many frames are decoded through, not sought
+    MAX_SKIP = 30
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.capture = None
+        self.still = None
+        self.next_index = None
+        if is_still_image(path):
+            with Image.open(path) as image:
+                self.still = np.asarray(image.convert('RGB').resize(size, Image.BILINEAR))
+            return
+
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Cannot open {path} for preview")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or CONFIG['video']['default_fps']
+        self.keyframes = None
+
+    def keyframe_before(self, t):
+        """Time of the last keyframe at or before t"""
+        if self.keyframes is None:
+            self.keyframes = probe_keyframes(self.path) or [0.0]
+        index = bisect.bisect_right(self.keyframes, t + 1e-6) - 1
+        return self.keyframes[max(index, 0)]
+
+    def read(self, t):
+        """RGB frame at source time t, resized to the thumbnail size"""
+        if self.still is not None:
+            return self.still
+
+        index = int(t * self.fps + 1e-6)
+        if self.next_index is None or not (self.next_index <= index <= self.next_index + self.MAX_SKIP):
+            self.capture.set(cv2.CAP_PROP_POS_MSEC, index * 1000.0 / self.fps)
+        else:
+            for _ in range(index - self.next_index):
+                self.capture.grab()
+
+        ok, frame = self.capture.read()
+        if not ok:
+            # Past the last decodable frame: stay on it
+            self.next_index = None
+            if index == 0:
+                raise IOError(f"Cannot decode {self.path}")
+            return self.read(max(0.0, (index - 1) / self.fps))
+        self.next_index = index + 1
+        frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class PreviewSource:
+    """What a preview plays: parts back to back at a nominal size, plus layers
+
+    Parts are EditLists (decoded by PreviewReaders, through path_map, e.g.
+    to proxies) or moviepy clips (rendered and downscaled). Transitions are
+    shown as cuts. key identifies the content for the thumbnail cache.
+    """
+
+    def __init__(self, name, key, parts, size, layers=(), path_map=None):
+        self.name = name
+        self.key = key
+        self.parts = list(parts)
+        self.size = tuple(size)
+        self.layers = list(layers)
+        self.path_map = path_map or {}
+        self.starts = []
+        elapsed = 0.0
+        for part in self.parts:
+            self.starts.append(elapsed)
+            elapsed += part.duration
+        self.duration = elapsed
+
+    def locate(self, t):
+        """(part, local time) playing at time t"""
+        t = min(max(t, 0.0), max(self.duration - 1e-6, 0.0))
+        index = max(bisect.bisect_right(self.starts, t) - 1, 0)
+        return self.parts[index], t - self.starts[index]
+
+
+class PreviewRenderer:
+    """Renders preview frames on a background thread, latest request first
+
+    on_frame(source, t, frame, cached) is called from the worker thread with
+    every rendered frame; `t` is the time actually shown (a keyframe while
+    scrubbing). index_lookup(path) may return a MediaIndex (vedit_index)
+    whose filmstrip then stands in for keyframes while scrubbing.
+    """
+
+    def __init__(self, on_frame=None, log=print, index_lookup=None):
+        performance = CONFIG['performance']
+        self.on_frame = on_frame
+        self.log = log
+        self.index_lookup = index_lookup
+        self.cache = ThumbnailCache(performance['preview_cache_size'])
+        self.readers = OrderedDict()
+        self.max_readers = performance['preview_readers']
+        self.compositor = None          # (source key, size, FlatCompositor)
+        self.lock = threading.Lock()    # guards readers and compositor
+        self.condition = threading.Condition()
+        self.pending = None
+        self.last_request = 0.0
+        self.thread = None
+        self.closed = False
+
+    def frame_size(self, source):
+        return thumbnail_size(source.size, CONFIG['ui']['preview_width'])
+
+    def reader(self, path, size):
+        """Cached PreviewReader, closing the least recently used beyond the limit"""
+        key = (path, size)
+        reader = self.readers.pop(key, None)
+        if reader is None:
+            reader = PreviewReader(path, size)
+        self.readers[key] = reader
+        while len(self.readers) > self.max_readers:
+            _, old = self.readers.popitem(last=False)
+            old.close()
+        return reader
+
+    def layer_compositor(self, source, size):
+        """FlatCompositor drawing the source's layers at preview scale"""
+        if not source.layers:
+            return None
+        if self.compositor is None or self.compositor[:2] != (source.key, size):
+            factor = size[0] / source.size[0]
+            base = VideoClip(duration=source.duration)
+            base.size = size
+            layers = [layer.scaled(factor) for layer in source.layers]
+            self.compositor = (source.key, size, FlatCompositor(base, layers))
+        return self.compositor[2]
+
+    def snap(self, source, t):
+        """Time of the keyframe at or before t in the source playing at t"""
+        part, local_t = source.locate(t)
+        if not isinstance(part, EditList):
+            return t
+        path, source_time = part.locate(local_t)
+        path = source.path_map.get(path, path)
+        if is_still_image(path):
+            return t
+        return t - (source_time - self.reader(path, self.frame_size(source)).keyframe_before(source_time))
+
+    def filmstrip_frame(self, source, t, size):
+        """(frame, time) from the filmstrip of the file playing at t, or None"""
+        part, local_t = source.locate(t)
+        if self.index_lookup is None or not isinstance(part, EditList):
+            return None
+        path, source_time = part.locate(local_t)
+        index = self.index_lookup(path)
+        found = index.thumbnail_at(source_time) if index is not None else None
+        if found is None:
+            return None
+        thumbnail, thumbnail_time = found
+        frame = cv2.resize(np.asarray(thumbnail), size, interpolation=cv2.INTER_LINEAR)
+        return frame, t - (source_time - thumbnail_time)
+
+    def render(self, source, t, coarse=False):
+        """Return (frame, shown_time, cached) for the source at time t"""
+        with self.lock:
+            size = self.frame_size(source)
+            if coarse:
+                # Filmstrip thumbnails need no decoding at all (and no caching)
+                found = self.filmstrip_frame(source, t, size)
+                if found is not None:
+                    frame, shown = found
+                    compositor = self.layer_compositor(source, size)
+                    if compositor is not None:
+                        frame = compositor.blend_frame(shown, frame).copy()
+                    return frame, shown, True
+                t = self.snap(source, t)
+
+            # Cache per output frame, so nearby requests share an entry
+            step = 1.0 / CONFIG['ui']['preview_fps']
+            key = (source.key, round(t / step), size)
+            frame = self.cache.get(key)
+            if frame is not None:
+                return frame, t, True
+
+            part, local_t = source.locate(t)
+            if isinstance(part, EditList):
+                path, source_time = part.locate(local_t)
+                frame = self.reader(source.path_map.get(path, path), size).read(source_time)
+            else:
+                frame = part.get_frame(local_t)[:, :, :3]
+                frame = cv2.resize(frame.astype(np.uint8, copy=False), size,
+                                   interpolation=cv2.INTER_AREA)
+
+            compositor = self.layer_compositor(source, size)
+            if compositor is not None:
+                frame = compositor.blend_frame(t, frame)
+
+            frame = np.ascontiguousarray(frame).copy()
+            self.cache.put(key, frame)
+            return frame, t, False
+
+    def request(self, source, t):
+        """Render a frame asynchronously, superseding any pending request"""
+        with self.condition:
+            now = time.time()
+            scrubbing = now - self.last_request < CONFIG['ui']['preview_scrub_window']
+            self.last_request = now
+            self.pending = (source, t, scrubbing)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="vedit-preview", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                source, t, scrubbing = self.pending
+                self.pending = None
+
+            try:
+                frame, shown, cached = self.render(source, t, coarse=scrubbing)
+                self._deliver(source, shown, frame, cached)
+
+                # Follow a keyframe with the exact frame unless a newer request came in
+                if shown != t:
+                    time.sleep(CONFIG['ui']['preview_scrub_window'])
+                    with self.condition:
+                        superseded = self.pending is not None
+                    if not superseded:
+                        frame, shown, cached = self.render(source, t)
+                        self._deliver(source, shown, frame, cached)
+            except Exception as e:
+                self.log(f"Preview error: {str(e)}")
+
+    def _deliver(self, source, t, frame, cached):
+        if self.on_frame is not None:
+            self.on_frame(source, t, frame, cached)
+
+    def invalidate(self):
+        """Drop cached frames and layouts (e.g. when a project is replaced)"""
+        self.cache.clear()
+        with self.lock:
+            self.compositor = None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        with self.lock:
+            for reader in self.readers.values():
+                reader.close()
+            self.readers.clear()
@@ -0,0 +1,77 @@
+"""
+VEdit CLI - Project Files
+
+Binary .vedit project format. A file is a fixed header (magic, format
+version, length of each section) followed by two zlib-compressed JSON
+sections: a small manifest listing every source file with its content hash
+and probed stream parameters, and the timeline itself (edit lists, overlays,
+text overlays, overdubs, transition and overlay settings).
+
+Loading seeds the probe cache from the manifest, so reopening a project
+reads only this file and the head/tail chunks hashed to validate each source;
+media decoders are opened lazily when frames are first needed.
+"""
+
+import os
+import json
+import zlib
+import struct
+
+MAGIC = b'VEDITPRJ'
+FORMAT_VERSION = 1
+
+# magic, version, manifest length, timeline length
+_HEADER = struct.Struct('<8sHII')
+
+# Overlay and export settings from VIDEO_CONFIG saved with each project
+PROJECT_SETTINGS = ['overlay_fill_mode', 'overlay_max_size_percent',
+                    'default_fps', 'default_bitrate', 'default_codec', 'default_audio_codec',
+                    'keyframe_interval', 'export_mode', 'segment_split', 'segment_duration',
+                    'incremental_export']
+
+
+def _pack(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf8'), 1)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf8'))
+
+
+def write_project(file_path, manifest, timeline):
+    """Atomically write a project file"""
+    manifest_blob, timeline_blob = _pack(manifest), _pack(timeline)
+    part_path = file_path + '.part'
+    with open(part_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_blob), len(timeline_blob)))
+        f.write(manifest_blob)
+        f.write(timeline_blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(part_path, file_path)
+
+
+def is_project_file(file_path):
+    """Whether the file starts with the binary project header"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_project(file_path):
+    """Return (manifest, timeline) from a project file
+
+    Raises ValueError for files that are not binary projects or were written
+    by a newer format version.
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("Not a VEdit project file")
+        magic, version, manifest_length, timeline_length = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a VEdit project file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Project format version {version} is newer than supported")
+        manifest = _unpack(f.read(manifest_length))
+        timeline = _unpack(f.read(timeline_length))
+    return manifest, timeline
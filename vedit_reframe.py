@@ -0,0 +1,162 @@
+"""
+VEdit CLI - Reframing
+
+Cuts other aspect ratios (9:16, 1:1, ...) out of the composed timeline for
+rendition exports. Each aspect is a crop window, the largest of that aspect
+that fits the frame, moved along its free axis by a static position or by
+keyframes ('reframe 9:16 0:00=0.2 0:05=0.8') that are interpolated linearly.
+
+The timeline is decoded once without its overlays. Overlay frames are also
+decoded once per timeline frame and shared by every aspect through
+DecodedOverlay stand-ins, so each AspectView only crops, lays overlays and
+text out for its own canvas, and blends them.
+"""
+
+import re
+import numpy as np
+import cv2
+from moviepy.editor import VideoClip
+from vedit_compositor import FlatCompositor
+
+_ASPECT_RE = re.compile(r'(\d+):(\d+)')
+
+# Named crop positions along the free axis
+NAMED_POSITIONS = {'left': 0.0, 'top': 0.0, 'center': 0.5, 'right': 1.0, 'bottom': 1.0}
+
+
+def parse_aspect(text):
+    """(w, h) ratio from 'W:H', e.g. '9:16'"""
+    match = _ASPECT_RE.fullmatch(text.strip())
+    if not match or not int(match.group(1)) or not int(match.group(2)):
+        raise ValueError(f"Aspect ratio must be written W:H (e.g. 9:16), not '{text}'")
+    return int(match.group(1)), int(match.group(2))
+
+
+def aspect_key(aspect):
+    return f"{aspect[0]}:{aspect[1]}"
+
+
+def parse_position(text):
+    """Crop position along the free axis (0-1, or left/center/right/top/bottom)"""
+    text = text.strip().lower()
+    position = NAMED_POSITIONS[text] if text in NAMED_POSITIONS else float(text)
+    if not 0.0 <= position <= 1.0:
+        raise ValueError(f"Crop position must be between 0 and 1, not {text}")
+    return position
+
+
+def crop_size(size, aspect):
+    """Largest even-sided window of the given aspect that fits in size"""
+    w, h = size
+    aw, ah = aspect
+    if w * ah > h * aw:
+        crop = (h * aw / ah, h)
+    else:
+        crop = (w, w * ah / aw)
+    return max(2, int(crop[0]) // 2 * 2), max(2, int(crop[1]) // 2 * 2)
+
+
+class CropPath:
+    """Crop window position over time from (time, position) keyframes"""
+
+    def __init__(self, keyframes=()):
+        keyframes = sorted(keyframes) or [(0.0, 0.5)]
+        self.times = np.array([t for t, _ in keyframes], np.float64)
+        self.positions = np.array([p for _, p in keyframes], np.float64)
+
+    def offset(self, t, size, crop):
+        """Top-left pixel of the crop window at time t"""
+        position = float(np.interp(t, self.times, self.positions))
+        return (int(round((size[0] - crop[0]) * position)),
+                int(round((size[1] - crop[1]) * position)))
+
+
+def decode_overlays(overlays, t):
+    """{index: (rgb, mask)} of the overlays on screen at timeline time t"""
+    decoded = {}
+    for index, overlay in enumerate(overlays):
+        if overlay['start'] <= t < overlay['end']:
+            clip = overlay['clip']
+            local = t - overlay['start']
+            rgb = clip.get_frame(local)[:, :, :3]
+            mask = clip.mask.get_frame(local).astype(np.float32) if clip.mask is not None else None
+            decoded[index] = (rgb, mask)
+    return decoded
+
+
+class DecodedOverlay:
+    """Stand-in for an overlay clip that serves frames decoded by the exporter
+
+    It supports what overlay layout and CompositeLayer use of a clip (size,
+    resize() and get_frame(), with a mask when the overlay has one), so the
+    engine's layout code places it like any other clip.
+    """
+
+    def __init__(self, frames, index, size, has_mask=False, is_mask=False):
+        self.frames = frames
+        self.index = index
+        self.size = tuple(int(v) for v in size)
+        self.is_mask = is_mask
+        self.mask = None
+        if has_mask and not is_mask:
+            self.mask = DecodedOverlay(frames, index, size, is_mask=True)
+
+    @property
+    def w(self):
+        return self.size[0]
+
+    @property
+    def h(self):
+        return self.size[1]
+
+    def resize(self, newsize=None, height=None, width=None):
+        """Same sizing rules as moviepy's resize()"""
+        w, h = self.size
+        if newsize is None:
+            newsize = (w * height / h, height) if height is not None else (width, h * width / w)
+        return DecodedOverlay(self.frames, self.index, newsize, self.mask is not None, self.is_mask)
+
+    def get_frame(self, t):
+        frame = self.frames[self.index][1 if self.is_mask else 0]
+        if frame.shape[1::-1] != self.size:
+            # Interpolation as in moviepy's resize: area when shrinking, linear when growing
+            growing = self.size[0] > frame.shape[1] or self.size[1] > frame.shape[0]
+            frame = cv2.resize(frame, self.size,
+                               interpolation=cv2.INTER_LINEAR if growing else cv2.INTER_AREA)
+        return frame
+
+
+class AspectView:
+    """One aspect of the timeline: crop window plus overlays laid out for it
+
+    layout(canvas, overlays) returns the compositor layers for a stand-in
+    canvas clip and the overlays (dicts with a 'clip', start, end and
+    fades) as DecodedOverlays.
+    """
+
+    def __init__(self, size, duration, aspect=None, keyframes=(), overlays=(), layout=None):
+        self.size = tuple(size)
+        self.crop = crop_size(self.size, aspect) if aspect else self.size
+        self.path = CropPath(keyframes)
+        self.frames = {}
+        self.compositor = None
+        if layout is not None:
+            canvas = VideoClip(duration=duration)
+            canvas.size = self.crop
+            stand_ins = [dict(overlay, clip=DecodedOverlay(self.frames, index, overlay['clip'].size,
+                                                           overlay['clip'].mask is not None))
+                         for index, overlay in enumerate(overlays)]
+            layers = layout(canvas, stand_ins)
+            if layers:
+                self.compositor = FlatCompositor(canvas, layers)
+
+    def render(self, t, frame, decoded):
+        """This aspect's frame from the shared timeline frame and overlay frames"""
+        if self.crop != self.size:
+            x, y = self.path.offset(t, self.size, self.crop)
+            frame = frame[y:y + self.crop[1], x:x + self.crop[0]]
+        if self.compositor is not None:
+            self.frames.clear()
+            self.frames.update(decoded)
+            frame = self.compositor.blend_frame(t, frame)
+        return np.ascontiguousarray(frame)
@@ -0,0 +1,171 @@
+"""
+VEdit CLI - Multi-Rendition Export
+
+Encodes one timeline to several renditions (e.g. 1080p, 720p and 480p) in a
+single pass. Every frame is decoded and composited once; the composed frame
+is handed to one encoder thread per rendition, which scales it with
+cv2.resize and pipes it to its own ffmpeg process. The encoders therefore run
+in parallel, and bounded queues keep a slow encoder from buffering the whole
+timeline. The audio track is encoded once and copied into every output.
+
+Renditions are written as [HEIGHTp] [W:H][@bitrate][/codec] (e.g. 720p@2500k
+or 1080p 9:16) or as a preset name from VIDEO_CONFIG['renditions']. One with
+an aspect ratio is cut out of the frame by an AspectView (vedit_reframe),
+which also lays the overlays out for it; the encoder threads do that work.
+"""
+
+import os
+import re
+import queue
+import threading
+import numpy as np
+import cv2
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from config import CONFIG
+from vedit_pipeline import frame_count
+from vedit_reframe import decode_overlays
+
+_SPEC_RE = re.compile(r'(?:(\d+)p)?\s*(?:(\d+):(\d+))?(?:@(\d+[kKmM]?))?(?:/([\w-]+))?')
+
+
+def parse_rendition(spec, video_config=None):
+    """Rendition dict (name, height, aspect, bitrate, codec) for a preset name or spec
+
+    height None keeps the (cropped) source height; aspect None keeps the
+    source aspect ratio. video_config, when given, stands in for CONFIG['video'].
+    """
+    video_config = video_config or CONFIG['video']
+    preset = video_config['renditions'].get(spec.lower())
+    if preset is not None:
+        return dict(preset, name=spec.lower(), aspect=None)
+
+    match = _SPEC_RE.fullmatch(spec.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"Unknown rendition '{spec}' (use e.g. 720p, 720p@2500k, 9:16 or a preset)")
+    height, aspect_w, aspect_h, bitrate, codec = match.groups()
+    aspect = (int(aspect_w), int(aspect_h)) if aspect_w else None
+    if aspect is not None and not all(aspect):
+        raise ValueError(f"Invalid aspect ratio in rendition '{spec}'")
+    # A preset of the same height supplies whatever the spec leaves out
+    preset = video_config['renditions'].get(f"{height}p", {}) if height else {}
+    name = '_'.join(part for part in (height and f"{height}p",
+                                      aspect and f"{aspect[0]}x{aspect[1]}") if part)
+    return {'name': name, 'height': int(height) if height else None, 'aspect': aspect,
+            'bitrate': bitrate or preset.get('bitrate', video_config['default_bitrate']),
+            'codec': codec or preset.get('codec', video_config['default_codec'])}
+
+
+def rendition_size(size, height):
+    """Frame size scaled to `height` (or kept), keeping the aspect ratio with even sides"""
+    w, h = size
+    height = height or h
+    width = max(2, int(round(w * height / h / 2)) * 2)
+    return width, max(2, int(height) // 2 * 2)
+
+
+def rendition_file(output_file, rendition):
+    """Output path of one rendition: the export name plus the rendition name"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_{rendition['name']}{ext}"
+
+
+class _RenditionEncoder:
+    """Encoder thread: reframes and scales queued frames and feeds them to one ffmpeg"""
+
+    def __init__(self, path, source_size, rendition, fps, audio_file, ffmpeg_params, view=None):
+        self.path = path
+        self.view = view
+        frame_size = view.crop if view is not None else tuple(source_size)
+        self.size = rendition_size(frame_size, rendition['height'])
+        self.scale = self.size != tuple(frame_size)
+        self.writer = FFMPEG_VideoWriter(path, self.size, fps, codec=rendition['codec'],
+                                         audiofile=audio_file, bitrate=rendition['bitrate'],
+                                         ffmpeg_params=ffmpeg_params)
+        self.frames = queue.Queue(maxsize=CONFIG['performance']['rendition_queue_frames'])
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="vedit-rendition", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                t, frame, decoded = item
+                if self.view is not None:
+                    frame = self.view.render(t, frame, decoded)
+                if self.scale:
+                    frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+                self.writer.write_frame(frame)
+            except Exception as e:
+                # Keep draining so the producer never blocks on a dead encoder
+                self.error = e
+
+    def put(self, t, frame, decoded):
+        if self.error is not None:
+            raise IOError(f"Encoding {os.path.basename(self.path)} failed: {self.error}")
+        self.frames.put((t, frame, decoded))
+
+    def finish(self):
+        """Wait for the queued frames and close the encoder"""
+        self.frames.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise IOError(f"Encoding {os.path.basename(self.path)} failed: {self.error}")
+
+
+def export_renditions(video, output_file, renditions, audio_file=None, log=print, job=None,
+                      views=None, overlays=(), video_config=None):
+    """Encode the composed timeline once per rendition from a single decode
+
+    views holds an AspectView (or None) per rendition; video is then the
+    timeline without overlays, and overlays (see vedit_reframe) are decoded
+    once per frame for all views. Returns the written paths, one per
+    rendition, named by rendition_file(). video_config, when given, stands
+    in for CONFIG['video'].
+    """
+    video_config = video_config or CONFIG['video']
+    fps = getattr(video, 'fps', None) or video_config['default_fps']
+    total = frame_count(video.duration, fps)
+    ffmpeg_params = ["-g", str(max(1, int(round(video_config['keyframe_interval'] * fps))))]
+    paths = [rendition_file(output_file, rendition) for rendition in renditions]
+    views = views or [None] * len(renditions)
+
+    log(f"Rendition export: {', '.join(r['name'] for r in renditions)} from one decode")
+    if job:
+        job.set_total(total)
+
+    encoders = []
+    try:
+        for path, rendition, view in zip(paths, renditions, views):
+            encoders.append(_RenditionEncoder(path, video.size, rendition, fps,
+                                              audio_file, ffmpeg_params, view))
+        for index in range(total):
+            if job:
+                job.check_cancelled()
+            t = index / fps
+            # A copy: clips may reuse their frame buffer while encoders still queue it
+            frame = np.array(video.get_frame(t), dtype=np.uint8)
+            decoded = decode_overlays(overlays, t)
+            for encoder in encoders:
+                encoder.put(t, frame, decoded)
+            if job:
+                job.set_done(index + 1)
+        for encoder in encoders:
+            encoder.finish()
+    except BaseException:
+        for encoder in encoders:
+            if encoder.thread.is_alive():
+                encoder.error = encoder.error or RuntimeError("stopped")
+                encoder.frames.put(None)
+                encoder.thread.join()
+            encoder.writer.close()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return paths
@@ -0,0 +1,196 @@
+"""
+VEdit CLI - Scene Detection
+
+Finds hard cuts in a video file for 'split clip_name auto'. The file is cut
+into time chunks decoded in parallel worker processes; each ffmpeg decoder
+skips non-reference frames and delivers a small picture only every
+1/scene_sample_fps seconds. Colour histograms are computed for whole batches
+of sampled frames at once (one HSV conversion and one bincount per batch),
+and a cut is a jump in histogram distance above scene_threshold. Each cut is
+then refined to the exact frame by decoding the short window around it at
+full frame rate.
+
+Detection can be limited to a source range (e.g. the part of a file a clip
+plays). Cut times are stored per source file and range in the artifact
+cache, so detection runs once per file, range and parameter set.
+"""
+
+import math
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from moviepy.config import get_setting
+from config import CONFIG
+from vedit_cache import get_cache, file_hash
+from vedit_media import probe_streams
+
+# Analysis picture size and histogram bins (hue, saturation, value)
+ANALYSIS_SIZE = (64, 36)
+HIST_BINS = (8, 4, 4)
+
+# Sampled frames processed per vectorized batch
+BATCH_FRAMES = 256
+
+
+def scene_params():
+    performance = CONFIG['performance']
+    return {'sample_fps': performance['scene_sample_fps'],
+            'threshold': performance['scene_threshold'],
+            'min_scene': performance['scene_min_length'],
+            'size': ANALYSIS_SIZE, 'bins': HIST_BINS}
+
+
+def frame_histograms(frames):
+    """Normalized HSV histograms of a (n, h, w, 3) RGB batch, as (n, bins) float32"""
+    n, h, w, _ = frames.shape
+    # One conversion for the whole batch, stacked as a single tall image
+    hsv = cv2.cvtColor(frames.reshape(n * h, w, 3), cv2.COLOR_RGB2HSV).reshape(n, h * w, 3)
+    hue_bins, sat_bins, val_bins = HIST_BINS
+    codes = (hsv[..., 0].astype(np.int32) * hue_bins // 180) * (sat_bins * val_bins) \
+        + (hsv[..., 1].astype(np.int32) * sat_bins // 256) * val_bins \
+        + (hsv[..., 2].astype(np.int32) * val_bins // 256)
+
+    # Offset each frame's codes so a single bincount yields every histogram
+    bins = hue_bins * sat_bins * val_bins
+    codes += (np.arange(n, dtype=np.int32) * bins)[:, None]
+    hists = np.bincount(codes.ravel(), minlength=n * bins).reshape(n, bins)
+    return hists.astype(np.float32) / (h * w)
+
+
+def histogram_deltas(hists):
+    """Distance (0-1) between each histogram and the previous one"""
+    return 0.5 * np.abs(np.diff(hists, axis=0)).sum(axis=1)
+
+
+def _analyze_chunk(file_path, start, duration, sample_fps):
+    """Histograms of the frames sampled from one time chunk (worker process)"""
+    w, h = ANALYSIS_SIZE
+    cmd = [get_setting("FFMPEG_BINARY"), "-loglevel", "error",
+           "-skip_frame", "noref", "-threads", "1",
+           "-ss", f"{start:.6f}", "-t", f"{duration:.6f}", "-i", file_path,
+           "-an", "-sn", "-vf", f"fps={sample_fps},scale={w}:{h}",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    frame_bytes = w * h * 3
+    hists = []
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * BATCH_FRAMES)
+            count = len(data) // frame_bytes
+            if count == 0:
+                break
+            frames = np.frombuffer(data[:count * frame_bytes], np.uint8).reshape(count, h, w, 3)
+            hists.append(frame_histograms(frames))
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    if not hists:
+        return np.zeros((0, np.prod(HIST_BINS)), np.float32)
+    return np.concatenate(hists)
+
+
+def refine_cut(capture, fps, before, after):
+    """Exact time of the first frame of the new scene between two samples"""
+    first = int(before * fps + 1e-6)
+    last = int(math.ceil(after * fps)) + 1
+    capture.set(cv2.CAP_PROP_POS_MSEC, first * 1000.0 / fps)
+    frames = []
+    for _ in range(last - first + 1):
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, ANALYSIS_SIZE, interpolation=cv2.INTER_AREA)[..., ::-1])
+    if len(frames) < 2:
+        return after
+    deltas = histogram_deltas(frame_histograms(np.ascontiguousarray(np.stack(frames))))
+    return (first + int(np.argmax(deltas)) + 1) / fps
+
+
+def _refine_cuts(file_path, fps, windows):
+    """refine_cut for a list of (before, after) windows with one reader (worker process)"""
+    capture = cv2.VideoCapture(file_path)
+    try:
+        return [refine_cut(capture, fps, before, after) for before, after in windows]
+    finally:
+        capture.release()
+
+
+def _split(items, parts):
+    """Split a list into up to `parts` contiguous runs"""
+    size = max(1, math.ceil(len(items) / max(parts, 1)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def detect_scenes(file_path, workers=1, log=print, start=0.0, end=None):
+    """Source times of the hard cuts in a video file, or in its start..end range (cached)"""
+    streams = probe_streams(file_path)
+    duration = streams.get('duration')
+    if not streams.get('size') or not duration:
+        return []
+    start = max(0.0, start)
+    end = duration if end is None else min(end, duration)
+    if end <= start:
+        return []
+
+    params = scene_params()
+    cache = get_cache()
+    key = cache.make_key(file_hash(file_path), 'scene_cuts',
+                         dict(params, range=[round(start, 6), round(end, 6)]))
+    cuts = cache.get_json(key)
+    if cuts is not None:
+        return cuts
+
+    # Chunks hold whole sample periods, so samples stay on one global grid
+    sample_fps = params['sample_fps']
+    span = end - start
+    samples = max(1, int(span * sample_fps))
+    chunks = max(1, min(workers * 4, samples // (sample_fps * 10) or 1))
+    per_chunk = math.ceil(samples / chunks)
+    starts = [start + i * per_chunk / sample_fps for i in range(chunks) if i * per_chunk < samples]
+    lengths = [min(per_chunk / sample_fps, end - chunk_start) for chunk_start in starts]
+    workers = max(1, min(workers, len(starts)))
+    log(f"Detecting scenes in {span:.0f}s of video ({len(starts)} chunks, {workers} worker(s))")
+
+    fps = streams.get('fps') or CONFIG['video']['default_fps']
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else _Inline() as pool:
+        parts = list(pool.map(_analyze_chunk, [file_path] * len(starts), starts, lengths,
+                              [sample_fps] * len(starts)))
+
+        # Sample times follow each chunk's own frame count (the last may be short)
+        times = np.concatenate([start + np.arange(len(part)) / sample_fps
+                                for start, part in zip(starts, parts)])
+        hists = np.concatenate(parts)
+        deltas = histogram_deltas(hists) if len(hists) > 1 else np.zeros(0)
+        candidates = np.nonzero(deltas > params['threshold'])[0] + 1
+
+        # Skipped frames blur sample times, so search one extra period each side
+        period = 1.0 / sample_fps
+        windows = [(max(float(times[i - 1]) - period, 0.0), float(times[i]) + period)
+                   for i in candidates]
+        runs = _split(windows, workers)
+        refined = pool.map(_refine_cuts, [file_path] * len(runs), [fps] * len(runs), runs)
+        found = [cut for run in refined for cut in run]
+
+    cuts = []
+    for cut in found:
+        previous = cuts[-1] if cuts else start
+        if cut - previous >= params['min_scene'] and end - cut >= params['min_scene']:
+            cuts.append(round(cut, 6))
+
+    cache.put_json(key, cuts)
+    return cuts
+
+
+class _Inline:
+    """Stand-in for a process pool that runs map() in this process"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @staticmethod
+    def map(fn, *iterables):
+        return list(map(fn, *iterables))
@@ -0,0 +1,98 @@
+"""
+VEdit CLI - Silence Detection
+
+Finds dead air for 'clip_name: remove(silence)'. A file's audio is streamed
+from ffmpeg as mono float32 at SILENCE_SAMPLE_RATE and reduced to an RMS
+envelope (one value per 'silence_window' seconds) a block of whole windows
+at a time, so memory stays flat however long the recording is. Silent
+ranges are the runs of windows below the threshold that last at least the
+minimum length, shrunk by 'silence_padding' so speech keeps some air.
+"""
+
+import subprocess
+import numpy as np
+from moviepy.config import get_setting
+from config import CONFIG
+from vedit_media import probe_streams
+
+# Sample rate the envelope is measured at (speech needs no more)
+SILENCE_SAMPLE_RATE = 16000
+
+# Envelope windows computed per vectorized step
+BLOCK_WINDOWS = 4096
+
+
+def silence_params():
+    performance = CONFIG['performance']
+    return {'threshold_db': performance['silence_threshold_db'],
+            'min_length': performance['silence_min_length'],
+            'window': performance['silence_window'],
+            'padding': performance['silence_padding']}
+
+
+def rms_envelope(file_path, window):
+    """RMS level in dBFS of each `window`-second slice of a file's audio, or None"""
+    streams = probe_streams(file_path)
+    if not streams.get('audio_codec'):
+        return None
+
+    size = max(1, int(round(window * SILENCE_SAMPLE_RATE)))
+    cmd = [get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-i", file_path,
+           "-vn", "-sn", "-ac", "1", "-ar", str(SILENCE_SAMPLE_RATE), "-f", "f32le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            bufsize=1024 * 1024)
+    levels = []
+    pending = np.zeros(0, np.float32)
+    try:
+        while True:
+            data = proc.stdout.read(4 * size * BLOCK_WINDOWS)
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) // 4 * 4], np.float32)
+            if len(pending):
+                samples = np.concatenate([pending, samples])
+            whole = len(samples) // size
+            blocks = samples[:whole * size].reshape(whole, size)
+            levels.append(np.sqrt(np.einsum('ij,ij->i', blocks, blocks) / size))
+            pending = samples[whole * size:]
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if len(pending):
+        levels.append(np.sqrt([np.mean(pending * pending)]))
+    if not levels:
+        return np.zeros(0, np.float32)
+    rms = np.concatenate(levels)
+    return (20.0 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32)
+
+
+def silent_ranges(levels, window, threshold_db, min_length, padding=0.0):
+    """(start, end) times of the runs of levels below threshold_db"""
+    quiet = np.concatenate([[False], levels < threshold_db, [False]])
+    edges = np.flatnonzero(np.diff(quiet.astype(np.int8)))
+    starts, ends = edges[0::2] * window, edges[1::2] * window
+    keep = ends - starts >= min_length
+    starts, ends = starts[keep], ends[keep]
+
+    # Runs that touch the ends of the file need no padding on that side
+    total = len(levels) * window
+    starts = np.where(starts > 0, starts + padding, starts)
+    ends = np.where(ends < total, ends - padding, ends)
+    return [(float(start), float(end)) for start, end in zip(starts, ends) if end > start]
+
+
+def detect_silence(file_path, threshold_db=None, min_length=None):
+    """Silent source ranges of a file's audio ([] when it has no audio)"""
+    params = silence_params()
+    if threshold_db is None:
+        threshold_db = params['threshold_db']
+    if min_length is None:
+        min_length = params['min_length']
+    levels = rms_envelope(file_path, params['window'])
+    if levels is None:
+        return []
+    # Padding comes out of each run, so a run must outlast it to survive
+    return silent_ranges(levels, params['window'], threshold_db,
+                         max(min_length, 2 * params['padding'] + params['window']),
+                         params['padding'])
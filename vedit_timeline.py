@@ -0,0 +1,218 @@
+"""
+VEdit CLI - Edit Decision Lists
+
+A video clip's timeline is a flat edit decision list: the (file_path,
+in_time, out_time) ranges of the source media it plays, in order, plus the
+timeline offset at which each range starts. Cuts locate the ranges they touch
+by binary search and splice the list, so a clip never becomes a nested tree
+of subclips, and a frame lookup maps a timeline time straight to a source
+timestamp with one bisect however many edits were applied.
+"""
+
+import os
+import bisect
+import numpy as np
+from moviepy.editor import VideoClip, AudioClip, ImageClip
+from config import CONFIG
+from vedit_media import LazyVideoClip
+
+
+class EditList:
+    """Immutable list of (file_path, in_time, out_time) source ranges"""
+
+    def __init__(self, ranges=()):
+        self.ranges = [(path, float(src_in), float(src_out))
+                       for path, src_in, src_out in ranges if src_out > src_in]
+        self.starts = []
+        elapsed = 0.0
+        for _, src_in, src_out in self.ranges:
+            self.starts.append(elapsed)
+            elapsed += src_out - src_in
+        self.duration = elapsed
+
+    @classmethod
+    def from_file(cls, file_path, duration):
+        """Edit list playing a whole file"""
+        return cls([(file_path, 0.0, duration)])
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __eq__(self, other):
+        return isinstance(other, EditList) and self.ranges == other.ranges
+
+    def __repr__(self):
+        return f"EditList({self.ranges!r})"
+
+    def paths(self):
+        """Source files used by the edit list, in first-use order"""
+        return list(dict.fromkeys(path for path, _, _ in self.ranges))
+
+    def index_at(self, t):
+        """Index of the range playing at timeline time t"""
+        index = bisect.bisect_right(self.starts, t) - 1
+        return min(max(index, 0), len(self.ranges) - 1)
+
+    def locate(self, t):
+        """Map a timeline time to (file_path, source_time)"""
+        index = self.index_at(t)
+        path, src_in, src_out = self.ranges[index]
+        return path, min(src_in + t - self.starts[index], src_out)
+
+    def slice(self, start, end):
+        """Edit list of timeline range [start, end)"""
+        start, end = max(start, 0.0), min(end, self.duration)
+        if end <= start:
+            return EditList()
+
+        first, last = self.index_at(start), self.index_at(end)
+        if last > first and self.starts[last] >= end:
+            last -= 1
+
+        ranges = list(self.ranges[first:last + 1])
+        path, src_in, src_out = ranges[0]
+        ranges[0] = (path, src_in + start - self.starts[first], src_out)
+        path, src_in, src_out = ranges[-1]
+        ranges[-1] = (path, src_in, self.ranges[last][1] + end - self.starts[last])
+        return EditList(ranges)
+
+    def concat(self, other):
+        """Edit list playing this one followed by another"""
+        return EditList(self.ranges + other.ranges)
+
+    def trim(self, start, end):
+        """Keep only timeline range [start, end)"""
+        return self.slice(start, end)
+
+    def remove(self, start, end):
+        """Drop timeline range [start, end)"""
+        if end < start:
+            raise ValueError(f"Range end {end:.2f}s is before its start {start:.2f}s")
+        start, end = max(start, 0.0), min(end, self.duration)
+        if end <= start:
+            return self
+
+        # Keep the head of the range the cut starts in and the tail of the
+        # range it ends in; everything in between goes
+        first, last = self.index_at(start), self.index_at(end)
+        path, src_in, _ = self.ranges[first]
+        pieces = [(path, src_in, src_in + start - self.starts[first])]
+        path, src_in, src_out = self.ranges[last]
+        pieces.append((path, src_in + end - self.starts[last], src_out))
+        return self._splice(first, last, [piece for piece in pieces if piece[2] > piece[1]])
+
+    def _splice(self, first, last, pieces):
+        """Edit list with ranges first..last replaced by pieces
+
+        Ranges before the splice keep their start offsets; only those from
+        the splice point on are recomputed.
+        """
+        result = EditList.__new__(EditList)
+        result.ranges = self.ranges[:first] + pieces + self.ranges[last + 1:]
+        result.starts = self.starts[:first]
+        elapsed = self.starts[first]
+        for _, src_in, src_out in result.ranges[first:]:
+            result.starts.append(elapsed)
+            elapsed += src_out - src_in
+        result.duration = elapsed
+        return result
+
+    def remove_source_ranges(self, cuts):
+        """Drop source ranges wherever they play, in one pass
+
+        cuts maps a file path to sorted, non-overlapping (start, end) source
+        ranges; every list range is clipped around them at once.
+        """
+        ends = {path: [end for _, end in path_cuts] for path, path_cuts in cuts.items()}
+        ranges = []
+        for path, src_in, src_out in self.ranges:
+            position = src_in
+            path_cuts = cuts.get(path, ())
+            index = bisect.bisect_right(ends[path], src_in) if path_cuts else 0
+            while index < len(path_cuts) and path_cuts[index][0] < src_out:
+                cut_start, cut_end = path_cuts[index]
+                ranges.append((path, position, max(cut_start, position)))
+                position = min(cut_end, src_out)
+                index += 1
+            ranges.append((path, position, src_out))
+        return EditList(ranges)
+
+    def split(self, split_time):
+        """Edit lists of the parts before and after split_time"""
+        return self.slice(0, split_time), self.slice(split_time, self.duration)
+
+
+class EditListAudioClip(AudioClip):
+    """Audio of an edit list, resolving sample times to sources in bulk"""
+
+    def __init__(self, edit_list, readers):
+        AudioClip.__init__(self)
+        self.edit_list = edit_list
+        self.readers = readers
+        self.fps = 44100
+        self.nchannels = 2
+        self.duration = self.end = edit_list.duration
+        self._starts = np.array(edit_list.starts)
+        self._ins = np.array([src_in for _, src_in, _ in edit_list])
+        self.make_frame = self.render_samples
+
+    def render_samples(self, t):
+        """Samples at time(s) t, one searchsorted for the whole chunk"""
+        times = np.atleast_1d(np.asarray(t, dtype=float))
+        index = np.searchsorted(self._starts, times, side='right') - 1
+        np.clip(index, 0, len(self._starts) - 1, out=index)
+        source_times = self._ins[index] + times - self._starts[index]
+
+        samples = np.zeros((len(times), self.nchannels))
+        for i in np.unique(index):
+            reader = self.readers[self.edit_list.ranges[i][0]]
+            if reader.audio is not None:
+                selected = index == i
+                samples[selected] = reader.audio.get_frame(source_times[selected])
+        return samples if np.ndim(t) else samples[0]
+
+
+class EditListClip(VideoClip):
+    """Video clip playing an edit list straight from its source readers
+
+    path_map substitutes files (e.g. original path -> proxy path); ranges
+    keep their timestamps because proxies share the source's timeline.
+    Ranges are expected to share one picture size, as cuts of one upload do.
+    """
+
+    def __init__(self, edit_list, path_map=None):
+        VideoClip.__init__(self)
+        path_map = path_map or {}
+        self.edit_list = edit_list
+        self.readers = {path: LazyVideoClip(path_map.get(path, path))
+                        for path in edit_list.paths()}
+
+        first = self.readers[edit_list.ranges[0][0]]
+        self.size = first.size
+        self.fps = first.fps
+        self.duration = self.end = edit_list.duration
+        self.make_frame = self.render_frame
+        if any(reader.audio is not None for reader in self.readers.values()):
+            self.audio = EditListAudioClip(edit_list, self.readers)
+
+    def render_frame(self, t):
+        path, source_time = self.edit_list.locate(t)
+        return self.readers[path].get_frame(source_time)
+
+
+def is_still_image(file_path):
+    """Whether a file is a still picture rather than video or an animated GIF"""
+    extension = os.path.splitext(file_path)[1].lower()
+    return extension in CONFIG['file']['image_formats'] and extension != '.gif'
+
+
+def clip_from_edit_list(edit_list, path_map=None):
+    """Build a moviepy clip playing an edit list"""
+    paths = edit_list.paths()
+    if len(paths) == 1 and is_still_image(paths[0]):
+        # A still shows the same picture whatever range of it is "played"
+        return ImageClip(paths[0], duration=edit_list.duration)
+    return EditListClip(edit_list, path_map)